@@ -1,41 +1,84 @@
-from flask import Flask, request, jsonify, render_template, redirect, url_for, session, send_from_directory, abort
+from flask import (Flask, request, jsonify, render_template, redirect, url_for, session, send_from_directory, abort,
+                   stream_with_context)
 from flask_cors import CORS
 import sqlite3  # Add this import for SQLite
 import os
-import datetime
-from datetime import timezone, timedelta
+import atexit
 import json
 from flask import request, jsonify
+from catalog import (CHANGE_STOCK, HOME_PRODUCT_COLUMNS, ProductCatalog, ListingIndex, SOURCE_FARM, SOURCE_HOME,
+                     decode_cursor, encode_cursor, import_json_catalog)
+from image_store import ImageStore, IMAGE_NAME_RE, migrate_inline_images
+from search import SEARCH_CANDIDATES, create_search_index, search_products
+from catalog_export import CatalogExporter
+from db import ConnectionPool
+from write_queue import WriteQueue, WriteQueueFull
+from migrations import add_column, create_indexes, migrate
+from repository import (ALL_ORDERS_BY_DATE, ALL_ORDERS_BY_DATE_AND_STATUS, ALL_SOIL_TEST_BOOKINGS, CUSTOMER_ORDER_STATS,
+                        CUSTOMER_ORDER_STATS_BY_DATE, CUSTOMER_ORDERS, CUSTOMER_ORDERS_PAGE, FARMER_NOTIFICATIONS,
+                        NO_ORDER_STATS, ORDERS_PAGE, PINCODE_ORDER_STATS, PINCODE_ORDERS_PAGE,
+                        USER_SOIL_TEST_BOOKINGS)
+from order_stats import create_order_stats_table, create_pincode_order_stats_table
+from timestamps import UNKNOWN_TIMESTAMP, date_range, format_ist, present_timestamps, utc_timestamp
+from reservations import (RESERVATION_TTL_SECONDS, InsufficientStock, commit_order_stock, create_reservation_table,
+                          release_order_stock)
+from order_service import OrderError, OrderService
+from idempotency import IdempotencyConflict, create_idempotency_table, request_fingerprint, valid_key
+from ids import IdGenerator, create_id_table
 
 app = Flask(__name__, static_folder='static')
 app.secret_key = os.environ.get('SECRET_KEY', 'AgriConnect@123')  # Better secret key handling
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # Set max content length to 16MB
 app.config['MAX_COOKIE_SIZE'] = 4096  # Set max cookie size to 4KB
 
+# Stored timestamps are UTC; templates show them in IST with {{ value|ist }}
+app.add_template_filter(format_ist, 'ist')
+
 # Enable CORS for React development
 CORS(app, supports_credentials=True)
 
 # Define database path
 DB_PATH = os.path.join(os.path.dirname(__file__), 'user_database.db')
 
+# Pooled connections: one per request, shared by every helper it calls
+db_pool = ConnectionPool(DB_PATH)
+db_pool.init_app(app)
+
+def get_db():
+    """The current request's database connection (closing it keeps it open for reuse)."""
+    return db_pool.connection()
+
+# Small high-frequency writes, committed in batches by one writer thread
+write_queue = WriteQueue(DB_PATH)
+atexit.register(write_queue.close)
+
+WRITE_QUEUE_FULL_MESSAGE = 'Too many requests right now, please try again in a moment'
+
+# Legacy JSON catalogs, imported once into SQLite by init_db()
+PRODUCTS_JSON_PATH = os.path.join(os.path.dirname(__file__), 'products.json')
+FARM_PRODUCTS_JSON_PATH = os.path.join(os.path.dirname(__file__), 'farm_product.json')
+
+# Shared product catalog, reloaded only when the catalog version changes
+product_catalog = ProductCatalog(DB_PATH)
+# products.json export, written at most once per burst of catalog edits
+catalog_exporter = CatalogExporter(product_catalog, PRODUCTS_JSON_PATH)
+# Time-ordered order (ORD), soil test booking (ST) and product (FP) IDs
+ids = IdGenerator(DB_PATH)
+# Checkout: validate, price, insert and notify in one transaction
+order_service = OrderService(product_catalog, catalog_exporter, ids)
+
+# Content-addressed store for product images (replaces inline base64 data URIs)
+PRODUCT_IMAGE_FOLDER = os.path.join(os.path.dirname(__file__), 'static', 'product_images')
+product_image_store = ImageStore(PRODUCT_IMAGE_FOLDER, '/product-images')
+
 # Store notifications for collectors with IDs and completion status
 Farmers_notifications = {}
 next_notification_id = 1
 
-def get_current_time():
-    # Get current UTC time
-    utc_now = datetime.datetime.now(timezone.utc)
-    # Convert to IST (UTC+5:30)
-    ist = utc_now + timedelta(hours=5, minutes=30)
-    return ist.strftime("%d-%m-%Y"), ist.strftime("%H:%M:%S")
-
-# Initialize SQLite database
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
+# Schema migrations, applied in order by init_db() (see migrations.py)
+def migration_base_schema(cur):
     # coustomer login info
-    cursor.execute('''
+    cur.execute('''
         CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             username TEXT UNIQUE NOT NULL,
@@ -44,27 +87,20 @@ def init_db():
     ''')
 
     # coustomer's form details
-    cursor.execute('''
+    cur.execute('''
         CREATE TABLE IF NOT EXISTS user_details (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             username TEXT UNIQUE,
             name TEXT,
             address TEXT,
             phone TEXT,
-            login_type TEXT       
+            login_type TEXT
         )
     ''')
-    
-    # Add pincode column if it doesn't exist (migration)
-    try:
-        cursor.execute("ALTER TABLE user_details ADD COLUMN pincode TEXT")
-        conn.commit()
-    except sqlite3.OperationalError:
-        # Column already exists, ignore
-        pass
+    add_column(cur, 'user_details', 'pincode TEXT')
 
     # Farmers table
-    cursor.execute('''
+    cur.execute('''
         CREATE TABLE IF NOT EXISTS Farmers (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL,
@@ -78,7 +114,7 @@ def init_db():
     ''')
 
     # Ratings table
-    cursor.execute('''
+    cur.execute('''
         CREATE TABLE IF NOT EXISTS Farmer_ratings (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             Farmers_username TEXT NOT NULL,
@@ -93,7 +129,7 @@ def init_db():
     ''')
 
     # Orders table
-    cursor.execute('''
+    cur.execute('''
         CREATE TABLE IF NOT EXISTS orders (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             order_number TEXT UNIQUE NOT NULL,
@@ -108,33 +144,11 @@ def init_db():
             FOREIGN KEY (username) REFERENCES users(username)
         )
     ''')
-    
-    # Add payment_method column if it doesn't exist (migration)
-    try:
-        cursor.execute("ALTER TABLE orders ADD COLUMN payment_method TEXT")
-        conn.commit()
-    except sqlite3.OperationalError:
-        # Column already exists, ignore
-        pass
-    
-    # Add payment_id column if it doesn't exist (migration)
-    try:
-        cursor.execute("ALTER TABLE orders ADD COLUMN payment_id TEXT")
-        conn.commit()
-    except sqlite3.OperationalError:
-        # Column already exists, ignore
-        pass
-    
-    # Add otp column if it doesn't exist (migration)
-    try:
-        cursor.execute("ALTER TABLE orders ADD COLUMN otp TEXT")
-        conn.commit()
-    except sqlite3.OperationalError:
-        # Column already exists, ignore
-        pass
+    for column_sql in ("payment_method TEXT", "payment_id TEXT", "otp TEXT"):
+        add_column(cur, 'orders', column_sql)
 
     # Order items table
-    cursor.execute('''
+    cur.execute('''
         CREATE TABLE IF NOT EXISTS order_items (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             order_id INTEGER NOT NULL,
@@ -147,7 +161,7 @@ def init_db():
     ''')
 
     # Product ratings table
-    cursor.execute('''
+    cur.execute('''
         CREATE TABLE IF NOT EXISTS product_ratings (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             product_id TEXT NOT NULL,
@@ -161,7 +175,7 @@ def init_db():
     ''')
 
     # Farmer order notifications table
-    cursor.execute('''
+    cur.execute('''
         CREATE TABLE IF NOT EXISTS farmer_order_notifications (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             farmer_username TEXT NOT NULL,
@@ -178,17 +192,10 @@ def init_db():
             FOREIGN KEY (order_id) REFERENCES orders(id)
         )
     ''')
-    
-    # Add price column to farmer_order_notifications if it doesn't exist (migration)
-    try:
-        cursor.execute("ALTER TABLE farmer_order_notifications ADD COLUMN price REAL DEFAULT 0")
-        conn.commit()
-    except sqlite3.OperationalError:
-        # Column already exists, ignore
-        pass
-    
+    add_column(cur, 'farmer_order_notifications', 'price REAL DEFAULT 0')
+
     # Soil test bookings table
-    cursor.execute('''
+    cur.execute('''
         CREATE TABLE IF NOT EXISTS soil_test_bookings (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             booking_id TEXT UNIQUE NOT NULL,
@@ -203,9 +210,9 @@ def init_db():
             FOREIGN KEY (username) REFERENCES users(username)
         )
     ''')
-    
+
     # Soil test reports table (stores analysis results)
-    cursor.execute('''
+    cur.execute('''
         CREATE TABLE IF NOT EXISTS soil_test_reports (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             booking_id INTEGER NOT NULL,
@@ -222,9 +229,9 @@ def init_db():
             FOREIGN KEY (booking_id) REFERENCES soil_test_bookings(id)
         )
     ''')
-    
+
     # Customer feedback table
-    cursor.execute('''
+    cur.execute('''
         CREATE TABLE IF NOT EXISTS customer_feedback (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL,
@@ -236,17 +243,10 @@ def init_db():
             created_at TEXT
         )
     ''')
-    
-    # Add phone column to customer_feedback if it doesn't exist (migration)
-    try:
-        cursor.execute("ALTER TABLE customer_feedback ADD COLUMN phone TEXT")
-        conn.commit()
-    except sqlite3.OperationalError:
-        # Column already exists, ignore
-        pass
-    
+    add_column(cur, 'customer_feedback', 'phone TEXT')
+
     # Community posts table for farmer social media
-    cursor.execute('''
+    cur.execute('''
         CREATE TABLE IF NOT EXISTS community_posts (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             username TEXT NOT NULL,
@@ -257,9 +257,9 @@ def init_db():
             FOREIGN KEY (username) REFERENCES users(username)
         )
     ''')
-    
+
     # Community replies table for solutions/comments
-    cursor.execute('''
+    cur.execute('''
         CREATE TABLE IF NOT EXISTS community_replies (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             post_id INTEGER NOT NULL,
@@ -271,14 +271,335 @@ def init_db():
         )
     ''')
 
-    conn.commit() # save changes 
-    conn.close()
+def migration_catalog(cur):
+    # Farmer products table (home page catalog)
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS farmer_products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id TEXT UNIQUE NOT NULL,
+            farmer_username TEXT NOT NULL,
+            name TEXT NOT NULL,
+            category TEXT NOT NULL,
+            price REAL NOT NULL,
+            stock INTEGER NOT NULL DEFAULT 0,
+            unit TEXT,
+            image TEXT,
+            description TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (farmer_username) REFERENCES users(username)
+        )
+    ''')
+
+    # products.json-only columns
+    for column_sql in ("new_price REAL", "seller_type TEXT DEFAULT 'farmer'", "location TEXT DEFAULT 'Local Farm'"):
+        add_column(cur, 'farmer_products', column_sql)
+
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_farmer_products_farmer ON farmer_products(farmer_username)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_farmer_products_category ON farmer_products(category)")
+
+    # Farm supplies table (farmers page catalog, imported from farm_product.json)
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS farm_supplies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            product_id TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL,
+            price NUMERIC NOT NULL,
+            unit TEXT,
+            farmer TEXT,
+            location TEXT,
+            image TEXT,
+            phone TEXT,
+            pincode TEXT
+        )
+    ''')
+
+    # Catalog bookkeeping (one-time JSON import flag, ETag instance id)
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_meta (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            json_imported INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cur.execute("INSERT OR IGNORE INTO catalog_meta (id, json_imported) VALUES (1, 0)")
+    add_column(cur, 'catalog_meta', 'instance_id TEXT')
+    # Random per-database id so catalog ETags never repeat across databases
+    cur.execute("UPDATE catalog_meta SET instance_id = lower(hex(randomblob(8))) WHERE instance_id IS NULL")
+
+    # Catalog change log; the highest version is the catalog version
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS catalog_changes (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            key TEXT NOT NULL
+        )
+    ''')
+    for table, source in (('farmer_products', 'home'), ('farm_supplies', 'farm')):
+        # Version-counter triggers replaced by the change log
+        for event in ('insert', 'update', 'delete'):
+            cur.execute(f"DROP TRIGGER IF EXISTS trg_{table}_{event}_version")
+        cur.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_insert_changes AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO catalog_changes (source, key) VALUES ('{source}', NEW.product_id);
+            END
+        ''')
+        cur.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_update_changes AFTER UPDATE ON {table}
+            BEGIN
+                INSERT INTO catalog_changes (source, key) VALUES ('{source}', NEW.product_id);
+                INSERT INTO catalog_changes (source, key)
+                    SELECT '{source}', OLD.product_id WHERE OLD.product_id <> NEW.product_id;
+            END
+        ''')
+        cur.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_delete_changes AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO catalog_changes (source, key) VALUES ('{source}', OLD.product_id);
+            END
+        ''')
+
+    # Seller details shown on home products (name, address, pincode)
+    cur.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_user_details_insert_changes AFTER INSERT ON user_details
+        WHEN EXISTS (SELECT 1 FROM farmer_products WHERE farmer_username = NEW.username)
+        BEGIN
+            INSERT INTO catalog_changes (source, key) VALUES ('seller', NEW.username);
+        END
+    ''')
+    cur.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_user_details_update_changes
+        AFTER UPDATE OF name, address, pincode ON user_details
+        WHEN (OLD.name IS NOT NEW.name OR OLD.address IS NOT NEW.address OR OLD.pincode IS NOT NEW.pincode)
+             AND EXISTS (SELECT 1 FROM farmer_products WHERE farmer_username = NEW.username)
+        BEGIN
+            INSERT INTO catalog_changes (source, key) VALUES ('seller', NEW.username);
+        END
+    ''')
+    cur.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_user_details_delete_changes AFTER DELETE ON user_details
+        WHEN EXISTS (SELECT 1 FROM farmer_products WHERE farmer_username = OLD.username)
+        BEGIN
+            INSERT INTO catalog_changes (source, key) VALUES ('seller', OLD.username);
+        END
+    ''')
+
+    # Keep the change log bounded (every 1000th change trims it to the last
+    # 10000); catalogs further behind do a full reload
+    cur.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_catalog_changes_prune AFTER INSERT ON catalog_changes
+        WHEN NEW.version % 1000 = 0
+        BEGIN
+            DELETE FROM catalog_changes WHERE version <= NEW.version - 10000;
+        END
+    ''')
+    cur.execute('''
+        DELETE FROM catalog_changes
+        WHERE version <= (SELECT MAX(version) FROM catalog_changes) - 10000
+    ''')
+
+    # One-time import of the legacy products.json / farm_product.json catalogs
+    if import_json_catalog(cur.connection, PRODUCTS_JSON_PATH, FARM_PRODUCTS_JSON_PATH, product_image_store):
+        print("Imported products.json and farm_product.json into SQLite")
+
+    # Move any inline base64 product images into the image store
+    migrated = migrate_inline_images(cur.connection, product_image_store)
+    if migrated:
+        print(f"Moved {migrated} inline product images to the image store")
+
+def migration_search_index(cur):
+    # Full-text product search index, kept in sync by triggers
+    try:
+        if create_search_index(cur.connection):
+            print("Built product search index")
+    except sqlite3.OperationalError as e:
+        print(f"Product search unavailable (SQLite built without FTS5?): {e}")
+
+def migration_stock_reservations(cur):
+    # Stock reserved by orders that aren't completed or cancelled yet
+    create_reservation_table(cur.connection)
+
+# Lookup indexes for the per-user, per-order and per-post queries.
+# benchmarks/check_query_plans.py fails if a query in this file scans a table
+# it shouldn't. Each migration step creates its own tuple of indexes; a shipped
+# step's tuple is frozen: new indexes go in a new tuple, created by a new step
+LOOKUP_INDEXES = (
+    ('idx_orders_username', 'orders', 'username, created_at'),
+    ('idx_order_items_order', 'order_items', 'order_id'),
+    ('idx_order_items_product', 'order_items', 'product_id'),
+    ('idx_product_ratings_product', 'product_ratings', 'product_id, created_at'),
+    ('idx_farmer_notifications_farmer', 'farmer_order_notifications', 'farmer_username, created_at'),
+    ('idx_farmer_notifications_order', 'farmer_order_notifications', 'order_id'),
+    ('idx_community_replies_post', 'community_replies', 'post_id'),
+    ('idx_soil_test_bookings_username', 'soil_test_bookings', 'username'),
+    ('idx_soil_test_reports_booking', 'soil_test_reports', 'booking_id'),
+)
+
+def migration_indexes(cur):
+    # Replaced by idx_farmer_notifications_farmer (used to be created by the notifications route)
+    cur.execute("DROP INDEX IF EXISTS idx_farmer_notifications")
+    create_indexes(cur, LOOKUP_INDEXES)
+
+# Columns written as IST 'dd-mm-YYYY HH:MM:SS' text before timestamps were stored as UTC
+LEGACY_IST_TIMESTAMP_COLUMNS = (
+    ('orders', 'created_at'),
+    ('farmer_order_notifications', 'created_at'),
+    ('customer_feedback', 'created_at'),
+    ('soil_test_bookings', 'created_at'),
+    ('soil_test_reports', 'completed_at'),
+    ('community_posts', 'created_at'),
+    ('community_replies', 'created_at'),
+)
+
+UTC_TIMESTAMP_INDEXES = (
+    ('idx_orders_created_at', 'orders', 'created_at'),
+)
+
+def migration_utc_timestamps(cur):
+    # Rewrite IST 'dd-mm-YYYY HH:MM:SS' values as UTC 'YYYY-MM-DD HH:MM:SS', which
+    # sorts and range-compares correctly as text; anything else is left alone
+    for table, column in LEGACY_IST_TIMESTAMP_COLUMNS:
+        cur.execute(f'''
+            UPDATE {table}
+            SET {column} = COALESCE(datetime(substr({column}, 7, 4) || '-' || substr({column}, 4, 2) || '-' ||
+                                             substr({column}, 1, 2) || ' ' || substr({column}, 12, 8),
+                                             '-330 minutes'), {column})
+            WHERE {column} LIKE '__-__-____ __:__:__'
+        ''')
+        if cur.rowcount:
+            print(f"Converted {cur.rowcount} {table}.{column} values to UTC")
+    # Notifications written without a time take their order's
+    cur.execute('''
+        UPDATE farmer_order_notifications
+        SET created_at = (SELECT o.created_at FROM orders o WHERE o.id = farmer_order_notifications.order_id)
+        WHERE created_at IS NULL
+    ''')
+    create_indexes(cur, UTC_TIMESTAMP_INDEXES)
+
+def migration_idempotency_keys(cur):
+    # Idempotency-Key records for the order endpoints
+    create_idempotency_table(cur.connection)
+
+def migration_id_blocks(cur):
+    # Blocks of ID numbers handed out to each process by IdGenerator
+    create_id_table(cur.connection)
+
+def migration_order_stats(cur):
+    # Per-customer order totals for the profile header, maintained by triggers
+    create_order_stats_table(cur.connection)
+
+PINCODE_ORDER_STATS_INDEXES = (
+    # Same expression as order_stats.PINCODE_KEY: one admin dashboard pincode's orders by id
+    ('idx_orders_pincode', 'orders', "COALESCE(pincode, '')"),
+)
+
+def migration_pincode_order_stats(cur):
+    # Per-pincode order counts for the admin dashboard, maintained by triggers
+    create_pincode_order_stats_table(cur.connection)
+    create_indexes(cur, PINCODE_ORDER_STATS_INDEXES)
+
+def migration_order_created_at(cur):
+    # Orders and notifications with no usable created_at sorted before MIN_TIMESTAMP, so
+    # every date-ranged listing and (created_at, id) page skipped them. They're marked
+    # UNKNOWN_TIMESTAMP instead: listed last when a range has no start, shown with no time
+    for trigger in ('trg_orders_insert_stats', 'trg_orders_update_stats', 'trg_orders_delete_stats'):
+        cur.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cur.execute('UPDATE orders SET created_at = ? WHERE created_at IS NULL OR created_at < ?',
+                (UNKNOWN_TIMESTAMP, UNKNOWN_TIMESTAMP))
+    if cur.rowcount:
+        print(f"Marked {cur.rowcount} orders with no created_at as unknown time")
+    cur.execute('''
+        UPDATE farmer_order_notifications
+        SET created_at = COALESCE((SELECT o.created_at FROM orders o WHERE o.id = farmer_order_notifications.order_id), ?)
+        WHERE created_at IS NULL OR created_at < ?
+    ''', (UNKNOWN_TIMESTAMP, UNKNOWN_TIMESTAMP))
+    # Recreate the stats triggers (they leave unknown times out of first_order_at) and refill
+    create_order_stats_table(cur.connection)
+
+def migration_reservation_expiry(cur):
+    # Only an orphaned reservation (its order deleted or cancelled) gets an expiry,
+    # so the checkout sweep no longer rescans every pending order's under the write lock
+    cur.execute('PRAGMA table_info(stock_reservations)')
+    if any(name == 'expires_at' and notnull for _, name, _, notnull, _, _ in cur.fetchall()):
+        # expires_at was NOT NULL: rebuild the table with the current layout
+        cur.execute('ALTER TABLE stock_reservations RENAME TO stock_reservations_old')
+        cur.execute('DROP INDEX IF EXISTS idx_stock_reservations_order')
+        cur.execute('DROP INDEX IF EXISTS idx_stock_reservations_expiry')
+        create_reservation_table(cur.connection)
+        cur.execute('''
+            INSERT INTO stock_reservations (id, order_id, product_id, quantity, status, created_at, expires_at)
+            SELECT id, order_id, product_id, quantity, status, created_at, expires_at FROM stock_reservations_old
+        ''')
+        cur.execute('DROP TABLE stock_reservations_old')
+    cur.execute('''
+        UPDATE stock_reservations SET expires_at = NULL
+        WHERE expires_at IS NOT NULL
+          AND order_id IN (SELECT id FROM orders WHERE status IS NOT 'cancelled')
+    ''')
+    for trigger, event, order in (('trg_orders_cancel_reservations',
+                                   "AFTER UPDATE OF status ON orders WHEN NEW.status = 'cancelled'", 'NEW'),
+                                  ('trg_orders_delete_reservations', 'AFTER DELETE ON orders', 'OLD')):
+        cur.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {trigger} {event}
+            BEGIN
+                UPDATE stock_reservations SET expires_at = created_at + {RESERVATION_TTL_SECONDS}
+                WHERE order_id = {order}.id AND status = 'reserved';
+            END
+        ''')
+
+def migration_farm_supply_images(cur):
+    # Step 2 only moved farmer_products images; farm_supplies kept theirs inline
+    migrated = migrate_inline_images(cur.connection, product_image_store)
+    if migrated:
+        print(f"Moved {migrated} inline product images to the image store")
+
+def migration_catalog_stock_changes(cur):
+    # Log farmer_products updates that only change stock as 'stock' entries, which
+    # the catalog patches in place instead of rebuilding its listing snapshots
+    unchanged = ' AND '.join(f'OLD.{column} IS NEW.{column}' for column in
+                             (column.strip() for column in HOME_PRODUCT_COLUMNS.split(','))
+                             if column != 'stock')
+    cur.execute("DROP TRIGGER IF EXISTS trg_farmer_products_update_changes")
+    cur.execute(f'''
+        CREATE TRIGGER trg_farmer_products_update_changes AFTER UPDATE ON farmer_products
+        BEGIN
+            INSERT INTO catalog_changes (source, key)
+                VALUES (CASE WHEN {unchanged} THEN '{CHANGE_STOCK}' ELSE '{SOURCE_HOME}' END, NEW.product_id);
+            INSERT INTO catalog_changes (source, key)
+                SELECT '{SOURCE_HOME}', OLD.product_id WHERE OLD.product_id <> NEW.product_id;
+        END
+    ''')
+
+# Every index the steps declare; check_query_plans.py checks a migrated database has them all
+SCHEMA_INDEXES = LOOKUP_INDEXES + UTC_TIMESTAMP_INDEXES + PINCODE_ORDER_STATS_INDEXES
+
+# Append new steps at the end; never edit or reorder a shipped one
+SCHEMA_MIGRATIONS = [
+    (1, 'base schema', migration_base_schema),
+    (2, 'SQLite product catalog', migration_catalog),
+    (3, 'product search index', migration_search_index),
+    (4, 'stock reservations', migration_stock_reservations),
+    (5, 'lookup indexes', migration_indexes),
+    (6, 'UTC timestamps', migration_utc_timestamps),
+    (7, 'idempotency keys', migration_idempotency_keys),
+    (8, 'ID blocks', migration_id_blocks),
+    (9, 'customer order stats', migration_order_stats),
+    (10, 'pincode order stats', migration_pincode_order_stats),
+    (11, 'order time backfill', migration_order_created_at),
+    (12, 'reservation expiry', migration_reservation_expiry),
+    (13, 'farm supply images', migration_farm_supply_images),
+    (14, 'catalog stock changes', migration_catalog_stock_changes),
+]
+
+# Initialize SQLite database
+def init_db():
+    for version, description in migrate(DB_PATH, SCHEMA_MIGRATIONS):
+        print(f"Applied schema migration {version}: {description}")
 
 def get_user_details(username: str):
     """Fetch user details by username from user_details table."""
     if not username:
         return None
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cur = conn.cursor()
     cur.execute('SELECT name, address, pincode, phone, username, login_type FROM user_details WHERE username = ?', (username,))
     row = cur.fetchone()
@@ -295,7 +616,7 @@ def get_user_details(username: str):
     }
 
 def get_Farmers_rating(Farmers_username):
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute('''
         SELECT AVG(rating) as avg_rating, COUNT(rating) as total_ratings 
@@ -315,9 +636,6 @@ def initialize_Farmers_notifications():
     conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
     
-    # First ensure the collectors table exists
-    init_db()
-    
     cursor.execute('SELECT username FROM Farmers')
     for row in cursor.fetchall():
         Farmers_notifications[row[0]] = []
@@ -328,14 +646,13 @@ admin_notifications = []
 
 def notify_admin_new_farmer(username, name):
     """Notify second admin about new farmer registration"""
-    date_str, time_str = get_current_time()
     notification = {
         'id': len(admin_notifications) + 1,
         'type': 'new_farmer',
         'username': username,
         'name': name,
         'message': f'New farmer registered: {name} ({username})',
-        'timestamp': f'{date_str} {time_str}',
+        'timestamp': utc_timestamp(),
         'read': False
     }
     admin_notifications.append(notification)
@@ -343,7 +660,6 @@ def notify_admin_new_farmer(username, name):
 
 def notify_admin_soil_test(username, name, booking_id, test_type):
     """Notify admin2 about soil test booking"""
-    date_str, time_str = get_current_time()
     notification = {
         'id': len(admin_notifications) + 1,
         'type': 'soil_test',
@@ -352,7 +668,7 @@ def notify_admin_soil_test(username, name, booking_id, test_type):
         'booking_id': booking_id,
         'test_type': test_type,
         'message': f'Soil test booked by {name}: {test_type} (ID: {booking_id})',
-        'timestamp': f'{date_str} {time_str}',
+        'timestamp': utc_timestamp(),
         'read': False
     }
     admin_notifications.append(notification)
@@ -370,15 +686,7 @@ def home():
             return redirect(url_for('load_products'))
     
     # Load JSON products
-    all_products = []
-    try:
-        data_path = os.path.join(os.path.dirname(__file__), 'products.json')
-        with open(data_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            products = data.get('products', []) if isinstance(data, dict) else data
-            all_products.extend(products)
-    except:
-        pass
+    all_products = list(product_catalog.products())
 
     # pass user details (if logged in) to template
     user = get_user_details(session.get('username')) if session.get('username') else None
@@ -412,7 +720,7 @@ def signup_post():
         if not username or not password:
             return "Username and password are required!", 400
 
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db()
         cur = conn.cursor()
 
         # Check duplicate username
@@ -475,7 +783,7 @@ def login_post():
             session['login_type'] = 'admin'
             return redirect(url_for('admin_panel'))
 
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db()
         cur = conn.cursor()
 
         # Check credentials (users table only has username and password)
@@ -518,6 +826,15 @@ def logout():
     session.clear()
     return redirect(url_for('home'))
 
+@app.route('/product-images/<filename>')
+def product_image(filename):
+    # Images are content-addressed, so a given URL never changes
+    if not IMAGE_NAME_RE.match(filename):
+        abort(404)
+    response = send_from_directory(PRODUCT_IMAGE_FOLDER, filename, max_age=31536000)
+    response.cache_control.immutable = True
+    return response
+
 @app.route('/products.xlsx')
 def products_xlsx():
     # Serve the products.xlsx file from project root so the client can fetch it
@@ -527,18 +844,7 @@ def products_xlsx():
 @app.route('/farmers2.html')
 def load_products():
     # Load farm product list from `farm_product.json` and pass to template
-    try:
-        data_path = os.path.join(os.path.dirname(__file__), 'farm_product.json')
-        with open(data_path, 'r', encoding='utf-8') as f:
-            farm_products = json.load(f)
-            # farm_product.json is expected to be an array of product objects
-            if isinstance(farm_products, dict):
-                # defensively handle object-wrapped arrays
-                products = farm_products.get('products', [])
-            else:
-                products = farm_products
-    except Exception:
-        products = []
+    products = product_catalog.farm_products()
 
     user = get_user_details(session.get('username')) if session.get('username') else None
     return render_template('farmers2.html', products=products, user=user)
@@ -579,6 +885,23 @@ def fast_delivery():
     return render_template('30-min.html', user=user, source=source)
 
 
+@app.route('/api/fast-delivery')
+def api_fast_delivery():
+    """Products deliverable within 30 minutes to the logged-in user's pincode"""
+    if not session.get('username'):
+        return jsonify({'success': False, 'message': 'Please login first'}), 401
+    
+    user = get_user_details(session.get('username'))
+    pincode = (user or {}).get('pincode')
+    if not pincode:
+        return jsonify({'success': True, 'pincode': None, 'products': []})
+    
+    # 'home' for the home catalog, 'farmers' for farm supplies
+    source = SOURCE_FARM if request.args.get('source') == 'farmers' else SOURCE_HOME
+    products = product_catalog.products_for_pincode(pincode, source)
+    return jsonify({'success': True, 'pincode': pincode, 'products': products})
+
+
 @app.route('/profile.html')
 def profile():
     # Show user profile with order history
@@ -591,116 +914,65 @@ def profile():
     if not user:
         return redirect(url_for('login'))
     
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
+    conn = get_db()
     
     # Get soil test bookings if user is a farmer
     soil_tests = []
     if user.get('login_type', '').lower() == 'farmer':
-        cur.execute('''
-            SELECT id, booking_id, farm_location, farm_size, contact_number, 
-                   preferred_date, test_type, status, created_at
-            FROM soil_test_bookings
-            WHERE username = ?
-            ORDER BY id DESC
-        ''', (username,))
-        
-        soil_test_data = cur.fetchall()
-        for st in soil_test_data:
-            soil_tests.append({
-                'id': st[0],
-                'booking_id': st[1],
-                'farm_location': st[2],
-                'farm_size': st[3],
-                'contact_number': st[4],
-                'preferred_date': st[5],
-                'test_type': st[6],
-                'status': st[7],
-                'created_at': st[8]
-            })
+        soil_tests = USER_SOIL_TEST_BOOKINGS.records(conn, (username,))
     
-    # Get all orders for the user
-    cur.execute('''
-        SELECT id, order_number, username, name, address, pincode, phone, 
-               total_amount, status, created_at, payment_method, otp
-        FROM orders
-        WHERE username = ?
-        ORDER BY id DESC
-    ''', (username,))
-    
-    orders_data = cur.fetchall()
-    
-    # Get order items for each order
-    orders = []
-    total_spent = 0
-    pending_count = 0
-    completed_count = 0
-    
-    for order in orders_data:
-        order_id = order[0]
-        
-        # Get items for this order
-        cur.execute('''
-            SELECT product_name, quantity, price
-            FROM order_items
-            WHERE order_id = ?
-        ''', (order_id,))
-        
-        items = cur.fetchall()
-        
-        orders.append({
-            'id': order[0],
-            'order_number': order[1],
-            'username': order[2],
-            'name': order[3],
-            'address': order[4],
-            'pincode': order[5],
-            'phone': order[6],
-            'total_amount': order[7],
-            'status': order[8],
-            'created_at': order[9],
-            'payment_method': order[10],
-            'otp': order[11],
-            'item_count': len(items)
-        })
-        
-        total_spent += order[7] if order[7] else 0
-        
-        if order[8] == 'pending':
-            pending_count += 1
-        elif order[8] == 'completed':
-            completed_count += 1
-    
-    # Get member since date (first order date or account creation)
-    cur.execute('SELECT MIN(created_at) FROM orders WHERE username = ?', (username,))
-    first_order = cur.fetchone()
-    member_since = first_order[0] if first_order and first_order[0] else 'Recent'
+    # Order history with item counts (one join), header figures from the stats row
+    orders = CUSTOMER_ORDERS.records(conn, (username,))
+    stats = CUSTOMER_ORDER_STATS.one(conn, (username,), NO_ORDER_STATS)
     
     conn.close()
     
     return render_template('profile.html', 
                          user=user, 
                          orders=orders,
-                         total_orders=len(orders),
-                         pending_orders=pending_count,
-                         completed_orders=completed_count,
-                         total_spent=total_spent,
-                         member_since=member_since,
+                         total_orders=stats.order_count,
+                         pending_orders=stats.pending_orders,
+                         completed_orders=stats.completed_orders,
+                         total_spent=stats.total_spent,
+                         member_since=stats.first_order_at or 'Recent',
                          soil_tests=soil_tests)
 
 
+# Cache-Control policy per catalog endpoint: max-age in seconds.
+# Stock-bearing listings always revalidate; farm supplies change rarely.
+CATALOG_CACHE_MAX_AGE = {
+    'api_products': 300,
+    'api_home_products': 0,
+    'get_products_by_category': 0,
+    'api_product_listing': 0,
+}
+
+def catalog_response(build_response):
+    """Serve a catalog payload with a strong ETag and conditional GET.
+
+    The ETag comes from the catalog version, so a matching If-None-Match is
+    answered with 304 without building or serializing the payload.
+    """
+    etag = product_catalog.etag(request.endpoint)
+    if etag and request.if_none_match.contains_weak(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.make_response(build_response())
+        if response.status_code != 200:
+            return response
+    if etag:
+        response.set_etag(etag)
+    max_age = CATALOG_CACHE_MAX_AGE.get(request.endpoint, 0)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if not max_age:
+        response.cache_control.no_cache = True
+    return response
+
 @app.route('/api/products')
 def api_products():
     # Return products from farm_product.json
-    try:
-        data_path = os.path.join(os.path.dirname(__file__), 'farm_product.json')
-        with open(data_path, 'r', encoding='utf-8') as f:
-            products = json.load(f)
-    except Exception as e:
-        # If file missing or invalid, return empty list with error info
-        return jsonify({"error": str(e), "products": []}), 500
-
-    return jsonify(products)
+    return catalog_response(lambda: jsonify(product_catalog.farm_products()))
 
 
 @app.route('/api/feedback', methods=['POST'])
@@ -719,25 +991,18 @@ def submit_feedback():
         if not name or not email or rating < 1 or rating > 5:
             return jsonify({'success': False, 'message': 'Please provide name, email, and a valid rating (1-5)'}), 400
         
-        # Get current IST time
-        date_str, time_str = get_current_time()
-        created_at = f"{date_str} {time_str}"
-        
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
+        created_at = utc_timestamp()
         
-        cur.execute(
+        write = write_queue.execute(
             '''INSERT INTO customer_feedback (name, email, phone, rating, message, page_source, created_at)
                VALUES (?, ?, ?, ?, ?, ?, ?)''',
             (name, email, phone, rating, message, page_source, created_at)
         )
         
-        conn.commit()
-        feedback_id = cur.lastrowid
-        conn.close()
-        
-        return jsonify({'success': True, 'message': 'Thank you for your feedback!', 'feedback_id': feedback_id})
+        return jsonify({'success': True, 'message': 'Thank you for your feedback!', 'feedback_id': write.lastrowid})
         
+    except WriteQueueFull:
+        return jsonify({'success': False, 'message': WRITE_QUEUE_FULL_MESSAGE}), 503
     except Exception as e:
         print(f"Feedback error: {e}")
         return jsonify({'success': False, 'message': 'Could not save feedback'}), 500
@@ -745,49 +1010,86 @@ def submit_feedback():
 
 @app.route('/api/home-products')
 def api_home_products():
-    # Return products from products.json
-    all_products = []
-    seller_cache = {}
+    # Home products with seller details, maintained by the catalog
+    return catalog_response(lambda: jsonify(product_catalog.home_view()))
+
+
+@app.route('/api/product-listing')
+def api_product_listing():
+    """Paginated home product listing with server-side filters and sorting"""
+    args = request.args
+    sort = args.get('sort', 'default')
+    if sort not in ListingIndex.SORT_KEYS:
+        return jsonify({'success': False, 'message': f"Unknown sort '{sort}'. Use one of: {', '.join(ListingIndex.SORT_KEYS)}"}), 400
     
-    # Load JSON products
     try:
-        data_path = os.path.join(os.path.dirname(__file__), 'products.json')
-        with open(data_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            products = data.get('products', []) if isinstance(data, dict) else data
-            for product in products:
-                enriched = dict(product)
-                seller_username = enriched.get('seller_username')
-                if seller_username:
-                    if seller_username not in seller_cache:
-                        seller_cache[seller_username] = get_user_details(seller_username)
-                    seller_info = seller_cache.get(seller_username)
-                    if seller_info:
-                        if not enriched.get('farmer'):
-                            enriched['farmer'] = seller_info.get('name', seller_username)
-                        enriched['pincode'] = seller_info.get('pincode', '')
-                        if seller_info.get('address') and not enriched.get('location'):
-                            enriched['location'] = seller_info['address']
-                all_products.append(enriched)
-    except Exception as e:
-        print(f"Error loading products.json: {e}")
+        limit = min(max(int(args.get('limit', 20)), 1), 100)
+        min_price = float(args['min_price']) if args.get('min_price') else None
+        max_price = float(args['max_price']) if args.get('max_price') else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'limit, min_price and max_price must be numbers'}), 400
+    
+    try:
+        after = decode_cursor(args['cursor'], sort) if args.get('cursor') else None
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    filters = {
+        'category': args.get('category') or None,
+        'pincode': args.get('pincode') or None,
+        'seller': args.get('seller') or None,
+        'in_stock': (args.get('in_stock') or '').lower() in {'1', 'true', 'yes'},
+        'min_price': min_price,
+        'max_price': max_price,
+    }
+    
+    def build():
+        products, next_position = product_catalog.listing().query(sort=sort, after=after, limit=limit, **filters)
+        return jsonify({
+            'success': True,
+            'products': products,
+            'count': len(products),
+            'next_cursor': encode_cursor(sort, next_position) if next_position else None
+        })
+    
+    return catalog_response(build)
 
-    return jsonify(all_products)
 
+# Newest matches ranked per search (see search.py); 0 ranks every match, slower for broad queries
+SEARCH_RANKED_MATCHES = int(os.environ.get('SEARCH_RANKED_MATCHES', SEARCH_CANDIDATES)) or None
 
-@app.route('/api/products/<product_id>')
-def api_product(product_id):
+
+@app.route('/api/search')
+def api_search():
+    """Full-text product search over name, category, description and farmer name"""
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'success': False, 'message': 'Search query is required'}), 400
+    
     try:
-        data_path = os.path.join(os.path.dirname(__file__), 'farm_product.json')
-        with open(data_path, 'r', encoding='utf-8') as f:
-            products = json.load(f)
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'success': False, 'message': 'limit must be a number'}), 400
+    
+    # Optional source filter: 'home' products or 'farmers' supplies
+    source = {'home': SOURCE_HOME, 'farmers': SOURCE_FARM}.get(request.args.get('source'))
+    
+    conn = get_db()
+    try:
+        hits = search_products(conn, query, limit=limit, source=source, candidates=SEARCH_RANKED_MATCHES)
+    finally:
+        conn.close()
+    
+    products = product_catalog.resolve(hits)
+    return jsonify({'success': True, 'query': query, 'products': products, 'count': len(products)})
+
 
-    product = next((p for p in products if str(p.get('id')) == str(product_id)), None)
-    if not product:
+@app.route('/api/products/<product_id>')
+def api_product(product_id):
+    entry = product_catalog.lookup(product_id)
+    if not entry or entry[0] != SOURCE_FARM:
         return jsonify({"error": "Product not found"}), 404
-    return jsonify(product)
+    return jsonify(entry[1])
 
 
 @app.route('/checkout')
@@ -835,6 +1137,37 @@ def payment():
     
     return render_template('payment.html', user=user)
 
+@app.route('/api/checkout-quote', methods=['POST'])
+def checkout_quote():
+    """Subtotal, delivery fee, coupon discount and total for the payment page, at catalog prices"""
+    if not session.get('username'):
+        return jsonify({'success': False, 'message': 'Please login first'}), 401
+    
+    data = request.json or {}
+    try:
+        quote = order_service.quote(get_user_details(session.get('username')), data.get('cart', []),
+                                    coupon=data.get('coupon'))
+    except OrderError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    return jsonify(dict(quote._asdict(), success=True))
+
+def idempotency_args(data):
+    """place() keyword arguments for the request's Idempotency-Key header, if it has one."""
+    key = request.headers.get('Idempotency-Key')
+    if key is None:
+        return {}
+    if not valid_key(key):
+        raise OrderError('Invalid Idempotency-Key header')
+    return {'idempotency_key': key, 'fingerprint': request_fingerprint(request.path, data)}
+
+def order_response(order, payload):
+    """JSON response for a placed order, marked when it replays an earlier request."""
+    response = jsonify(payload)
+    if order.replayed:
+        response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
 @app.route('/create-order', methods=['POST'])
 def create_order():
     """Create order for COD payments"""
@@ -843,105 +1176,26 @@ def create_order():
             return jsonify({'success': False, 'message': 'Please login first'}), 401
         
         data = request.json
-        payment_method = data.get('payment_method')
-        amount = data.get('amount')
-        cart_items = data.get('cart', [])
-        
-        username = session.get('username')
-        user = get_user_details(username)
-        
+        user = get_user_details(session.get('username'))
         if not user:
             return jsonify({'success': False, 'message': 'User not found'}), 404
         
-        if not cart_items:
-            return jsonify({'success': False, 'message': 'Cart items missing for this order'}), 400
-        
-        # Generate order number and OTP
-        import random, string
-        order_number = 'ORD' + ''.join(random.choices(string.digits, k=8))
-        otp = ''.join(random.choices(string.digits, k=6))
-        
-        # Get current IST time
-        date_str, time_str = get_current_time()
-        created_at = f"{date_str} {time_str}"
-        
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        
-        # Insert order with payment method, OTP and IST timestamp
-        cur.execute(
-            """INSERT INTO orders (order_number, username, name, address, pincode, phone, total_amount, status, payment_method, otp, created_at) 
-               VALUES (?, ?, ?, ?, ?, ?, ?, 'pending', ?, ?, ?)""",
-            (order_number, username, user.get('name', ''), user.get('address', ''), 
-             user.get('pincode', ''), user.get('phone', ''), amount, payment_method, otp, created_at)
-        )
-        order_id = cur.lastrowid
-        
-        # Load products.json for farmer lookup
-        farmer_products = {}
-        try:
-            data_path = os.path.join(os.path.dirname(__file__), 'products.json')
-            with open(data_path, 'r', encoding='utf-8') as f:
-                json_data = json.load(f)
-                products_list = json_data.get('products', []) if isinstance(json_data, dict) else json_data
-                for p in products_list:
-                    if p.get('seller_type') == 'farmer':
-                        farmer_products[p['id']] = p['seller_username']
-        except Exception as e:
-            print(f"Error loading products.json for notifications: {e}")
-        
-        # Optimize: Batch insert order items and notifications
-        order_items_to_insert = []
-        notifications_to_insert = []
-        
-        for item in cart_items:
-            product_id = item.get('id')
-            product_name = item.get('name')
-            quantity = int(item.get('qty', 1))
-            price = float(item.get('price', 0))
-
-            order_items_to_insert.append((
-                order_id,
-                product_id,
-                product_name,
-                quantity,
-                price
-            ))
-            
-            # Check if this is a farmer product from JSON
-            farmer_username = farmer_products.get(product_id)
-            if farmer_username:
-                notifications_to_insert.append((
-                    farmer_username, order_id, product_id, product_name, quantity, 
-                    username, user.get('name', ''), 'pending', created_at, price
-                ))
-        
-        if order_items_to_insert:
-            cur.executemany(
-                """INSERT INTO order_items (order_id, product_id, product_name, quantity, price)
-                   VALUES (?, ?, ?, ?, ?)""",
-                order_items_to_insert
-            )
-        
-        if notifications_to_insert:
-            cur.executemany(
-                """INSERT INTO farmer_order_notifications 
-                   (farmer_username, order_id, product_id, product_name, quantity, 
-                    customer_username, customer_name, status, created_at, price)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                notifications_to_insert
-            )
-        
-        conn.commit()
-        conn.close()
+        order = order_service.place(get_db(), user, data.get('cart', []), status='pending',
+                                    payment_method=data.get('payment_method'),
+                                    amount=data.get('amount'), coupon=data.get('coupon'),
+                                    **idempotency_args(data))
         
-        return jsonify({
+        return order_response(order, {
             'success': True,
-            'order_id': order_id,
-            'order_number': order_number,
-            'otp': otp
+            'order_id': order.order_id,
+            'order_number': order.order_number,
+            'otp': order.otp
         })
         
+    except OrderError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except IdempotencyConflict as e:
+        return jsonify({'success': False, 'message': str(e)}), 422
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -951,99 +1205,25 @@ def verify_payment():
     data = request.json
 
     try:
+        if not session.get('username'):
+            return jsonify({'success': False, 'error': 'Please login first'}), 401
+        
         # Simulate payment verification (always successful in dummy mode)
-        # Save payment details to database if needed
-        if session.get('username'):
-            username = session.get('username')
-            user = get_user_details(username)
-            amount = data.get('amount')
-            cart_items = data.get('cart', [])
-            
-            if not cart_items:
-                return jsonify({'success': False, 'error': 'Cart items missing for this order'}), 400
-            
-            # Generate order number, payment ID and OTP
-            import random, string
-            order_number = 'ORD' + ''.join(random.choices(string.digits, k=8))
-            payment_id = data.get('razorpay_payment_id', 'DUMMY_' + ''.join(random.choices(string.digits, k=10)))
-            otp = ''.join(random.choices(string.digits, k=6))
-            
-            # Get current IST time
-            date_str, time_str = get_current_time()
-            created_at = f"{date_str} {time_str}"
-            
-            conn = sqlite3.connect(DB_PATH)
-            cur = conn.cursor()
-            
-            # Insert order with payment details, OTP and IST timestamp
-            cur.execute(
-                """INSERT INTO orders (order_number, username, name, address, pincode, phone, total_amount, status, payment_method, payment_id, otp, created_at) 
-                   VALUES (?, ?, ?, ?, ?, ?, ?, 'paid', 'Online', ?, ?, ?)""",
-                (order_number, username, user.get('name', ''), user.get('address', ''), 
-                 user.get('pincode', ''), user.get('phone', ''), amount, payment_id, otp, created_at)
-            )
-            order_id = cur.lastrowid
-            
-            # Load products.json for farmer lookup
-            farmer_products = {}
-            try:
-                data_path = os.path.join(os.path.dirname(__file__), 'products.json')
-                with open(data_path, 'r', encoding='utf-8') as f:
-                    json_data = json.load(f)
-                    products_list = json_data.get('products', []) if isinstance(json_data, dict) else json_data
-                    for p in products_list:
-                        if p.get('seller_type') == 'farmer':
-                            farmer_products[p['id']] = p['seller_username']
-            except Exception as e:
-                print(f"Error loading products.json for notifications: {e}")
-            
-            # Optimize: Batch insert order items and notifications
-            order_items_to_insert = []
-            notifications_to_insert = []
-            
-            for item in cart_items:
-                product_id = item.get('id')
-                product_name = item.get('name')
-                quantity = int(item.get('qty', 1))
-                price = float(item.get('price', 0))
-                
-                order_items_to_insert.append((
-                    order_id,
-                    product_id,
-                    product_name,
-                    quantity,
-                    price
-                ))
-                
-                # Check if this is a farmer product from JSON
-                farmer_username = farmer_products.get(product_id)
-                if farmer_username:
-                    notifications_to_insert.append((
-                        farmer_username, order_id, product_id, product_name, quantity, 
-                        username, user.get('name', ''), 'paid', created_at, price
-                    ))
-            
-            if order_items_to_insert:
-                cur.executemany(
-                    """INSERT INTO order_items (order_id, product_id, product_name, quantity, price)
-                       VALUES (?, ?, ?, ?, ?)""",
-                    order_items_to_insert
-                )
-            
-            if notifications_to_insert:
-                cur.executemany(
-                    """INSERT INTO farmer_order_notifications 
-                       (farmer_username, order_id, product_id, product_name, quantity, 
-                        customer_username, customer_name, status, created_at, price)
-                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                    notifications_to_insert
-                )
-            
-            conn.commit()
-            conn.close()
+        import random, string
+        payment_id = data.get('razorpay_payment_id', 'DUMMY_' + ''.join(random.choices(string.digits, k=10)))
+        
+        user = get_user_details(session.get('username'))
+        order = order_service.place(get_db(), user, data.get('cart', []), status='paid',
+                                    payment_method='Online', payment_id=payment_id,
+                                    amount=data.get('amount'), coupon=data.get('coupon'),
+                                    **idempotency_args(data))
 
-        return jsonify({"success": True, "otp": otp, "order_number": order_number})
+        return order_response(order, {"success": True, "otp": order.otp, "order_number": order.order_number})
 
+    except OrderError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except IdempotencyConflict as e:
+        return jsonify({'success': False, 'error': str(e)}), 422
     except Exception as e:
         return jsonify({"success": False, "error": str(e)})
 
@@ -1054,103 +1234,31 @@ def place_order():
             return jsonify({'success': False, 'message': 'Please login first'}), 401
         
         data = request.get_json()
-        cart_items = data.get('cart', [])
-        
-        if not cart_items:
-            return jsonify({'success': False, 'message': 'Cart is empty'}), 400
-        
-        username = session.get('username')
-        user = get_user_details(username)
-        
-        if not user or not user.get('name') or not user.get('address') or not user.get('phone') or not user.get('pincode'):
-            return jsonify({'success': False, 'message': 'Please complete your delivery details'}), 400
-        
-        # Calculate total
-        total = sum((float(item.get('price', 0)) * int(item.get('qty', 1))) for item in cart_items)
-        
-        # Generate order number
-        import random, string
-        order_number = 'ORD' + ''.join(random.choices(string.digits, k=8))
-        
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        
-        # Insert order
-        cur.execute(
-            """INSERT INTO orders (order_number, username, name, address, pincode, phone, total_amount, status) 
-               VALUES (?, ?, ?, ?, ?, ?, ?, 'pending')""",
-            (order_number, username, user['name'], user['address'], user['pincode'], user['phone'], total)
-        )
-        order_id = cur.lastrowid
-        
-        # Insert order items and notify farmers
-        date_str, time_str = get_current_time()
-        created_at = f"{date_str} {time_str}"
-        
-        # Load products.json for farmer lookup
-        farmer_products = {}
-        try:
-            data_path = os.path.join(os.path.dirname(__file__), 'products.json')
-            with open(data_path, 'r', encoding='utf-8') as f:
-                json_data = json.load(f)
-                products_list = json_data.get('products', []) if isinstance(json_data, dict) else json_data
-                for p in products_list:
-                    if p.get('seller_type') == 'farmer':
-                        farmer_products[p['id']] = p['seller_username']
-        except Exception as e:
-            print(f"Error loading products.json for notifications: {e}")
-        
-        # Optimize: Batch insert order items and notifications
-        order_items_to_insert = []
-        notifications_to_insert = []
-        
-        for item in cart_items:
-            product_id = item.get('id')
-            product_name = item.get('name')
-            quantity = item.get('qty', 1)
-            price = item.get('price')
-            
-            order_items_to_insert.append((order_id, product_id, product_name, quantity, price))
-            
-            # Check if this is a farmer product from JSON
-            farmer_username = farmer_products.get(product_id)
-            if farmer_username:
-                notifications_to_insert.append((
-                    farmer_username, order_id, product_id, product_name, quantity, 
-                    username, user['name'], 'pending', created_at, price
-                ))
-        
-        # Batch insert order items
-        if order_items_to_insert:
-            cur.executemany(
-                """INSERT INTO order_items (order_id, product_id, product_name, quantity, price)
-                   VALUES (?, ?, ?, ?, ?)""",
-                order_items_to_insert
-            )
-            
-        # Batch insert notifications
-        if notifications_to_insert:
-            cur.executemany(
-                """INSERT INTO farmer_order_notifications 
-                   (farmer_username, order_id, product_id, product_name, quantity, 
-                    customer_username, customer_name, status, created_at, price)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                notifications_to_insert
-            )
+        user = get_user_details(session.get('username'))
         
-        conn.commit()
-        conn.close()
+        # Total is the sum of the catalog-priced items
+        order = order_service.place(get_db(), user, data.get('cart', []), status='pending',
+                                    **idempotency_args(data))
         
-        return jsonify({
+        return order_response(order, {
             'success': True,
             'message': 'Order placed successfully!',
-            'order_number': order_number
+            'order_number': order.order_number
         })
         
+    except OrderError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except IdempotencyConflict as e:
+        return jsonify({'success': False, 'message': str(e)}), 422
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
+def admin_pincode_stats(conn):
+    """Order counts per pincode for the admin dashboard, from pincode_order_stats."""
+    return PINCODE_ORDER_STATS.records(conn)
+
+
 @app.route('/admin')
 @app.route('/admin.html')
 def admin_panel():
@@ -1170,41 +1278,12 @@ def admin_panel():
         if not user:
             return redirect(url_for('login'))
     
-    # Get all orders grouped by pincode
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    cur.execute('''
-        SELECT id, order_number, username, name, address, pincode, phone, 
-               total_amount, status, created_at, payment_method, otp
-        FROM orders
-        ORDER BY id DESC
-    ''')
-    orders = cur.fetchall()
-    
-    # Group orders by pincode
-    orders_by_pincode = {}
-    for order in orders:
-        pincode = order[5] or 'No Pincode'
-        if pincode not in orders_by_pincode:
-            orders_by_pincode[pincode] = []
-        orders_by_pincode[pincode].append({
-            'id': order[0],
-            'order_number': order[1],
-            'username': order[2],
-            'name': order[3],
-            'address': order[4],
-            'pincode': order[5],
-            'phone': order[6],
-            'total_amount': order[7],
-            'status': order[8],
-            'created_at': order[9],
-            'payment_method': order[10],
-            'otp': order[11]
-        })
-    
-    # Count pending orders and total orders
-    pending_count = sum(1 for order in orders if order[8] == 'pending')
-    total_orders = len(orders)
+    # Order counts per pincode; the page loads the orders themselves a page at a
+    # time from /api/admin/pincode-orders
+    conn = get_db()
+    pincode_stats = admin_pincode_stats(conn)
+    pending_count = sum(stats.pending_orders for stats in pincode_stats)
+    total_orders = sum(stats.order_count for stats in pincode_stats)
     
     # Get notifications for admin2
     notifications = []
@@ -1214,30 +1293,7 @@ def admin_panel():
         notifications = sorted(admin_notifications, key=lambda n: n.get('id', 0), reverse=True)
         
         # Get all soil test bookings
-        cur.execute('''
-            SELECT st.id, st.booking_id, st.username, st.farm_location, st.farm_size, 
-                   st.contact_number, st.preferred_date, st.test_type, st.status, st.created_at,
-                   ud.name
-            FROM soil_test_bookings st
-            LEFT JOIN user_details ud ON st.username = ud.username
-            ORDER BY st.id DESC
-        ''')
-        
-        bookings_data = cur.fetchall()
-        for booking in bookings_data:
-            soil_test_bookings.append({
-                'id': booking[0],
-                'booking_id': booking[1],
-                'username': booking[2],
-                'farm_location': booking[3],
-                'farm_size': booking[4],
-                'contact_number': booking[5],
-                'preferred_date': booking[6],
-                'test_type': booking[7],
-                'status': booking[8],
-                'created_at': booking[9],
-                'farmer_name': booking[10] or booking[2]
-            })
+        soil_test_bookings = ALL_SOIL_TEST_BOOKINGS.records(conn)
     
     conn.close()
     
@@ -1251,7 +1307,7 @@ def admin_panel():
         dealers_data = {}
     
     return render_template('admin.html', 
-                         orders_by_pincode=orders_by_pincode, 
+                         pincode_stats=pincode_stats, 
                          pending_count=pending_count,
                          total_orders=total_orders,
                          user=user,
@@ -1272,48 +1328,26 @@ def update_order_status():
     if not order_id or not status:
         return jsonify({'success': False, 'message': 'Invalid data'}), 400
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cur = conn.cursor()
     
     try:
-        # Check payment method before updating
-        cur.execute('SELECT payment_method FROM orders WHERE id = ?', (order_id,))
+        # Check payment method and current status before updating
+        cur.execute('SELECT payment_method, status FROM orders WHERE id = ?', (order_id,))
         result = cur.fetchone()
-        payment_method = result[0] if result else None
+        payment_method, previous_status = result if result else (None, None)
         
         cur.execute('UPDATE orders SET status = ? WHERE id = ?', (status, order_id))
         
-        # If order is completed, reduce stock for farmer products
+        # If order is completed, its stock is sold (once)
         if status == 'completed':
-            # Get all order items
-            cur.execute(
-                'SELECT product_id, quantity FROM order_items WHERE order_id = ?',
-                (order_id,)
-            )
-            order_items = cur.fetchall()
-            
-            # Update stock in products.json
-            try:
-                json_path = os.path.join(os.path.dirname(__file__), 'products.json')
-                with open(json_path, 'r', encoding='utf-8') as f:
-                    json_data = json.load(f)
-                
-                products_list = json_data.get('products', []) if isinstance(json_data, dict) else json_data
-                
-                for product_id, quantity in order_items:
-                    # Find and update the product stock
-                    for p in products_list:
-                        if p.get('id') == product_id and p.get('seller_type') == 'farmer':
-                            if p.get('stock', 0) >= quantity:
-                                p['stock'] -= quantity
-                            break
-                
-                # Write back to file
-                with open(json_path, 'w', encoding='utf-8') as f:
-                    json.dump(json_data, f, indent=2)
-                    
-            except Exception as e:
-                print(f"Error updating stock in products.json: {e}")
+            if previous_status != 'completed':
+                try:
+                    commit_order_stock(cur, order_id)
+                except InsufficientStock as e:
+                    conn.rollback()
+                    conn.close()
+                    return jsonify({'success': False, 'message': f"Can't complete the order. {e}"}), 409
             
             # Update farmer notifications status to completed (keep for earnings tracking)
             cur.execute(
@@ -1321,14 +1355,16 @@ def update_order_status():
                 (status, order_id)
             )
         
-        # If order is cancelled, update farmer notifications
+        # If order is cancelled, return its reserved stock and update farmer notifications
         if status == 'cancelled':
+            release_order_stock(cur, order_id)
             cur.execute(
                 'UPDATE farmer_order_notifications SET status = ? WHERE order_id = ?',
                 (status, order_id)
             )
         
         conn.commit()
+        catalog_exporter.schedule()
         conn.close()
         
         response = {
@@ -1359,7 +1395,7 @@ def update_soil_test_status():
     if not booking_id or not status:
         return jsonify({'success': False, 'message': 'Invalid data'}), 400
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cur = conn.cursor()
     
     try:
@@ -1403,13 +1439,11 @@ def complete_soil_test():
     if not all([ph_level, nitrogen, phosphorus, potassium]):
         return jsonify({'success': False, 'message': 'pH, Nitrogen, Phosphorus, and Potassium are required'}), 400
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cur = conn.cursor()
     
     try:
-        # Get current time
-        date_str, time_str = get_current_time()
-        completed_at = f"{date_str} {time_str}"
+        completed_at = utc_timestamp()
         
         # Insert soil test report
         cur.execute('''
@@ -1438,7 +1472,7 @@ def complete_soil_test():
 @app.route('/download-soil-report/<booking_id>')
 def download_soil_report(booking_id):
     """Generate and return soil test report as HTML (can be printed/saved as PDF)"""
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cur = conn.cursor()
     
     try:
@@ -1514,7 +1548,7 @@ def download_soil_report(booking_id):
                     <div class="field"><strong>Farm Location:</strong> {booking[3]}</div>
                     <div class="field"><strong>Farm Size:</strong> {booking[4]} acres</div>
                     <div class="field"><strong>Contact:</strong> {booking[5]}</div>
-                    <div class="field"><strong>Test Date:</strong> {report[9]}</div>
+                    <div class="field"><strong>Test Date:</strong> {format_ist(report[9])}</div>
                 </div>
             </div>
             
@@ -1554,7 +1588,7 @@ def download_soil_report(booking_id):
             
             <div class="footer">
                 <p><strong>AgriConnect - Connecting Farmers to Markets</strong></p>
-                <p>This report was generated on {report[9]}</p>
+                <p>This report was generated on {format_ist(report[9])}</p>
                 <button class="no-print" onclick="window.print()" style="padding: 10px 20px; background: #2e7d32; color: white; border: none; border-radius: 5px; cursor: pointer;">
                     🖨️ Print / Save as PDF
                 </button>
@@ -1594,7 +1628,7 @@ def update_user_details():
             return jsonify({'success': False, 'message': 'Phone number must be 10 digits'}), 400
         
         username = session.get('username')
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db()
         cur = conn.cursor()
         
         # Update user details
@@ -1620,37 +1654,17 @@ def update_user_details():
 @app.route('/product/<product_id>')
 def product_page(product_id):
     # Render a product detail page by id
-    # Check both products.json and farm_product.json
-    product = None
-    
-    # First check products.json (home page products)
-    try:
-        data_path = os.path.join(os.path.dirname(__file__), 'products.json')
-        with open(data_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            products = data.get('products', []) if isinstance(data, dict) else data
-            product = next((p for p in products if str(p.get('id')) == str(product_id)), None)
-    except Exception:
-        pass
-    
-    # If not found, check farm_product.json (farmers page products)
-    if not product:
-        try:
-            data_path = os.path.join(os.path.dirname(__file__), 'farm_product.json')
-            with open(data_path, 'r', encoding='utf-8') as f:
-                products = json.load(f)
-                product = next((p for p in products if str(p.get('id')) == str(product_id)), None)
-        except Exception:
-            pass
-    
-    if not product:
+    # The catalog index covers both home products and farm supplies
+    entry = product_catalog.lookup(product_id)
+    if not entry:
         abort(404)
+    product = entry[1]
     
     user = get_user_details(session.get('username')) if session.get('username') else None
     username = session.get('username')
     
     # Get product ratings
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cur = conn.cursor()
     
     # Calculate average rating
@@ -1731,7 +1745,7 @@ def api_login():
     if not username or not password:
         return jsonify({'success': False, 'message': 'Username and password required'}), 400
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cursor = conn.cursor()
     cursor.execute('SELECT password FROM users WHERE username = ?', (username,))
     result = cursor.fetchone()
@@ -1764,7 +1778,7 @@ def api_signup():
     if not username or not password:
         return jsonify({'success': False, 'message': 'Username and password required'}), 400
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     cursor = conn.cursor()
     
     try:
@@ -1798,106 +1812,167 @@ def api_logout():
     return jsonify({'success': True})
 
 
+INVALID_DATE_MESSAGE = 'Invalid date: use YYYY-MM-DD or an ISO-8601 date and time'
+
+def request_date_range():
+    """[start, end) bounds from the optional ?from= and ?to= parameters (IST unless
+    they carry an offset). Raises ValueError if either can't be parsed."""
+    return date_range(request.args.get('from'), request.args.get('to'))
+
+
 @app.route('/api/profile', methods=['GET'])
 def api_profile():
-    """Get user profile with order history"""
+    """Get user profile with a page of order history.
+    
+    ?limit= orders per page (default 20, at most 100); ?cursor= is the
+    previous page's next_cursor, the id of the last order it returned.
+    """
     if not session.get('username'):
         return jsonify({'success': False}), 401
     
     username = session.get('username')
+    try:
+        start, end = request_date_range()
+    except ValueError:
+        return jsonify({'success': False, 'message': INVALID_DATE_MESSAGE}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+        cursor_id = int(request.args['cursor']) if request.args.get('cursor') else None
+    except ValueError:
+        return jsonify({'success': False, 'message': 'limit and cursor must be numbers'}), 400
     
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = get_db()
     cur = conn.cursor()
     
-    # Get all orders for the user
-    cur.execute('''
-        SELECT id, order_number, username, name, address, pincode, phone, 
-               total_amount, status, created_at 
-        FROM orders 
-        WHERE username = ?
-        ORDER BY created_at DESC
-    ''', (username,))
-    
-    orders = []
-    total_spent = 0
-    pending_count = 0
-    completed_count = 0
-    
-    for order in cur.fetchall():
-        # Get item count for this order
-        cur.execute('SELECT COUNT(*) FROM order_items WHERE order_id = ?', (order['id'],))
-        item_count = cur.fetchone()[0]
-        
-        orders.append({
-            'id': order['id'],
-            'order_number': order['order_number'],
-            'username': order['username'],
-            'name': order['name'],
-            'address': order['address'],
-            'pincode': order['pincode'],
-            'phone': order['phone'],
-            'total_amount': order['total_amount'],
-            'status': order['status'],
-            'created_at': order['created_at'],
-            'item_count': item_count
-        })
-        
-        total_spent += order['total_amount']
-        if order['status'] == 'pending':
-            pending_count += 1
-        elif order['status'] == 'completed':
-            completed_count += 1
+    # Orders are listed newest first by (created_at, id); the page starts after the cursor order
+    after = (end, 0)
+    if cursor_id is not None:
+        cur.execute('SELECT created_at FROM orders WHERE id = ? AND username = ?', (cursor_id, username))
+        cursor_order = cur.fetchone()
+        if not cursor_order:
+            conn.close()
+            return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
+        after = (cursor_order[0], cursor_id)
+    
+    # One extra row tells whether there is a next page
+    orders = CUSTOMER_ORDERS_PAGE.dicts(conn, (username, start, end, *after, limit + 1))
+    next_cursor = orders[limit - 1]['id'] if len(orders) > limit else None
+    
+    if request.args.get('from') or request.args.get('to'):
+        stats = CUSTOMER_ORDER_STATS_BY_DATE.one(conn, (username, start, end))
+    else:
+        stats = CUSTOMER_ORDER_STATS.one(conn, (username,), NO_ORDER_STATS)
     
     conn.close()
     
     return jsonify({
         'success': True,
-        'orders': orders,
-        'total_orders': len(orders),
-        'pending_orders': pending_count,
-        'completed_orders': completed_count,
-        'total_spent': total_spent
+        'orders': orders[:limit],
+        'next_cursor': next_cursor,
+        'total_orders': stats.order_count,
+        'pending_orders': stats.pending_orders,
+        'completed_orders': stats.completed_orders,
+        'total_spent': stats.total_spent
     })
 
 
+# ?format= values that stream /api/admin/orders as an export
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
 @app.route('/api/admin/orders', methods=['GET'])
 def api_admin_orders():
-    """Get all orders for admin"""
+    """Get all orders for admin.
+    
+    ?from= and ?to= limit them to a date range, ?status= to one status.
+    ?format=ndjson or ?format=csv streams them as an export file, read and
+    sent a batch of rows at a time, instead of one JSON document.
+    """
     if not session.get('username') or session.get('username') != 'admin':
         return jsonify({'success': False}), 403
+    try:
+        start, end = request_date_range()
+    except ValueError:
+        return jsonify({'success': False, 'message': INVALID_DATE_MESSAGE}), 400
     
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
+    export_format = request.args.get('format', 'json')
+    if export_format != 'json' and export_format not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'message': f"Unknown format '{export_format}'. Use json, ndjson or csv"}), 400
     
-    cur.execute('''
-        SELECT id, order_number, username, name, address, pincode, phone, 
-               total_amount, status, created_at 
-        FROM orders 
-        ORDER BY created_at DESC
-    ''')
+    status = request.args.get('status')
+    if status:
+        query, params = ALL_ORDERS_BY_DATE_AND_STATUS, (start, end, status)
+    else:
+        query, params = ALL_ORDERS_BY_DATE, (start, end)
     
-    orders = []
-    for order in cur.fetchall():
-        orders.append({
-            'id': order['id'],
-            'order_number': order['order_number'],
-            'username': order['username'],
-            'name': order['name'],
-            'address': order['address'],
-            'pincode': order['pincode'],
-            'phone': order['phone'],
-            'total_amount': order['total_amount'],
-            'status': order['status'],
-            'created_at': order['created_at']
-        })
+    conn = get_db()
+    if export_format in EXPORT_FORMATS:
+        # The request's connection goes back to the pool once the last chunk is sent
+        chunks = getattr(query, export_format)(conn, params)
+        response = app.response_class(stream_with_context(chunks), mimetype=EXPORT_FORMATS[export_format])
+        response.headers['Content-Disposition'] = f'attachment; filename=orders.{export_format}'
+        return response
+    
+    orders_json = query.json(conn, params)
+    conn.close()
+    
+    # Same payload as jsonify({'success': True, 'orders': [...]}), without the list of dicts
+    return app.response_class('{"success":true,"orders":' + orders_json + '}\n', mimetype='application/json')
+
+
+@app.route('/api/admin/dashboard', methods=['GET'])
+def api_admin_dashboard():
+    """Order counts per pincode for the admin dashboard"""
+    if session.get('username') not in ['admin', 'admin2']:
+        return jsonify({'success': False}), 403
+    
+    conn = get_db()
+    pincode_stats = admin_pincode_stats(conn)
+    conn.close()
+    
+    return jsonify({
+        'success': True,
+        'total_orders': sum(stats.order_count for stats in pincode_stats),
+        'pending_orders': sum(stats.pending_orders for stats in pincode_stats),
+        'pincodes': [stats._asdict() for stats in pincode_stats]
+    })
+
+
+# Above any order id: a listing without ?cursor= starts at the newest order
+FIRST_PAGE_CURSOR = 2 ** 63 - 1
+
+@app.route('/api/admin/pincode-orders', methods=['GET'])
+def api_admin_pincode_orders():
+    """A page of orders for the admin dashboard, newest first.
+    
+    ?pincode= limits it to one pincode ('' for orders without one); ?limit=
+    is the page size (default 20, at most 100) and ?cursor= the previous
+    page's next_cursor.
+    """
+    if session.get('username') not in ['admin', 'admin2']:
+        return jsonify({'success': False}), 403
     
+    pincode = request.args.get('pincode')
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+        cursor_id = int(request.args['cursor']) if request.args.get('cursor') else FIRST_PAGE_CURSOR
+    except ValueError:
+        return jsonify({'success': False, 'message': 'limit and cursor must be numbers'}), 400
+    
+    conn = get_db()
+    # One extra row tells whether there is a next page
+    if pincode is None:
+        orders = ORDERS_PAGE.dicts(conn, (cursor_id, limit + 1))
+    else:
+        orders = PINCODE_ORDERS_PAGE.dicts(conn, (pincode, cursor_id, limit + 1))
     conn.close()
     
     return jsonify({
         'success': True,
-        'orders': orders
+        'orders': orders[:limit],
+        'next_cursor': orders[limit - 1]['id'] if len(orders) > limit else None
     })
 
 
@@ -1922,7 +1997,7 @@ def submit_rating():
         
         username = session.get('username')
         
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db()
         cur = conn.cursor()
         
         # Check if user has purchased this product
@@ -1961,7 +2036,7 @@ def get_order_items(order_id):
     if not session.get('username') or session.get('username') not in ['admin', 'admin2']:
         return jsonify({'success': False, 'message': 'Unauthorized'}), 401
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     conn.row_factory = sqlite3.Row
     cur = conn.cursor()
     
@@ -1996,7 +2071,7 @@ def download_invoice(order_id):
     username = session.get('username')
     is_admin = username in ['admin', 'admin2']
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = get_db()
     conn.row_factory = sqlite3.Row
     cur = conn.cursor()
     
@@ -2065,28 +2140,18 @@ def book_soil_test():
         username = session.get('username')
         user = get_user_details(username)
         
-        # Generate booking ID
-        import random, string
-        booking_id = 'ST' + ''.join(random.choices(string.digits, k=8))
+        booking_id = ids.next_id('ST')
         
-        # Get current IST time
-        date_str, time_str = get_current_time()
-        created_at = f"{date_str} {time_str}"
+        created_at = utc_timestamp()
         
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        
-        # Insert booking
-        cur.execute(
+        # Insert booking; acknowledged only once committed
+        write_queue.execute(
             """INSERT INTO soil_test_bookings 
                (booking_id, username, farm_location, farm_size, contact_number, preferred_date, test_type, status, created_at) 
                VALUES (?, ?, ?, ?, ?, ?, ?, 'pending', ?)""",
             (booking_id, username, farm_location, farm_size, contact_number, preferred_date, test_type, created_at)
         )
         
-        conn.commit()
-        conn.close()
-        
         # Notify admin2 about soil test booking
         notify_admin_soil_test(username, user.get('name', username), booking_id, test_type)
         
@@ -2096,6 +2161,8 @@ def book_soil_test():
             'booking_id': booking_id
         })
         
+    except WriteQueueFull:
+        return jsonify({'success': False, 'message': WRITE_QUEUE_FULL_MESSAGE}), 503
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -2107,7 +2174,7 @@ def get_admin_notifications():
     
     return jsonify({
         'success': True,
-        'notifications': admin_notifications,
+        'notifications': [present_timestamps(dict(n), ('timestamp',)) for n in admin_notifications],
         'count': len(admin_notifications)
     })
 
@@ -2134,57 +2201,31 @@ def farmer_add_product():
         if not all([name, category, price, stock]):
             return jsonify({'success': False, 'message': 'Name, category, price, and stock are required'}), 400
         
-        # Generate product ID
-        import random, string
-        product_id = 'FP' + ''.join(random.choices(string.digits, k=8))
+        # Store inline images once and keep only their URL
+        try:
+            image = product_image_store.ingest(image)
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        product_id = ids.next_id('FP')
         
         farmer_username = session.get('username')
         
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db()
         cur = conn.cursor()
         
         cur.execute(
             """INSERT INTO farmer_products 
-               (product_id, farmer_username, name, category, price, stock, unit, image, description) 
-               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (product_id, farmer_username, name, category, price, stock, unit, image, description)
+               (product_id, farmer_username, name, category, price, stock, unit, image, description, seller_type, location) 
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 'farmer', 'Local Farm')""",
+            (product_id, farmer_username, name, category, float(price), int(stock), unit,
+             image or "https://via.placeholder.com/150", description)
         )
         
         conn.commit()
+        catalog_exporter.schedule()
         conn.close()
         
-        # Add to products.json
-        try:
-            json_path = os.path.join(os.path.dirname(__file__), 'products.json')
-            if os.path.exists(json_path):
-                with open(json_path, 'r', encoding='utf-8') as f:
-                    json_data = json.load(f)
-                
-                products_list = json_data.get('products', []) if isinstance(json_data, dict) else json_data
-                if isinstance(json_data, list):
-                    json_data = {'products': products_list}
-                
-                new_product_json = {
-                    "id": product_id,
-                    "name": name,
-                    "category": category,
-                    "price": float(price),
-                    "unit": unit,
-                    "stock": int(stock),
-                    "description": description,
-                    "image": image or "https://via.placeholder.com/150",
-                    "seller_username": farmer_username,
-                    "seller_type": "farmer",
-                    "location": "Local Farm"
-                }
-                
-                products_list.append(new_product_json)
-                
-                with open(json_path, 'w', encoding='utf-8') as f:
-                    json.dump(json_data, f, indent=2)
-        except Exception as e:
-            print(f"Error writing to products.json: {e}")
-        
         return jsonify({
             'success': True,
             'message': 'Product added successfully',
@@ -2206,27 +2247,33 @@ def get_farmer_products():
     
     farmer_username = session.get('username')
     
-    # Load products from JSON file
+    # Load the farmer's products (indexed on farmer_username)
     try:
-        data_path = os.path.join(os.path.dirname(__file__), 'products.json')
-        with open(data_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
-            products_list = json_data.get('products', []) if isinstance(json_data, dict) else json_data
-            
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute(
+            """SELECT product_id, name, category, price, stock, unit, image, description, created_at
+               FROM farmer_products
+               WHERE farmer_username = ? AND seller_type = 'farmer'
+               ORDER BY id""",
+            (farmer_username,)
+        )
+        rows = cur.fetchall()
+        conn.close()
+        
         products = []
-        for p in products_list:
-            if p.get('seller_username') == farmer_username and p.get('seller_type') == 'farmer':
-                products.append({
-                    'product_id': p['id'],
-                    'name': p['name'],
-                    'category': p['category'],
-                    'price': p['price'],
-                    'stock': p['stock'],
-                    'unit': p.get('unit', ''),
-                    'image': p.get('image', ''),
-                    'description': p.get('description', ''),
-                    'created_at': p.get('created_at', '')
-                })
+        for row in rows:
+            products.append({
+                'product_id': row[0],
+                'name': row[1],
+                'category': row[2],
+                'price': row[3],
+                'stock': row[4],
+                'unit': row[5] or '',
+                'image': row[6] or '',
+                'description': row[7] or '',
+                'created_at': row[8] or ''
+            })
         
         return jsonify({
             'success': True,
@@ -2236,6 +2283,17 @@ def get_farmer_products():
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error loading products: {str(e)}'}), 500
 
+# Editable farmer product fields and how to coerce the submitted values
+FARMER_PRODUCT_FIELDS = {
+    'name': str,
+    'category': str,
+    'price': float,
+    'stock': int,
+    'unit': str,
+    'image': str,
+    'description': str,
+}
+
 @app.route('/api/farmer/update-product/<product_id>', methods=['PUT'])
 def farmer_update_product(product_id):
     """Update farmer's product"""
@@ -2250,41 +2308,42 @@ def farmer_update_product(product_id):
         data = request.get_json()
         farmer_username = session.get('username')
         
-        # Update product in products.json
-        json_path = os.path.join(os.path.dirname(__file__), 'products.json')
-        with open(json_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
-        
-        products_list = json_data.get('products', []) if isinstance(json_data, dict) else json_data
-        
-        # Find and update the product
-        product_found = False
-        for p in products_list:
-            if p.get('id') == product_id and p.get('seller_username') == farmer_username and p.get('seller_type') == 'farmer':
-                if 'name' in data:
-                    p['name'] = data['name']
-                if 'category' in data:
-                    p['category'] = data['category']
-                if 'price' in data:
-                    p['price'] = float(data['price'])
-                if 'stock' in data:
-                    p['stock'] = int(data['stock'])
-                if 'unit' in data:
-                    p['unit'] = data['unit']
-                if 'image' in data:
-                    p['image'] = data['image']
-                if 'description' in data:
-                    p['description'] = data['description']
-                product_found = True
-                break
+        # Only the submitted fields are written
+        updates = [(field, convert(data[field])) for field, convert in FARMER_PRODUCT_FIELDS.items() if field in data]
+        
+        # Store inline images once and keep only their URL
+        try:
+            updates = [(field, product_image_store.ingest(value) if field == 'image' else value)
+                       for field, value in updates]
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        conn = get_db()
+        cur = conn.cursor()
+        
+        if updates:
+            set_clause = ', '.join(f'{field} = ?' for field, _ in updates)
+            cur.execute(
+                f"""UPDATE farmer_products SET {set_clause}
+                    WHERE product_id = ? AND farmer_username = ? AND seller_type = 'farmer'""",
+                [value for _, value in updates] + [product_id, farmer_username]
+            )
+            product_found = cur.rowcount > 0
+        else:
+            cur.execute(
+                """SELECT 1 FROM farmer_products
+                   WHERE product_id = ? AND farmer_username = ? AND seller_type = 'farmer'""",
+                (product_id, farmer_username)
+            )
+            product_found = cur.fetchone() is not None
+        
+        conn.commit()
+        catalog_exporter.schedule()
+        conn.close()
         
         if not product_found:
             return jsonify({'success': False, 'message': 'Product not found or unauthorized'}), 404
         
-        # Write back to file
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(json_data, f, indent=2)
-        
         return jsonify({'success': True, 'message': 'Product updated successfully'})
         
     except Exception as e:
@@ -2303,28 +2362,21 @@ def farmer_delete_product(product_id):
     try:
         farmer_username = session.get('username')
         
-        # Delete product from products.json
-        json_path = os.path.join(os.path.dirname(__file__), 'products.json')
-        with open(json_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
-        
-        products_list = json_data.get('products', []) if isinstance(json_data, dict) else json_data
-        
-        # Find and remove the product
-        product_found = False
-        for i, p in enumerate(products_list):
-            if p.get('id') == product_id and p.get('seller_username') == farmer_username and p.get('seller_type') == 'farmer':
-                products_list.pop(i)
-                product_found = True
-                break
+        conn = get_db()
+        cur = conn.cursor()
+        cur.execute(
+            """DELETE FROM farmer_products
+               WHERE product_id = ? AND farmer_username = ? AND seller_type = 'farmer'""",
+            (product_id, farmer_username)
+        )
+        product_found = cur.rowcount > 0
+        conn.commit()
+        catalog_exporter.schedule()
+        conn.close()
         
         if not product_found:
             return jsonify({'success': False, 'message': 'Product not found or unauthorized'}), 404
         
-        # Write back to file
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(json_data, f, indent=2)
-        
         return jsonify({'success': True, 'message': 'Product deleted successfully'})
         
     except Exception as e:
@@ -2333,48 +2385,20 @@ def farmer_delete_product(product_id):
 @app.route('/api/products-by-category', methods=['GET'])
 def get_products_by_category():
     """Get all farmer products grouped by category"""
-    try:
-        # Load products from JSON file
-        data_path = os.path.join(os.path.dirname(__file__), 'products.json')
-        with open(data_path, 'r', encoding='utf-8') as f:
-            json_data = json.load(f)
-            products_list = json_data.get('products', []) if isinstance(json_data, dict) else json_data
-        
-        products_by_category = {}
-        for p in products_list:
-            if p.get('seller_type') == 'farmer' and p.get('stock', 0) > 0:
-                category = p['category']
-                if category not in products_by_category:
-                    products_by_category[category] = []
-                
-                # Get farmer name from user details
-                farmer_name = p.get('seller_username')  # Default to username
-                try:
-                    user = get_user_details(p.get('seller_username'))
-                    if user and user.get('name'):
-                        farmer_name = user['name']
-                except:
-                    pass
-                
-                products_by_category[category].append({
-                    'product_id': p['id'],
-                    'name': p['name'],
-                    'price': p['price'],
-                    'stock': p['stock'],
-                    'unit': p.get('unit', ''),
-                    'image': p.get('image', ''),
-                    'description': p.get('description', ''),
-                    'farmer_username': p.get('seller_username'),
-                    'farmer_name': farmer_name
-                })
-        
-        return jsonify({
-            'success': True,
-            'products_by_category': products_by_category
-        })
+    def build():
+        try:
+            # Grouping and farmer names are precomputed once per catalog version
+            products_by_category = product_catalog.products_by_category()
+            
+            return jsonify({
+                'success': True,
+                'products_by_category': products_by_category
+            })
         
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'Error loading products: {str(e)}'}), 500
+        except Exception as e:
+            return jsonify({'success': False, 'message': f'Error loading products: {str(e)}'}), 500
+
+    return catalog_response(build)
 
 @app.route('/api/farmer/notifications', methods=['GET'])
 def get_farmer_notifications():
@@ -2387,42 +2411,13 @@ def get_farmer_notifications():
         return jsonify({'success': False, 'message': 'Only farmers can access this'}), 403
     
     farmer_username = session.get('username')
-    
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    
-    # Add index on farmer_username for faster lookups if not exists
     try:
-        cur.execute("CREATE INDEX IF NOT EXISTS idx_farmer_notifications ON farmer_order_notifications(farmer_username)")
-    except:
-        pass
-    
-    cur.execute(
-        """SELECT id, order_id, product_id, product_name, quantity, customer_username, 
-                  customer_name, status, read_status, created_at, price
-           FROM farmer_order_notifications
-           WHERE farmer_username = ?
-           ORDER BY created_at DESC""",
-        (farmer_username,)
-    )
-    
-    notifications = []
-    for row in cur.fetchall():
-        notifications.append({
-            'id': row['id'],
-            'order_id': row['order_id'],
-            'product_id': row['product_id'],
-            'product_name': row['product_name'],
-            'quantity': row['quantity'],
-            'customer_username': row['customer_username'],
-            'customer_name': row['customer_name'],
-            'status': row['status'],
-            'read_status': row['read_status'],
-            'created_at': row['created_at'],
-            'price': row['price'] or 0
-        })
+        start, end = request_date_range()
+    except ValueError:
+        return jsonify({'success': False, 'message': INVALID_DATE_MESSAGE}), 400
     
+    conn = get_db()
+    notifications = FARMER_NOTIFICATIONS.dicts(conn, (farmer_username, start, end))
     conn.close()
     
     return jsonify({
@@ -2443,19 +2438,16 @@ def mark_notification_read(notification_id):
     try:
         farmer_username = session.get('username')
         
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        
-        cur.execute(
+        # Write-behind: the response doesn't depend on the update
+        write_queue.submit(
             'UPDATE farmer_order_notifications SET read_status = 1 WHERE id = ? AND farmer_username = ?',
             (notification_id, farmer_username)
         )
         
-        conn.commit()
-        conn.close()
-        
         return jsonify({'success': True})
         
+    except WriteQueueFull:
+        return jsonify({'success': False, 'message': WRITE_QUEUE_FULL_MESSAGE}), 503
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -2471,7 +2463,7 @@ def clear_farmer_notifications():
     
     try:
         farmer_username = session.get('username')
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db()
         cur = conn.cursor()
         cur.execute('DELETE FROM farmer_order_notifications WHERE farmer_username = ?', (farmer_username,))
         deleted = cur.rowcount or 0
@@ -2503,7 +2495,7 @@ def community():
 def get_community_posts():
     """Fetch all community posts with replies"""
     try:
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db()
         cur = conn.cursor()
         
         # Get all posts with user details
@@ -2531,15 +2523,15 @@ def get_community_posts():
             ''', (post_id,))
             replies_data = cur.fetchall()
             
-            replies = [{
+            replies = [present_timestamps({
                 'id': r[0],
                 'username': r[1],
                 'content': r[2],
                 'created_at': r[3],
                 'author_name': r[4] or r[1]
-            } for r in replies_data]
+            }, ('created_at',)) for r in replies_data]
             
-            posts.append({
+            posts.append(present_timestamps({
                 'id': post[0],
                 'username': post[1],
                 'title': post[2],
@@ -2549,7 +2541,7 @@ def get_community_posts():
                 'author_name': post[6] or post[1],
                 'replies': replies,
                 'reply_count': len(replies)
-            })
+            }, ('created_at',)))
         
         conn.close()
         return jsonify({'success': True, 'posts': posts})
@@ -2571,8 +2563,7 @@ def create_community_post():
             return jsonify({'success': False, 'message': 'Title and content are required'}), 400
         
         username = session.get('username')
-        date_str, time_str = get_current_time()
-        created_at = f"{date_str} {time_str}"
+        created_at = utc_timestamp()
         
         # Handle image upload
         image_path = None
@@ -2587,7 +2578,7 @@ def create_community_post():
                 file.save(filepath)
                 image_path = f"/static/uploads/{filename}"
         
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db()
         cur = conn.cursor()
         
         cur.execute(
@@ -2623,10 +2614,9 @@ def add_community_reply(post_id):
             return jsonify({'success': False, 'message': 'Reply content is required'}), 400
         
         username = session.get('username')
-        date_str, time_str = get_current_time()
-        created_at = f"{date_str} {time_str}"
+        created_at = utc_timestamp()
         
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db()
         cur = conn.cursor()
         
         # Verify post exists
@@ -2635,14 +2625,12 @@ def add_community_reply(post_id):
             conn.close()
             return jsonify({'success': False, 'message': 'Post not found'}), 404
         
-        cur.execute(
+        write = write_queue.execute(
             '''INSERT INTO community_replies (post_id, username, content, created_at)
                VALUES (?, ?, ?, ?)''',
             (post_id, username, content, created_at)
         )
-        
-        reply_id = cur.lastrowid
-        conn.commit()
+        reply_id = write.lastrowid
         
         # Get author name for response
         cur.execute('SELECT name FROM user_details WHERE username = ?', (username,))
@@ -2654,15 +2642,17 @@ def add_community_reply(post_id):
         return jsonify({
             'success': True, 
             'message': 'Reply added successfully!',
-            'reply': {
+            'reply': present_timestamps({
                 'id': reply_id,
                 'username': username,
                 'content': content,
                 'created_at': created_at,
                 'author_name': author_name
-            }
+            }, ('created_at',))
         })
         
+    except WriteQueueFull:
+        return jsonify({'success': False, 'message': WRITE_QUEUE_FULL_MESSAGE}), 503
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
@@ -2675,7 +2665,7 @@ def delete_community_post(post_id):
     try:
         username = session.get('username')
         
-        conn = sqlite3.connect(DB_PATH)
+        conn = get_db()
         cur = conn.cursor()
         
         # Verify ownership
@@ -0,0 +1,141 @@
+"""
+Benchmark: the admin dashboard on ORDERS orders across PINCODES pincodes.
+
+Before: admin_panel() read every order, grouped them by pincode in Python
+and counted pending orders with another pass. After: per-pincode counts
+come from pincode_order_stats, maintained by triggers (see
+order_stats.py), and the page loads orders a page at a time from
+/api/admin/pincode-orders.
+
+It times the dashboard data before and after, GET /admin.html and the
+first page of orders for all pincodes and for one. It checks the counts
+against the old grouping, and again against a full recount after status
+updates, pincode changes and deletes. It also reports what the triggers
+cost an order insert.
+
+Run from the project root:  python benchmarks/bench_admin_dashboard.py
+"""
+
+import os
+import random
+import sqlite3
+import time
+
+from common import load_app_copy
+
+agri = load_app_copy()
+
+from repository import ALL_ORDERS_BY_DATE  # noqa: E402  (imported from the app copy)
+from timestamps import MAX_TIMESTAMP, MIN_TIMESTAMP  # noqa: E402
+
+ORDERS = int(os.environ.get('BENCH_ORDERS', 300_000))
+PINCODES = int(os.environ.get('BENCH_PINCODES', 400))
+ROUNDS = int(os.environ.get('BENCH_ROUNDS', 20))
+
+INSERT_ORDER = """
+    INSERT INTO orders (order_number, username, name, address, pincode, phone, total_amount,
+                        status, created_at, payment_method, otp)
+    VALUES (?, ?, 'Customer', 'Bench Street', ?, '9000000000', ?, ?, '2026-01-01 10:00:00', 'COD', '123456')
+"""
+
+RECOUNT = '''
+    SELECT COALESCE(pincode, ''), COUNT(*), SUM(status = 'pending'), SUM(status = 'paid'),
+           SUM(status = 'completed'), SUM(status = 'cancelled')
+    FROM orders
+    GROUP BY 1
+    ORDER BY 1
+'''
+
+
+def order_rows(rng, count, prefix):
+    for n in range(count):
+        yield (f'{prefix}{n:08d}', f'bench_customer{n % 5000}', f'5{rng.randrange(PINCODES):05d}',
+               rng.randint(50, 900), rng.choice(('pending', 'paid', 'completed', 'cancelled')))
+
+
+def seed(conn):
+    conn.executemany(INSERT_ORDER, order_rows(random.Random(24), ORDERS, 'BENCH'))
+    conn.commit()
+
+
+def legacy_dashboard(conn):
+    """admin_panel()'s order work as it was."""
+    orders = ALL_ORDERS_BY_DATE.records(conn, (MIN_TIMESTAMP, MAX_TIMESTAMP))
+    orders_by_pincode = {}
+    for order in orders:
+        pincode = order.pincode or 'No Pincode'
+        if pincode not in orders_by_pincode:
+            orders_by_pincode[pincode] = []
+        orders_by_pincode[pincode].append(order)
+    pending_count = sum(1 for order in orders if order.status == 'pending')
+    return orders_by_pincode, pending_count, len(orders)
+
+
+def dashboard(conn):
+    pincode_stats = agri.admin_pincode_stats(conn)
+    return (pincode_stats, sum(stats.pending_orders for stats in pincode_stats),
+            sum(stats.order_count for stats in pincode_stats))
+
+
+def timed(fn, rounds=ROUNDS):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = fn()
+    return (time.perf_counter() - start) / rounds, result
+
+
+def recount_matches(conn):
+    kept = conn.execute('SELECT * FROM pincode_order_stats WHERE order_count > 0 ORDER BY pincode').fetchall()
+    return kept == conn.execute(RECOUNT).fetchall()
+
+
+def insert_cost(conn, prefix):
+    start = time.perf_counter()
+    conn.executemany(INSERT_ORDER, order_rows(random.Random(7), 20_000, prefix))
+    conn.commit()
+    return (time.perf_counter() - start) / 20_000
+
+
+def main():
+    conn = sqlite3.connect(agri.DB_PATH)
+    seed(conn)
+
+    before, (orders_by_pincode, before_pending, before_total) = timed(lambda: legacy_dashboard(conn), rounds=3)
+    after, (pincode_stats, after_pending, after_total) = timed(lambda: dashboard(conn))
+    ok = (after_pending, after_total) == (before_pending, before_total) and \
+        {stats.pincode or 'No Pincode': stats.order_count for stats in pincode_stats} == \
+        {pincode: len(orders) for pincode, orders in orders_by_pincode.items()}
+    print(f"dashboard data, {before_total:,} orders in {len(pincode_stats)} pincodes")
+    print(f"  before {before * 1000:9.2f} ms")
+    print(f"  after  {after * 1000:9.2f} ms   ({before / after:,.0f}x)")
+
+    client = agri.app.test_client()
+    with client.session_transaction() as session:
+        session['username'] = 'admin'
+    pincode = pincode_stats[0].pincode
+    for label, path in (('GET /admin.html', '/admin.html'),
+                        ('first page, all pincodes', '/api/admin/pincode-orders'),
+                        (f'first page, pincode {pincode}', f'/api/admin/pincode-orders?pincode={pincode}')):
+        elapsed, response = timed(lambda: client.get(path))
+        assert response.status_code == 200
+        print(f"  {label:<28} {elapsed * 1000:7.2f} ms")
+
+    conn.execute("UPDATE orders SET status = 'completed' WHERE status = 'pending' AND id % 5 = 0")
+    conn.execute("UPDATE orders SET pincode = NULL WHERE id % 97 = 0")
+    conn.execute('DELETE FROM orders WHERE id % 11 = 0')
+    conn.commit()
+    ok &= recount_matches(conn)
+    print(f"counts match the old grouping and a full recount after updates and deletes: {'yes' if ok else 'NO'}")
+
+    with_triggers = insert_cost(conn, 'WITH')
+    for trigger in ('insert', 'update', 'delete'):
+        conn.execute(f'DROP TRIGGER trg_orders_{trigger}_pincode_stats')
+    without_triggers = insert_cost(conn, 'WITHOUT')
+    print(f"order insert {without_triggers * 1e6:.1f} us without the pincode trigger, "
+          f"{with_triggers * 1e6:.1f} us with it")
+    conn.close()
+    return ok
+
+
+if __name__ == '__main__':
+    raise SystemExit(0 if main() else 1)
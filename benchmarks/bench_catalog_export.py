@@ -0,0 +1,155 @@
+"""
+Benchmark: products.json writes under concurrency.
+
+1. Several processes doing read-modify-write on one JSON file with a plain
+   open(..., 'w') (before) vs AtomicJSONFile.update (after), while a reader
+   process keeps parsing it: lost updates and torn reads.
+2. Many farmers editing their products at once through
+   /api/farmer/update-product: a products.json rewrite per edit (before) vs
+   the coalescing CatalogExporter (after).
+
+Run from the project root:  python benchmarks/bench_catalog_export.py
+"""
+
+import json
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from common import load_app_copy
+
+agri = load_app_copy()
+
+from catalog_export import AtomicJSONFile  # noqa: E402  (imported from the app copy)
+
+PROCESSES = int(os.environ.get('BENCH_PROCESSES', 4))
+INCREMENTS = int(os.environ.get('BENCH_INCREMENTS', 300))
+FARMERS = int(os.environ.get('BENCH_FARMERS', 16))
+EDITS_PER_FARMER = int(os.environ.get('BENCH_EDITS', 40))
+PADDING = [{'id': f'P{i}', 'name': f'Product {i}', 'description': 'x' * 200} for i in range(300)]
+
+
+def naive_increment(path):
+    for _ in range(INCREMENTS):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (ValueError, OSError):
+            continue  # torn file: this update is lost
+        data['count'] += 1
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+
+def atomic_increment(path):
+    def bump(data):
+        data['count'] += 1
+        return data
+    json_file = AtomicJSONFile(path)
+    for _ in range(INCREMENTS):
+        json_file.update(bump)
+
+
+def reader(path, stop, torn):
+    while not stop.is_set():
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                json.load(f)
+        except ValueError:
+            torn.value += 1
+        except OSError:
+            pass
+
+
+def run_processes(label, target):
+    path = os.path.join(tempfile.mkdtemp(prefix='agri-json-'), 'products.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'count': 0, 'products': PADDING}, f, indent=2)
+    stop = multiprocessing.Event()
+    torn = multiprocessing.Value('i', 0)
+    watcher = multiprocessing.Process(target=reader, args=(path, stop, torn))
+    watcher.start()
+    workers = [multiprocessing.Process(target=target, args=(path,)) for _ in range(PROCESSES)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    watcher.join()
+    with open(path, 'r', encoding='utf-8') as f:
+        count = json.load(f)['count']
+    expected = PROCESSES * INCREMENTS
+    print(f"{label:<7} {expected / elapsed:7.0f} writes/s   lost updates {expected - count:5}   "
+          f"torn reads {torn.value:5}")
+    return expected - count, torn.value
+
+
+def seed_farmers():
+    conn = sqlite3.connect(agri.DB_PATH)
+    conn.executemany(
+        "INSERT INTO user_details (username, name, login_type) VALUES (?, ?, 'farmer')",
+        [(f'bench_farmer{i}', f'Farmer {i}') for i in range(FARMERS)]
+    )
+    conn.executemany(
+        """INSERT INTO farmer_products (product_id, farmer_username, name, category, price, stock, unit)
+           VALUES (?, ?, ?, 'Vegetables', 10, 100, 'kg')""",
+        [(f'BF{i:04d}', f'bench_farmer{i}', f'Produce {i}') for i in range(FARMERS)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def farmers_editing():
+    """Every farmer edits their own product's price repeatedly; returns edits/s."""
+    start_gate = threading.Barrier(FARMERS)
+
+    def farmer(n):
+        client = agri.app.test_client()
+        with client.session_transaction() as session:
+            session['username'] = f'bench_farmer{n}'
+        start_gate.wait()
+        for edit in range(EDITS_PER_FARMER):
+            response = client.put(f'/api/farmer/update-product/BF{n:04d}', json={'price': 10 + edit})
+            assert response.status_code == 200, response.get_json()
+
+    threads = [threading.Thread(target=farmer, args=(n,)) for n in range(FARMERS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return FARMERS * EDITS_PER_FARMER / (time.perf_counter() - start)
+
+
+def run_app(label, exporter):
+    exporter.flushes = 0
+    rate = farmers_editing()
+    exporter.flush()
+    print(f"{label:<7} {rate:7.0f} edits/s   products.json writes {exporter.flushes:5} "
+          f"for {FARMERS * EDITS_PER_FARMER} edits")
+
+
+if __name__ == '__main__':
+    print(f"{PROCESSES} processes x {INCREMENTS} read-modify-writes of a {len(json.dumps(PADDING)) // 1024} KB file")
+    run_processes('before', naive_increment)
+    lost, torn = run_processes('after', atomic_increment)
+    assert lost == 0 and torn == 0, (lost, torn)
+
+    seed_farmers()
+    exporter = agri.catalog_exporter
+    print(f"{FARMERS} farmers x {EDITS_PER_FARMER} product edits")
+    schedule = exporter.schedule
+    exporter.schedule = exporter.flush  # before: a rewrite per edit
+    run_app('before', exporter)
+    exporter.schedule = schedule
+    run_app('after', exporter)
+
+    exported = {p['id']: p for p in AtomicJSONFile(agri.PRODUCTS_JSON_PATH).read()['products']}
+    assert all(exported[f'BF{n:04d}']['price'] == 10 + EDITS_PER_FARMER - 1 for n in range(FARMERS))
+    assert list(exported) == [p['id'] for p in agri.product_catalog.products()]
+    print("products.json matches the catalog: yes")
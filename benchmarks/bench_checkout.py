@@ -0,0 +1,153 @@
+"""
+Load test: concurrent checkouts through all three order endpoints
+(/create-order, /verify-payment, /api/place-order), which share the
+OrderService pipeline.
+
+Each customer thread places orders for a mixed cart: a scarce farmer
+product that every thread competes for, a well-stocked farmer product, and
+a farm supply that doesn't track stock. The test reports checkout
+throughput and latency, then checks the pipeline's invariants:
+
+- no request failed, and stock ran out instead of being oversold
+- every accepted order has all its items, priced from the catalog, and one
+  farmer notification per farmer-listed item
+- stock taken matches the reserved units, and rejected orders left nothing
+  behind
+
+Run from the project root:  python benchmarks/bench_checkout.py
+"""
+
+import os
+import random
+import sqlite3
+import statistics
+import threading
+import time
+
+from common import load_app_copy
+
+agri = load_app_copy()
+
+THREADS = int(os.environ.get('BENCH_THREADS', 16))
+ORDERS_PER_THREAD = int(os.environ.get('BENCH_ORDERS', 100))
+SCARCE_STOCK = int(os.environ.get('BENCH_STOCK', 400))
+FARMER = 'bench_farmer'
+SCARCE, PLENTY, SUPPLY = 'BENCH_MANGO', 'BENCH_RICE', 'BENCH_SPRAYER'
+PRICES = {SCARCE: 120.0, PLENTY: 55.0, SUPPLY: 900.0}
+ENDPOINTS = ('/create-order', '/verify-payment', '/api/place-order')
+
+
+def seed():
+    conn = sqlite3.connect(agri.DB_PATH)
+    conn.executemany(
+        """INSERT INTO farmer_products (product_id, farmer_username, name, category, price, stock, unit, seller_type)
+           VALUES (?, ?, ?, 'Fruits', ?, ?, 'kg', 'farmer')""",
+        [(SCARCE, FARMER, 'Alphonso Mango', PRICES[SCARCE], SCARCE_STOCK),
+         (PLENTY, FARMER, 'Sona Masoori Rice', PRICES[PLENTY], 10 ** 9)]
+    )
+    conn.execute(
+        """INSERT INTO farm_supplies (product_id, name, price, unit, farmer, location, image, phone, pincode)
+           VALUES (?, 'Knapsack Sprayer', ?, 'piece', 'Bench Supplies', 'Bench Market', '', '9000000000', '560001')""",
+        (SUPPLY, PRICES[SUPPLY])
+    )
+    conn.executemany(
+        'INSERT INTO user_details (username, name, address, phone, pincode, login_type) VALUES (?, ?, ?, ?, ?, ?)',
+        [(f'bench_customer{i}', f'Customer {i}', 'Bench Street', '9000000000', '560001', 'customer')
+         for i in range(THREADS)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def cart(rng):
+    # The cart's prices are deliberately wrong: the pipeline prices from the catalog
+    items = [{'id': PLENTY, 'name': 'Rice', 'qty': rng.randint(1, 5), 'price': 1}]
+    if rng.random() < 0.5:
+        items.append({'id': SCARCE, 'name': 'Mango', 'qty': rng.randint(1, 3), 'price': 1})
+    if rng.random() < 0.2:
+        items.append({'id': SUPPLY, 'name': 'Sprayer', 'quantity': 1, 'price': 1})
+    return items
+
+
+def run():
+    """[(status, order_number or None, cart, seconds)] for every checkout."""
+    results = []
+    lock = threading.Lock()
+    start_gate = threading.Barrier(THREADS)
+
+    def worker(n):
+        client = agri.app.test_client()
+        with client.session_transaction() as session:
+            session['username'] = f'bench_customer{n}'
+        rng = random.Random(n)
+        mine = []
+        start_gate.wait()
+        for i in range(ORDERS_PER_THREAD):
+            items = cart(rng)
+            body = {'cart': items, 'payment_method': 'COD'}
+            start = time.perf_counter()
+            response = client.post(ENDPOINTS[i % len(ENDPOINTS)], json=body)
+            elapsed = time.perf_counter() - start
+            order_number = response.get_json().get('order_number') if response.status_code == 200 else None
+            mine.append((response.status_code, order_number, items, elapsed))
+        with lock:
+            results.extend(mine)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def check(results):
+    accepted = {number: items for status, number, items, _ in results if status == 200}
+    errors = [status for status, _, _, _ in results if status not in (200, 400)]
+    assert not errors, f'{len(errors)} checkouts failed'
+    assert len(set(accepted)) == len(accepted), 'duplicate order numbers'
+
+    conn = sqlite3.connect(agri.DB_PATH)
+    orders = dict(conn.execute(
+        "SELECT order_number, id FROM orders WHERE username LIKE 'bench_customer%'"
+    ).fetchall())
+    assert set(orders) == set(accepted), 'orders table differs from accepted checkouts'
+
+    units_sold = 0
+    for number, items in accepted.items():
+        order_id = orders[number]
+        lines = conn.execute(
+            'SELECT product_id, quantity, price FROM order_items WHERE order_id = ? ORDER BY id', (order_id,)
+        ).fetchall()
+        assert lines == [(item['id'], item.get('qty', item.get('quantity')), PRICES[item['id']]) for item in items], lines
+        notified = conn.execute(
+            'SELECT COUNT(*) FROM farmer_order_notifications WHERE order_id = ? AND farmer_username = ?', (order_id, FARMER)
+        ).fetchone()[0]
+        assert notified == sum(1 for item in items if item['id'] != SUPPLY), (number, notified)
+        units_sold += sum(item['qty'] for item in items if item['id'] == SCARCE)
+
+    stock = conn.execute('SELECT stock FROM farmer_products WHERE product_id = ?', (SCARCE,)).fetchone()[0]
+    reserved = conn.execute(
+        "SELECT COALESCE(SUM(quantity), 0) FROM stock_reservations WHERE product_id = ? AND status = 'reserved'", (SCARCE,)
+    ).fetchone()[0]
+    orphans = conn.execute(
+        'SELECT COUNT(*) FROM order_items oi LEFT JOIN orders o ON o.id = oi.order_id WHERE o.id IS NULL'
+    ).fetchone()[0]
+    conn.close()
+    assert stock >= 0 and units_sold == reserved == SCARCE_STOCK - stock, (units_sold, reserved, stock)
+    assert orphans == 0, f'{orphans} order items without an order'
+    return len(accepted), units_sold
+
+
+if __name__ == '__main__':
+    seed()
+    print(f"{THREADS} threads x {ORDERS_PER_THREAD} checkouts, {SCARCE_STOCK} units of the scarce product")
+    results, elapsed = run()
+    latencies = sorted(seconds for _, _, _, seconds in results)
+    accepted, units_sold = check(results)
+    print(f"{len(results) / elapsed:7,.0f} checkouts/s   {elapsed:6.2f} s   "
+          f"p50 {statistics.median(latencies) * 1000:6.2f} ms   p99 {latencies[int(len(latencies) * 0.99)] * 1000:6.2f} ms")
+    print(f"accepted {accepted}, rejected {len(results) - accepted} (out of stock), "
+          f"{units_sold} of {SCARCE_STOCK} scarce units sold")
+    print("invariants hold: yes (no oversell, catalog prices, one notification per farmer item, no partial orders)")
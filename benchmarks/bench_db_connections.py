@@ -0,0 +1,96 @@
+"""
+Benchmark: /profile.html and /admin.html latency with a new sqlite3
+connection per helper call in rollback-journal mode (before) vs pooled,
+pre-configured connections in WAL mode (after).
+
+Run from the project root:  python benchmarks/bench_db_connections.py
+"""
+
+import os
+import random
+import sqlite3
+import statistics
+import time
+
+from common import load_app_copy
+
+agri = load_app_copy()
+
+from db import enable_wal  # noqa: E402  (imported from the app copy)
+
+REQUESTS = int(os.environ.get('BENCH_REQUESTS', 300))
+CUSTOMERS = 200
+ORDERS = int(os.environ.get('BENCH_ORDERS', 2000))
+
+
+def seed():
+    rng = random.Random(13)
+    conn = sqlite3.connect(agri.DB_PATH)
+    conn.executemany(
+        "INSERT INTO user_details (username, name, address, phone, pincode, login_type) VALUES (?, ?, 'Street', '9000000000', ?, 'customer')",
+        [(f'bench_customer{i}', f'Customer {i}', f'5600{i % 20:02d}') for i in range(CUSTOMERS)]
+    )
+    for n in range(ORDERS):
+        customer = n % CUSTOMERS
+        cur = conn.execute(
+            """INSERT INTO orders (order_number, username, name, address, pincode, phone, total_amount, status, payment_method)
+               VALUES (?, ?, ?, 'Street', ?, '9000000000', ?, ?, 'COD')""",
+            (f'BENCH{n:08d}', f'bench_customer{customer}', f'Customer {customer}', f'5600{customer % 20:02d}',
+             rng.randint(50, 900), rng.choice(['pending', 'paid', 'completed', 'cancelled']))
+        )
+        conn.executemany(
+            'INSERT INTO order_items (order_id, product_id, product_name, quantity, price) VALUES (?, ?, ?, ?, ?)',
+            [(cur.lastrowid, f'P{k}', f'Product {k}', 1, 50) for k in range(rng.randint(1, 4))]
+        )
+    conn.commit()
+    conn.close()
+
+
+def client_for(username):
+    client = agri.app.test_client()
+    with client.session_transaction() as session:
+        session['username'] = username
+    return client
+
+
+def measure(client, path):
+    assert client.get(path).status_code == 200
+    timings = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        client.get(path)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return statistics.mean(timings), timings[len(timings) // 2], timings[int(len(timings) * 0.95) - 1]
+
+
+def run(label):
+    results = []
+    for path, client in (('/profile.html', client_for('bench_customer7')), ('/admin.html', client_for('admin'))):
+        mean, p50, p95 = measure(client, path)
+        results.append(mean)
+        print(f"{label:<7} {path:<14} mean {mean:7.2f} ms   p50 {p50:7.2f} ms   p95 {p95:7.2f} ms")
+    return results
+
+
+if __name__ == '__main__':
+    seed()
+    print(f"{ORDERS:,} orders, {REQUESTS} requests per page")
+
+    # Before: rollback journal and a fresh connection for every helper call
+    agri.db_pool.close_all()
+    conn = sqlite3.connect(agri.DB_PATH)
+    conn.execute('PRAGMA journal_mode = DELETE')
+    conn.close()
+    get_db = agri.get_db
+    agri.get_db = lambda: sqlite3.connect(agri.DB_PATH)
+    before = run('before')
+
+    agri.get_db = get_db
+    conn = sqlite3.connect(agri.DB_PATH)
+    assert enable_wal(conn) == 'wal'
+    conn.close()
+    after = run('after')
+
+    for path, b, a in zip(('/profile.html', '/admin.html'), before, after):
+        print(f"{path:<14} {b - a:6.2f} ms faster per request ({(b - a) / b:.0%})")
@@ -0,0 +1,36 @@
+"""
+Benchmark: requests per second on /api/home-products.
+
+"before" forces the catalog to reload on every request (the old
+re-read-per-request behaviour), "after" uses the shared in-memory catalog.
+
+Run from the project root:  python benchmarks/bench_home_products.py
+"""
+
+import os
+import time
+
+from common import load_app_copy
+
+agri = load_app_copy()
+
+REQUESTS = int(os.environ.get('BENCH_REQUESTS', 500))
+
+
+def run(label, before_each=None):
+    client = agri.app.test_client()
+    client.get('/api/home-products')  # warm up
+    start = time.perf_counter()
+    for _ in range(REQUESTS):
+        if before_each:
+            before_each()
+        resp = client.get('/api/home-products')
+        assert resp.status_code == 200
+    elapsed = time.perf_counter() - start
+    print(f"{label:<8} {REQUESTS / elapsed:10.1f} req/s  ({elapsed * 1000 / REQUESTS:.2f} ms/request)")
+
+
+if __name__ == '__main__':
+    print(f"/api/home-products, {REQUESTS} requests")
+    run('before', agri.product_catalog.invalidate)
+    run('after')
@@ -0,0 +1,121 @@
+"""
+Benchmark and uniqueness test for ids.IdGenerator against the old
+'ORD' + 8 random digits.
+
+1. Threads: THREADS threads in one process draw IDS_PER_THREAD order
+   numbers each. Checks they're all unique and that each thread's IDs
+   increase, and reports IDs/s and how many collisions the old
+   generator's draws would have had.
+2. Processes: PROCESSES worker processes, each with its own generator on
+   the same database, draw IDs at the same time. Checks they're unique
+   across processes.
+3. Index: inserting the IDs into a table with a UNIQUE column, random
+   (before) vs time-ordered (after).
+
+Run from the project root:  python benchmarks/bench_ids.py
+"""
+
+import multiprocessing
+import os
+import random
+import sqlite3
+import string
+import threading
+import time
+
+from common import load_app_copy
+
+THREADS = int(os.environ.get('BENCH_THREADS', 16))
+IDS_PER_THREAD = int(os.environ.get('BENCH_IDS', 20_000))
+PROCESSES = int(os.environ.get('BENCH_PROCESSES', 4))
+INDEX_ROWS = int(os.environ.get('BENCH_INDEX_ROWS', 1_000_000))
+
+
+def legacy_order_number():
+    return 'ORD' + ''.join(random.choices(string.digits, k=8))
+
+
+def draw_threads(generate):
+    """Per-thread lists of IDs drawn concurrently, and the seconds it took."""
+    results = [None] * THREADS
+
+    def worker(n):
+        results[n] = [generate() for _ in range(IDS_PER_THREAD)]
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def process_worker(db_path, count, queue):
+    from ids import IdGenerator
+    generator = IdGenerator(db_path)
+    queue.put([generator.next_id('ORD') for _ in range(count)])
+
+
+def draw_processes(db_path):
+    queue = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=process_worker, args=(db_path, IDS_PER_THREAD, queue))
+               for _ in range(PROCESSES)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    results = [queue.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+    return results, time.perf_counter() - start
+
+
+def bench_index(label, ids):
+    conn = sqlite3.connect(':memory:')
+    conn.execute('CREATE TABLE orders (id INTEGER PRIMARY KEY, order_number TEXT UNIQUE NOT NULL)')
+    start = time.perf_counter()
+    conn.executemany('INSERT OR IGNORE INTO orders (order_number) VALUES (?)', ((i,) for i in ids))
+    conn.commit()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    print(f"{label:<7} {len(ids) / elapsed:11,.0f} inserts/s into a UNIQUE index ({len(ids):,} rows)")
+    return elapsed
+
+
+def main():
+    agri = load_app_copy()
+    total = THREADS * IDS_PER_THREAD
+
+    before, before_elapsed = draw_threads(legacy_order_number)
+    drawn = [i for ids in before for i in ids]
+    print(f"before  {total / before_elapsed:11,.0f} IDs/s   {THREADS} threads x {IDS_PER_THREAD:,}   "
+          f"collisions {total - len(set(drawn)):,}")
+
+    after, after_elapsed = draw_threads(lambda: agri.ids.next_id('ORD'))
+    drawn = [i for ids in after for i in ids]
+    assert len(set(drawn)) == total, 'duplicate IDs'
+    assert all(ids == sorted(ids) for ids in after), 'IDs not increasing within a thread'
+    print(f"after   {total / after_elapsed:11,.0f} IDs/s   {THREADS} threads x {IDS_PER_THREAD:,}   collisions 0   "
+          f"({agri.ids.reservations:,} block reservations)")
+
+    per_process, elapsed = draw_processes(agri.DB_PATH)
+    drawn = [i for ids in per_process for i in ids] + drawn
+    assert len(set(drawn)) == len(drawn), 'duplicate IDs across processes'
+    assert all(ids == sorted(ids) for ids in per_process), 'IDs not increasing within a process'
+    print(f"after   {PROCESSES * IDS_PER_THREAD / elapsed:11,.0f} IDs/s   {PROCESSES} processes x {IDS_PER_THREAD:,} "
+          f"(process start included)   collisions 0")
+
+    rng = random.Random(21)
+    random_ids = ['ORD' + ''.join(rng.choices(string.digits, k=8)) for _ in range(INDEX_ROWS)]
+    ordered_ids = []
+    while len(ordered_ids) < INDEX_ROWS:
+        ordered_ids.append(agri.ids.next_id('IDX'))
+    before_index = bench_index('before', random_ids)
+    after_index = bench_index('after', ordered_ids)
+    print(f"index inserts {before_index / after_index:.2f}x faster; {INDEX_ROWS - len(set(random_ids)):,} of the "
+          f"random IDs were duplicates")
+    print("unique across threads and processes: yes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""
+Benchmark: product JSON payload size and parse time with inline base64
+images (before) and with images moved to the content-addressed store (after).
+
+Run from the project root:  python benchmarks/bench_image_payload.py
+"""
+
+import json
+import os
+import time
+
+from common import load_app_copy
+
+agri = load_app_copy()
+
+PARSES = int(os.environ.get('BENCH_PARSES', 2000))
+
+
+def measure(label, payload):
+    start = time.perf_counter()
+    for _ in range(PARSES):
+        json.loads(payload)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<8} {len(payload):>9,} bytes  {elapsed * 1e6 / PARSES:8.1f} us/parse")
+
+
+if __name__ == '__main__':
+    with open(agri.PRODUCTS_JSON_PATH, 'r', encoding='utf-8') as f:
+        inline_products = json.load(f)['products']
+
+    client = agri.app.test_client()
+    print(f"/api/home-products payload, {len(inline_products)} products")
+    measure('before', json.dumps(inline_products).encode('utf-8'))
+    measure('after', client.get('/api/home-products').data)
@@ -0,0 +1,145 @@
+"""
+Benchmark: GET /api/admin/orders on ORDERS synthetic orders, as one JSON
+document (before) vs streamed as NDJSON and CSV (after).
+
+Each export runs in a fresh process that imports the app, reads the
+response as a client would and reports its peak RSS. The JSON document is
+built in memory in one piece, so it is timed on the newest SUBSET orders
+only (a ?from=&to= filter); the streamed exports are timed on that subset and
+on the whole table. Their peak RSS shouldn't move with the row count.
+
+It checks that every export has one row per order, and that the first
+rows of the NDJSON and CSV exports match the JSON document.
+
+Run from the project root:  python benchmarks/bench_order_export.py
+"""
+
+import csv
+import datetime
+import io
+import json
+import os
+import resource
+import sqlite3
+import subprocess
+import sys
+import time
+
+ORDERS = int(os.environ.get('BENCH_ORDERS', 5_000_000))
+SUBSET = int(os.environ.get('BENCH_SUBSET', 1_000_000))
+FIRST_ORDER_AT = datetime.datetime(2025, 1, 1)
+
+
+def seed(db_path):
+    """ORDERS orders, one a second, inserted in SQL. The stats triggers are
+    dropped for the load and the tables rebuilt afterwards, as their
+    migrations do."""
+    from order_stats import create_order_stats_table, create_pincode_order_stats_table
+    conn = sqlite3.connect(db_path)
+    for trigger in ('insert', 'update', 'delete'):
+        conn.execute(f'DROP TRIGGER trg_orders_{trigger}_stats')
+        conn.execute(f'DROP TRIGGER trg_orders_{trigger}_pincode_stats')
+    conn.execute(f'''
+        WITH RECURSIVE n(value) AS (SELECT 0 UNION ALL SELECT value + 1 FROM n WHERE value + 1 < {ORDERS})
+        INSERT INTO orders (order_number, username, name, address, pincode, phone, total_amount,
+                            status, created_at, payment_method, otp)
+        SELECT printf('BENCH%08d', value), 'bench_customer' || (value % 5000), 'Customer ' || (value % 5000),
+               'Bench Street, Bengaluru', printf('5600%02d', value % 100), '9000000000', 50 + value % 851,
+               CASE value % 4 WHEN 0 THEN 'pending' WHEN 1 THEN 'paid' WHEN 2 THEN 'completed' ELSE 'cancelled' END,
+               datetime('{FIRST_ORDER_AT:%Y-%m-%d %H:%M:%S}', '+' || value || ' seconds'), 'COD', printf('%06d', value % 1000000)
+        FROM n
+    ''')
+    conn.commit()
+    create_order_stats_table(conn)
+    create_pincode_order_stats_table(conn)
+    conn.commit()
+    conn.close()
+
+
+def export(sandbox, query):
+    """Child process: GET /api/admin/orders?<query> and report on the response."""
+    sys.path.insert(0, sandbox)
+    import app as agri
+    client = agri.app.test_client()
+    with client.session_transaction() as session:
+        session['username'] = 'admin'
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    response = client.get(f'/api/admin/orders?{query}', buffered=False)
+    assert response.status_code == 200, response.status_code
+    size = lines = objects = 0
+    head = ''
+    for chunk in response.response:
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        if len(head) < 4096:
+            head += chunk[:4096]
+        size += len(chunk)
+        lines += chunk.count('\n')
+        objects += chunk.count('"order_number":')
+    response.close()
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'seconds': elapsed, 'bytes': size, 'lines': lines, 'objects': objects, 'head': head[:4096],
+                      'baseline_kb': baseline, 'peak_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+
+
+def run_export(sandbox, query):
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), '--export', sandbox, query],
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    from common import load_app_copy
+    agri = load_app_copy()
+    sandbox = os.path.dirname(agri.__file__)
+    start = time.perf_counter()
+    seed(agri.DB_PATH)
+    print(f"seeded {ORDERS:,} orders in {time.perf_counter() - start:.0f} s")
+
+    total = ORDERS + sqlite3.connect(agri.DB_PATH).execute(
+        "SELECT COUNT(*) FROM orders WHERE order_number NOT LIKE 'BENCH%'").fetchone()[0]
+    # The newest SUBSET synthetic orders; the app's own orders are later than all of them
+    subset = '&'.join([
+        'from=' + (FIRST_ORDER_AT + datetime.timedelta(seconds=ORDERS - SUBSET)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'to=' + (FIRST_ORDER_AT + datetime.timedelta(seconds=ORDERS)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+    ])
+    runs = [
+        ('json', 'json, newest', subset, SUBSET),
+        ('ndjson', 'ndjson, newest', f'format=ndjson&{subset}', SUBSET),
+        ('csv', 'csv, newest', f'format=csv&{subset}', SUBSET),
+        ('ndjson', 'ndjson, all', 'format=ndjson', total),
+        ('csv', 'csv, all', 'format=csv', total),
+        ('ndjson', 'ndjson, status=paid', 'format=ndjson&status=paid', None),
+    ]
+    ok = True
+    results = {}
+    print(f"{'export':<20} {'rows':>10} {'seconds':>8} {'rows/s':>10} {'MB sent':>8} {'peak RSS':>9} {'over import':>11}")
+    for export_format, label, query, expected in runs:
+        result = run_export(sandbox, query)
+        results[query] = result
+        # Objects in the JSON document, lines of NDJSON, lines under the CSV header
+        rows = {'json': result['objects'], 'ndjson': result['lines'], 'csv': result['lines'] - 1}[export_format]
+        if expected is not None and rows != expected:
+            print(f"  {label}: {rows:,} rows, expected {expected:,}")
+            ok = False
+        print(f"{label:<20} {rows:>10,} {result['seconds']:>8.1f} {rows / result['seconds']:>10,.0f} "
+              f"{result['bytes'] / 1e6:>8.0f} {result['peak_kb'] / 1024:>7.0f} MB "
+              f"{(result['peak_kb'] - result['baseline_kb']) / 1024:>8.0f} MB")
+
+    # Rows are encoded the same way in every format: the first NDJSON lines are the
+    # JSON document's first orders, and the CSV has the same orders
+    ndjson_head = results[f'format=ndjson&{subset}']['head'].splitlines()[:3]
+    ok &= results[subset]['head'].startswith('{"success":true,"orders":[' + ','.join(ndjson_head))
+    csv_head = list(csv.DictReader(io.StringIO(results[f'format=csv&{subset}']['head'])))[:3]
+    ok &= [row['order_number'] for row in csv_head] == [json.loads(line)['order_number'] for line in ndjson_head]
+    paid_head = results['format=ndjson&status=paid']['head'].splitlines()[:-1]
+    ok &= all(json.loads(line)['status'] == 'paid' for line in paid_head)
+    print(f"row counts and first rows match: {'yes' if ok else 'NO'}")
+    return ok
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--export']:
+        export(*sys.argv[2:4])
+    else:
+        raise SystemExit(0 if main() else 1)
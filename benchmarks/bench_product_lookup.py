@@ -0,0 +1,64 @@
+"""
+Micro-benchmark: product id lookup on a 100k-product synthetic catalog,
+linear scan over both product lists (before) vs the catalog id index (after).
+
+Run from the project root:  python benchmarks/bench_product_lookup.py
+"""
+
+import os
+import random
+import sqlite3
+import time
+
+from common import load_app_copy
+
+agri = load_app_copy()
+
+PRODUCTS = int(os.environ.get('BENCH_PRODUCTS', 100_000))
+LOOKUPS = int(os.environ.get('BENCH_LOOKUPS', 200))
+
+
+def seed_catalog():
+    conn = sqlite3.connect(agri.DB_PATH)
+    conn.executemany(
+        """INSERT INTO farmer_products (product_id, farmer_username, name, category, price, stock, unit)
+           VALUES (?, 'bench_farmer', ?, 'Vegetables', 10, 100, 'kg')""",
+        [(f'BP{i:08d}', f'Product {i}') for i in range(PRODUCTS // 2)]
+    )
+    conn.executemany(
+        """INSERT INTO farm_supplies (product_id, name, price, unit)
+           VALUES (?, ?, 100, 'piece')""",
+        [(f'BS{i:08d}', f'Supply {i}') for i in range(PRODUCTS - PRODUCTS // 2)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def linear_lookup(product_id):
+    products = agri.product_catalog.products()
+    product = next((p for p in products if str(p.get('id')) == str(product_id)), None)
+    if not product:
+        products = agri.product_catalog.farm_products()
+        product = next((p for p in products if str(p.get('id')) == str(product_id)), None)
+    return product
+
+
+def run(label, lookup, ids):
+    start = time.perf_counter()
+    for product_id in ids:
+        assert lookup(product_id) is not None
+    elapsed = time.perf_counter() - start
+    print(f"{label:<8} {elapsed * 1e6 / len(ids):12.1f} us/lookup")
+
+
+if __name__ == '__main__':
+    seed_catalog()
+    start = time.perf_counter()
+    agri.product_catalog.products()
+    print(f"{PRODUCTS:,} products, snapshot + index built in {time.perf_counter() - start:.2f} s")
+
+    ids = [f'BP{random.randrange(PRODUCTS // 2):08d}' for _ in range(LOOKUPS // 2)]
+    ids += [f'BS{random.randrange(PRODUCTS - PRODUCTS // 2):08d}' for _ in range(LOOKUPS // 2)]
+    random.shuffle(ids)
+    run('before', linear_lookup, ids)
+    run('after', agri.product_catalog.lookup, ids)
@@ -0,0 +1,100 @@
+"""
+Benchmark + regression check for /api/products-by-category: DB queries and
+latency per request as the catalog grows, one get_user_details() lookup per
+product (before) vs the catalog's category index (after).
+
+Every sqlite3 connection is traced, and the script fails if the number of
+queries for a cold (catalog reload) or warm request depends on the number of
+products or sellers.
+
+Run from the project root:  python benchmarks/bench_products_by_category.py
+"""
+
+import os
+import sqlite3
+import time
+
+from common import load_app_copy
+
+agri = load_app_copy()
+
+SIZES = [int(n) for n in os.environ.get('BENCH_SIZES', '100,2000,20000').split(',')]
+PRODUCTS_PER_SELLER = 4
+
+executed = []
+_connect = sqlite3.connect
+
+
+def traced_connect(*args, **kwargs):
+    conn = _connect(*args, **kwargs)
+    conn.set_trace_callback(lambda statement: None if statement.startswith('--') else executed.append(statement))
+    return conn
+
+
+def seed_catalog(start, stop):
+    """Add products BC<start>..BC<stop-1> with a new seller for every few products."""
+    conn = _connect(agri.DB_PATH)
+    sellers = range(start // PRODUCTS_PER_SELLER, (stop - 1) // PRODUCTS_PER_SELLER + 1)
+    conn.executemany(
+        'INSERT OR IGNORE INTO user_details (username, name, pincode) VALUES (?, ?, ?)',
+        [(f'bench_seller{i}', f'Bench Seller {i}', '560001') for i in sellers]
+    )
+    conn.executemany(
+        """INSERT INTO farmer_products (product_id, farmer_username, name, category, price, stock, unit)
+           VALUES (?, ?, ?, ?, 10, 100, 'kg')""",
+        [(f'BC{i:08d}', f'bench_seller{i // PRODUCTS_PER_SELLER}', f'Product {i}', f'Category {i % 12}')
+         for i in range(start, stop)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def n_plus_one_request():
+    """The endpoint as it was: a get_user_details() call per in-stock farmer product."""
+    products_by_category = {}
+    for p in agri.product_catalog.products():
+        if p.get('seller_type') == 'farmer' and p.get('stock', 0) > 0:
+            user = agri.get_user_details(p.get('seller_username'))
+            farmer_name = user['name'] if user and user.get('name') else p.get('seller_username')
+            products_by_category.setdefault(p['category'], []).append({
+                'product_id': p['id'], 'name': p['name'], 'farmer_name': farmer_name,
+            })
+    return agri.jsonify({'success': True, 'products_by_category': products_by_category})
+
+
+def measure(request):
+    executed.clear()
+    start = time.perf_counter()
+    request()
+    return len(executed), (time.perf_counter() - start) * 1000
+
+
+if __name__ == '__main__':
+    client = agri.app.test_client()
+    endpoint = lambda: client.get('/api/products-by-category')
+    sqlite3.connect = traced_connect
+    try:
+        # Fresh catalog so its connection is traced too
+        agri.product_catalog = agri.ProductCatalog(agri.DB_PATH)
+        counts = set()
+        seeded = 0
+        print(f"{'products':>9} {'before':>22} {'after (cold)':>22} {'after (warm)':>22}")
+        for size in SIZES:
+            seed_catalog(seeded, size)
+            seeded = size
+            with agri.app.test_request_context():
+                agri.product_catalog.products()
+                before = measure(n_plus_one_request)
+            agri.product_catalog.invalidate()
+            cold = measure(endpoint)
+            warm = measure(endpoint)
+            counts.add((cold[0], warm[0]))
+            print(f"{size:>9,} " + ' '.join(f"{q:>7} queries {ms:7.1f} ms" for q, ms in (before, cold, warm)))
+
+        assert len(counts) == 1, f"query count grows with the catalog: {sorted(counts)}"
+        body = client.get('/api/products-by-category').get_json()
+        entry = next(p for p in body['products_by_category']['Category 1'] if p['product_id'] == 'BC00000001')
+        assert entry['farmer_name'] == 'Bench Seller 0', entry
+        print("constant query count: yes")
+    finally:
+        sqlite3.connect = _connect
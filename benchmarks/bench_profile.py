@@ -0,0 +1,219 @@
+"""
+Benchmark: the data behind /profile.html for a customer with many orders.
+
+Before: the order list, then a Python loop over every order for the
+header figures and a MIN(created_at) query over the customer's orders.
+After: the same order list, and the header read from the customer's
+customer_order_stats row (see order_stats.py). The header part is timed
+on its own as well, since it is what grows with the order count beyond
+the list itself.
+
+It checks both produce the same list and header, that the trigger-kept
+stats match a full recompute after status updates, re-pricing and
+deletes, and reports what the triggers cost an order insert.
+
+GET /api/profile used to return every order; it now returns a page. Its
+latency is timed against the old endpoint, for this customer and for one
+with SMALL_CUSTOMER_ORDERS orders, to show that a page costs the same
+whatever the order count.
+
+Run from the project root:  python benchmarks/bench_profile.py
+"""
+
+import os
+import random
+import sqlite3
+import time
+
+from flask import jsonify, session
+
+from common import load_app_copy
+
+agri = load_app_copy()
+
+from order_stats import STATUS_COLUMNS  # noqa: E402  (imported from the app copy)
+from repository import CUSTOMER_ORDER_STATS, CUSTOMER_ORDERS, NO_ORDER_STATS, CustomerOrder, Query  # noqa: E402
+from timestamps import UNKNOWN_TIMESTAMP  # noqa: E402
+
+CUSTOMER = 'bench_customer'
+SMALL_CUSTOMER = 'bench_small'
+SMALL_CUSTOMER_ORDERS = 20
+CUSTOMER_ORDER_COUNT = int(os.environ.get('BENCH_CUSTOMER_ORDERS', 2_000))
+OTHER_ORDERS = int(os.environ.get('BENCH_OTHER_ORDERS', 200_000))
+ITEMS_PER_ORDER = 3
+ROUNDS = int(os.environ.get('BENCH_ROUNDS', 50))
+
+INSERT_ORDER = """
+    INSERT INTO orders (order_number, username, name, address, pincode, phone, total_amount,
+                        status, created_at, payment_method, otp)
+    VALUES (?, ?, 'Customer', 'Bench Street', '560001', '9000000000', ?, ?, ?, 'COD', '123456')
+"""
+
+LEGACY_CUSTOMER_ORDERS_BY_DATE = '''
+    SELECT o.id, o.order_number, o.username, o.name, o.address, o.pincode, o.phone,
+           o.total_amount, o.status, o.created_at, o.payment_method, o.otp,
+           (SELECT COUNT(*) FROM order_items oi WHERE oi.order_id = o.id)
+    FROM orders o
+    WHERE o.username = ? AND o.created_at >= ? AND o.created_at < ?
+    ORDER BY o.created_at DESC
+'''
+
+RECOMPUTE = f'''
+    SELECT username, COUNT(*), COALESCE(SUM(total_amount), 0),
+           {', '.join(f"SUM(status = '{status}')" for status in STATUS_COLUMNS)},
+           MIN(NULLIF(created_at, '{UNKNOWN_TIMESTAMP}'))
+    FROM orders
+    GROUP BY username
+    ORDER BY username
+'''
+
+
+def order_rows(rng, count, username):
+    for n in range(count):
+        yield (f'BENCH{username}{n:08d}', username if username else f'bench_other{n % 5000}',
+               rng.choice((None, rng.randint(50, 900))) if n % 50 == 0 else rng.randint(50, 900),
+               rng.choice(('pending', 'paid', 'completed', 'cancelled')),
+               f'2026-01-{n % 28 + 1:02d} 10:{n % 60:02d}:00')
+
+
+def seed(conn):
+    rng = random.Random(22)
+    conn.executemany(INSERT_ORDER, order_rows(rng, OTHER_ORDERS, ''))
+    conn.executemany(INSERT_ORDER, order_rows(rng, CUSTOMER_ORDER_COUNT, CUSTOMER))
+    conn.executemany(INSERT_ORDER, order_rows(rng, SMALL_CUSTOMER_ORDERS, SMALL_CUSTOMER))
+    conn.execute(f'''
+        INSERT INTO order_items (order_id, product_id, product_name, quantity, price)
+        SELECT o.id, 'BENCH_TOMATO', 'Tomato', 1 + n.value, 40
+        FROM orders o, (SELECT 0 AS value UNION ALL SELECT 1 UNION ALL SELECT 2) n
+        WHERE o.order_number LIKE 'BENCH%' AND n.value < {ITEMS_PER_ORDER}
+    ''')
+    conn.commit()
+
+
+def legacy_header(conn, orders):
+    total_spent = 0
+    pending_count = 0
+    completed_count = 0
+    for order in orders:
+        total_spent += order.total_amount if order.total_amount else 0
+        if order.status == 'pending':
+            pending_count += 1
+        elif order.status == 'completed':
+            completed_count += 1
+    first_order = conn.execute('SELECT MIN(created_at) FROM orders WHERE username = ?', (CUSTOMER,)).fetchone()
+    member_since = first_order[0] if first_order and first_order[0] else 'Recent'
+    return len(orders), pending_count, completed_count, total_spent, member_since
+
+
+def header(conn):
+    stats = CUSTOMER_ORDER_STATS.one(conn, (CUSTOMER,), NO_ORDER_STATS)
+    return (stats.order_count, stats.pending_orders, stats.completed_orders, stats.total_spent,
+            stats.first_order_at or 'Recent')
+
+
+def legacy_profile(conn):
+    """The profile's orders and header as they used to be computed."""
+    orders = CUSTOMER_ORDERS.records(conn, (CUSTOMER,))
+    return orders, legacy_header(conn, orders)
+
+
+def profile(conn):
+    return CUSTOMER_ORDERS.records(conn, (CUSTOMER,)), header(conn)
+
+
+def legacy_api_profile():
+    """/api/profile as it was: every order in the date range and totals summed in Python."""
+    username = session.get('username')
+    start, end = agri.request_date_range()
+    conn = agri.get_db()
+    orders = Query(CustomerOrder, LEGACY_CUSTOMER_ORDERS_BY_DATE).dicts(conn, (username, start, end))
+    total_spent = 0
+    pending_count = 0
+    completed_count = 0
+    for order in orders:
+        total_spent += order['total_amount'] or 0  # the old loop raised TypeError on NULL
+        if order['status'] == 'pending':
+            pending_count += 1
+        elif order['status'] == 'completed':
+            completed_count += 1
+    conn.close()
+    return jsonify({'success': True, 'orders': orders, 'total_orders': len(orders),
+                    'pending_orders': pending_count, 'completed_orders': completed_count,
+                    'total_spent': total_spent})
+
+
+def api_latency(username, path):
+    client = agri.app.test_client()
+    with client.session_transaction() as s:
+        s['username'] = username
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        response = client.get(path)
+        assert response.status_code == 200
+    return (time.perf_counter() - start) / ROUNDS, len(response.get_json()['orders'])
+
+
+def timed(fn, conn):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = fn(conn)
+    return (time.perf_counter() - start) / ROUNDS, result
+
+
+def stats_match(conn):
+    kept = conn.execute('SELECT * FROM customer_order_stats WHERE order_count > 0 ORDER BY username').fetchall()
+    return kept == conn.execute(RECOMPUTE).fetchall()
+
+
+def insert_cost(conn, label):
+    rng = random.Random(7)
+    start = time.perf_counter()
+    conn.executemany(INSERT_ORDER, order_rows(rng, 20_000, f'insert{label}'))
+    conn.commit()
+    return (time.perf_counter() - start) / 20_000
+
+
+def main():
+    conn = sqlite3.connect(agri.DB_PATH)
+    seed(conn)
+
+    before, (before_orders, before_header) = timed(legacy_profile, conn)
+    after, (after_orders, after_header) = timed(profile, conn)
+    assert after_orders == before_orders, 'order lists differ'
+    assert after_header[:3] == before_header[:3] and after_header[4] == before_header[4], 'headers differ'
+    assert abs(after_header[3] - before_header[3]) < 1e-6, 'total spent differs'
+    print(f"profile data, {CUSTOMER_ORDER_COUNT:,} orders x {ITEMS_PER_ORDER} items "
+          f"({OTHER_ORDERS:,} other orders in the table)")
+    print(f"  before {before * 1000:8.2f} ms")
+    print(f"  after  {after * 1000:8.2f} ms   ({before / after:.2f}x)")
+    before, _ = timed(lambda conn: legacy_header(conn, before_orders), conn)
+    after, _ = timed(header, conn)
+    print(f"header figures alone: before {before * 1000:.3f} ms, after {after * 1000:.3f} ms ({before / after:.0f}x)")
+
+    agri.app.add_url_rule('/bench/legacy-profile', 'legacy_api_profile', legacy_api_profile)
+    print("GET /api/profile")
+    for username, count in ((SMALL_CUSTOMER, SMALL_CUSTOMER_ORDERS), (CUSTOMER, CUSTOMER_ORDER_COUNT)):
+        before, before_count = api_latency(username, '/bench/legacy-profile')
+        after, after_count = api_latency(username, '/api/profile')
+        print(f"  {count:>6,} orders: before {before * 1000:7.2f} ms ({before_count:,} orders), "
+              f"after {after * 1000:6.2f} ms (first page, {after_count} orders)")
+
+    conn.execute("UPDATE orders SET status = 'completed' WHERE username = ? AND status = 'pending'", (CUSTOMER,))
+    conn.execute('UPDATE orders SET total_amount = total_amount + 1 WHERE id % 7 = 0')
+    conn.execute('DELETE FROM orders WHERE id % 11 = 0')
+    conn.commit()
+    ok = stats_match(conn)
+    print(f"stats match a full recompute after updates and deletes: {'yes' if ok else 'NO'}")
+
+    with_triggers = insert_cost(conn, 'a')
+    for trigger in ('insert', 'update', 'delete'):
+        conn.execute(f'DROP TRIGGER trg_orders_{trigger}_stats')
+    without_triggers = insert_cost(conn, 'b')
+    print(f"order insert {without_triggers * 1e6:.1f} us without the stats trigger, "
+          f"{with_triggers * 1e6:.1f} us with it")
+    conn.close()
+    return ok
+
+
+if __name__ == '__main__':
+    raise SystemExit(0 if main() else 1)
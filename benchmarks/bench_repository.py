@@ -0,0 +1,171 @@
+"""
+Benchmark: order listings on 1M orders, built from sqlite3.Row objects copied
+field by field into dicts (before) vs repository Query records and dicts
+(after).
+
+1. The admin panel's in-memory order list (every order, kept for grouping
+   and rendering): build time and size of the retained list.
+2. GET /api/admin/orders end to end: throughput and peak traced memory,
+   and a check that both versions return the same orders.
+
+Run from the project root:  python benchmarks/bench_repository.py
+"""
+
+import gc
+import json
+import os
+import random
+import sqlite3
+import time
+import tracemalloc
+
+from flask import jsonify, session
+
+from common import load_app_copy
+
+agri = load_app_copy()
+
+from repository import ALL_ORDERS_BY_DATE  # noqa: E402  (imported from the app copy)
+from timestamps import MAX_TIMESTAMP, MIN_TIMESTAMP, format_ist, iso_utc  # noqa: E402
+
+ORDERS = int(os.environ.get('BENCH_ORDERS', 1_000_000))
+
+
+def seed():
+    rng = random.Random(16)
+    conn = sqlite3.connect(agri.DB_PATH)
+    conn.executemany(
+        """INSERT INTO orders (order_number, username, name, address, pincode, phone, total_amount,
+                               status, created_at, payment_method, otp)
+           VALUES (?, ?, ?, 'Bench Street, Bengaluru', ?, '9000000000', ?, ?, ?, 'COD', ?)""",
+        ((f'BENCH{n:08d}', f'bench_customer{n % 5000}', f'Customer {n % 5000}', f'5600{n % 100:02d}',
+          rng.randint(50, 900), rng.choice(('pending', 'paid', 'completed', 'cancelled')),
+          f'2026-01-{n % 28 + 1:02d} 10:{n % 60:02d}:00', f'{rng.randint(0, 999999):06d}')
+         for n in range(ORDERS))
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_api_admin_orders():
+    """/api/admin/orders as it was: sqlite3.Row rows copied into dicts.
+
+    Selects payment_method and otp and renders created_at, as the endpoint
+    now does, so both versions produce the same orders.
+    """
+    if not session.get('username') or session.get('username') != 'admin':
+        return jsonify({'success': False}), 403
+    conn = agri.get_db()
+    conn.row_factory = sqlite3.Row
+    cur = conn.cursor()
+    cur.execute('''
+        SELECT id, order_number, username, name, address, pincode, phone,
+               total_amount, status, created_at, payment_method, otp
+        FROM orders
+        ORDER BY created_at DESC
+    ''')
+    orders = []
+    for order in cur.fetchall():
+        orders.append({
+            'id': order['id'],
+            'order_number': order['order_number'],
+            'username': order['username'],
+            'name': order['name'],
+            'address': order['address'],
+            'pincode': order['pincode'],
+            'phone': order['phone'],
+            'total_amount': order['total_amount'],
+            'status': order['status'],
+            'created_at': format_ist(order['created_at']),
+            'payment_method': order['payment_method'],
+            'otp': order['otp'],
+            'created_at_utc': iso_utc(order['created_at'])
+        })
+    conn.close()
+    return jsonify({'success': True, 'orders': orders})
+
+
+def legacy_admin_order_list(conn):
+    """The admin panel's order list as it was: tuples copied into dicts by position."""
+    cur = conn.cursor()
+    cur.execute('''
+        SELECT id, order_number, username, name, address, pincode, phone,
+               total_amount, status, created_at, payment_method, otp
+        FROM orders
+        ORDER BY id DESC
+    ''')
+    return [{
+        'id': order[0],
+        'order_number': order[1],
+        'username': order[2],
+        'name': order[3],
+        'address': order[4],
+        'pincode': order[5],
+        'phone': order[6],
+        'total_amount': order[7],
+        'status': order[8],
+        'created_at': order[9],
+        'payment_method': order[10],
+        'otp': order[11]
+    } for order in cur.fetchall()]
+
+
+def traced(fn):
+    """(seconds, result, peak MiB, retained MiB): timed untraced, then re-run under tracemalloc."""
+    gc.collect()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    del result
+    gc.collect()
+    tracemalloc.start()
+    result = fn()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, result, peak / 2 ** 20, current / 2 ** 20
+
+
+def bench_api(label, admin):
+    def fetch():
+        response = admin.get('/api/admin/orders')
+        assert response.status_code == 200
+        return response.get_data()
+    elapsed, body, peak, _ = traced(fetch)
+    print(f"{label:<7} /api/admin/orders  {ORDERS / elapsed:9,.0f} orders/s   {elapsed:6.2f} s   "
+          f"peak {peak:6.0f} MiB   {len(body) / 2 ** 20:.0f} MiB of JSON")
+    orders = json.loads(body)['orders']
+    sample = (len(orders), orders[:500], orders[-500:])
+    return elapsed, peak, sample
+
+
+def bench_list(label, build):
+    conn = sqlite3.connect(agri.DB_PATH)
+    elapsed, orders, peak, retained = traced(lambda: build(conn))
+    conn.close()
+    print(f"{label:<7} admin order list   {ORDERS / elapsed:9,.0f} orders/s   {elapsed:6.2f} s   "
+          f"peak {peak:6.0f} MiB   retained {retained:6.0f} MiB")
+    return elapsed, retained
+
+
+if __name__ == '__main__':
+    seed()
+    print(f"{ORDERS:,} orders")
+    admin = agri.app.test_client()
+    with admin.session_transaction() as s:
+        s['username'] = 'admin'
+
+    before_list = bench_list('before', legacy_admin_order_list)
+    after_list = bench_list('after', lambda conn: ALL_ORDERS_BY_DATE.records(conn, (MIN_TIMESTAMP, MAX_TIMESTAMP)))
+
+    api_admin_orders = agri.app.view_functions['api_admin_orders']
+    agri.app.view_functions['api_admin_orders'] = legacy_api_admin_orders
+    before_api = bench_api('before', admin)
+    agri.app.view_functions['api_admin_orders'] = api_admin_orders
+    after_api = bench_api('after', admin)
+    assert before_api[2] == after_api[2], 'responses differ'
+
+    print("/api/admin/orders responses match: yes")
+    print(f"/api/admin/orders  {before_api[0] / after_api[0]:.2f}x throughput, "
+          f"peak memory {after_api[1] / before_api[1]:.0%} of before")
+    print(f"admin order list   {before_list[0] / after_list[0]:.2f}x throughput, "
+          f"retained memory {after_list[1] / before_list[1]:.0%} of before")
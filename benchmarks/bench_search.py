@@ -0,0 +1,145 @@
+"""
+Benchmark: product search on a 500k-product synthetic catalog, LIKE scan over
+the catalog tables (before) vs the FTS5 index with BM25 ranking (after).
+Broad queries are also timed ranking every match ('all') instead of only
+their newest SEARCH_CANDIDATES, the cost the cap avoids.
+
+Run from the project root:  python benchmarks/bench_search.py
+"""
+
+import itertools
+import os
+import random
+import sqlite3
+import statistics
+import time
+
+from common import load_app_copy
+
+agri = load_app_copy()
+
+from search import search_products  # noqa: E402  (imported from the app copy)
+
+PRODUCTS = int(os.environ.get('BENCH_PRODUCTS', 500_000))
+QUERIES = int(os.environ.get('BENCH_QUERIES', 500))
+FARMERS = 2_000
+
+CROPS = ['tomato', 'potato', 'onion', 'carrot', 'cabbage', 'spinach', 'brinjal', 'okra', 'garlic',
+         'ginger', 'mango', 'banana', 'guava', 'papaya', 'chilli', 'beans', 'peas', 'radish',
+         'pumpkin', 'cucumber', 'coriander', 'mint', 'turmeric', 'jaggery', 'millet', 'ragi',
+         'paddy', 'wheat', 'groundnut', 'coconut', 'lemon', 'pomegranate']
+ADJECTIVES = ['organic', 'fresh', 'hybrid', 'desi', 'premium', 'green', 'red', 'baby', 'local', 'farm']
+CATEGORIES = ['Vegetables', 'Fruits', 'Grains', 'Spices', 'Dairy', 'Seeds']
+FIRST_NAMES = ['Ravi', 'Lakshmi', 'Suresh', 'Anitha', 'Murugan', 'Kavya', 'Ramesh', 'Divya', 'Arjun', 'Meena']
+SYLLABLES = ['ka', 've', 'ri', 'so', 'na', 'mu', 'thi', 'ra', 'pa', 'lo', 'gu', 'de', 'sha', 'mi', 'van', 'dru']
+
+# Broad queries that match a large share of the catalog
+BROAD_QUERIES = ['tom', 'organic', 'fresh mang', 'ravi', 'hybrid tomato', 'pa']
+
+
+def zipf_sampler(rng, words):
+    """Sample words with Zipf-like frequencies, like real product text."""
+    weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+    return lambda k: rng.choices(words, cum_weights=weights, k=k)
+
+
+def seed_catalog(rng):
+    """Names mix crops with variety/brand words; descriptions mention the crop plus
+    generic words from a 5k-word vocabulary."""
+    words = sorted({''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(20_000)})
+    rng.shuffle(words)
+    varieties = zipf_sampler(rng, words[:3_000])
+    description = zipf_sampler(rng, words[3_000:8_000])
+
+    conn = sqlite3.connect(agri.DB_PATH)
+    conn.executemany(
+        'INSERT INTO user_details (username, name, pincode) VALUES (?, ?, ?)',
+        [(f'bench_farmer{i}', f'{rng.choice(FIRST_NAMES)} {words[i]}', f'56{i % 100:04d}')
+         for i in range(FARMERS)]
+    )
+    rows = []
+    for i in range(PRODUCTS):
+        name = [rng.choice(ADJECTIVES)] if rng.random() < 0.3 else []
+        crop = rng.choice(CROPS)
+        name += varieties(rng.randint(1, 2)) + [crop]
+        rows.append((
+            f'BP{i:08d}', f'bench_farmer{rng.randrange(FARMERS)}', ' '.join(name),
+            rng.choice(CATEGORIES), rng.randint(10, 500), ' '.join(description(12) + [crop]),
+        ))
+    conn.executemany(
+        """INSERT INTO farmer_products (product_id, farmer_username, name, category, price, description, stock, unit)
+           VALUES (?, ?, ?, ?, ?, ?, 100, 'kg')""",
+        rows
+    )
+    conn.execute("INSERT INTO product_search (product_search) VALUES ('optimize')")
+    conn.commit()
+    conn.close()
+    return rows
+
+
+def sample_queries(rng, rows, count):
+    """What users type: one or two words of a real product name, the last often unfinished."""
+    queries = []
+    for _ in range(count):
+        terms = rng.choice(rows)[2].split()
+        terms = terms[-rng.randint(1, min(2, len(terms))):]
+        if rng.random() < 0.5 and len(terms[-1]) > 3:
+            terms[-1] = terms[-1][:rng.randint(3, len(terms[-1]) - 1)]
+        queries.append(' '.join(terms))
+    return queries
+
+
+def like_search(conn, text, limit=20):
+    """What a search without an index has to do: scan every product and seller name."""
+    terms = text.lower().split()
+    where = ' AND '.join(
+        "(fp.name LIKE ? OR fp.category LIKE ? OR fp.description LIKE ? OR COALESCE(ud.name, '') LIKE ?)"
+        for _ in terms
+    )
+    params = [f'%{term}%' for term in terms for _ in range(4)]
+    return conn.execute(
+        f'''SELECT 'home', fp.product_id FROM farmer_products fp
+            LEFT JOIN user_details ud ON ud.username = fp.farmer_username
+            WHERE {where} LIMIT ?''',
+        params + [limit]
+    ).fetchall()
+
+
+def run(label, search, conn, queries):
+    timings = []
+    for text in queries:
+        start = time.perf_counter()
+        search(conn, text)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<8} p50 {statistics.median(timings):8.2f} ms   p95 {p95:8.2f} ms   max {timings[-1]:8.2f} ms")
+    return p95
+
+
+if __name__ == '__main__':
+    rng = random.Random(9)
+    start = time.perf_counter()
+    rows = seed_catalog(rng)
+    print(f"{PRODUCTS:,} products seeded and indexed in {time.perf_counter() - start:.1f} s")
+
+    conn = sqlite3.connect(agri.DB_PATH)
+    queries = sample_queries(rng, rows, QUERIES)
+    for text in queries[:50]:
+        search_products(conn, text)  # warm the page cache
+
+    # Sanity checks: prefix matching, ranking by name, no false matches
+    target = rows[12_345]
+    hits = search_products(conn, target[2][:-2], limit=100)
+    assert ('home', target[0]) in hits, target
+    top = search_products(conn, 'organic tomato', limit=1)
+    name = conn.execute('SELECT name FROM farmer_products WHERE product_id = ?', (top[0][1],)).fetchone()[0]
+    assert 'organic' in name and 'tomato' in name, name
+    assert not search_products(conn, 'zzzz'), 'unexpected match'
+
+    run('before', like_search, conn, queries[:max(QUERIES // 20, 1)])
+    p95 = run('after', search_products, conn, queries)
+    run('broad', search_products, conn, BROAD_QUERIES * 10)
+    # The same queries ranking every match rather than the newest SEARCH_CANDIDATES
+    run('all', lambda conn, text: search_products(conn, text, candidates=None), conn, BROAD_QUERIES * 2)
+    print(f"FTS5 p95 under 10 ms: {'yes' if p95 < 10 else 'NO'}")
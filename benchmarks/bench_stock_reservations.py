@@ -0,0 +1,131 @@
+"""
+Concurrency benchmark: many threads placing orders for one popular SKU
+through /api/place-order. Orders are accepted without touching stock
+(before) vs reserved with a conditional decrement (after).
+
+Checks that the reserved units never exceed the stock, that the reserved
+units match the stock taken, and that cancelling returns the stock.
+
+Run from the project root:  python benchmarks/bench_stock_reservations.py
+"""
+
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from common import load_app_copy
+
+agri = load_app_copy()
+
+import order_service  # noqa: E402  (imported from the app copy)
+
+THREADS = int(os.environ.get('BENCH_THREADS', 16))
+ORDERS_PER_THREAD = int(os.environ.get('BENCH_ORDERS', 60))
+STOCK = int(os.environ.get('BENCH_STOCK', 1000))
+SKU = 'BENCH_MILK'
+
+
+def seed():
+    conn = sqlite3.connect(agri.DB_PATH)
+    conn.execute(
+        """INSERT INTO farmer_products (product_id, farmer_username, name, category, price, stock, unit, seller_type)
+           VALUES (?, 'bench_farmer', 'Fresh Milk', 'Dairy', 30, ?, 'litre', 'farmer')""",
+        (SKU, STOCK)
+    )
+    conn.executemany(
+        'INSERT INTO user_details (username, name, address, phone, pincode) VALUES (?, ?, ?, ?, ?)',
+        [(f'bench_customer{i}', f'Customer {i}', 'Bench Street', '9000000000', '560001') for i in range(THREADS)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def reset_stock():
+    conn = sqlite3.connect(agri.DB_PATH)
+    conn.execute('UPDATE farmer_products SET stock = ? WHERE product_id = ?', (STOCK, SKU))
+    conn.execute('DELETE FROM stock_reservations')
+    conn.commit()
+    conn.close()
+
+
+def hammer():
+    """Run the load; returns (accepted orders, accepted units, rejected, errors, seconds)."""
+    results = []
+    lock = threading.Lock()
+    start_gate = threading.Barrier(THREADS)
+
+    def worker(n):
+        client = agri.app.test_client()
+        with client.session_transaction() as session:
+            session['username'] = f'bench_customer{n}'
+        rng = random.Random(n)
+        mine = []
+        start_gate.wait()
+        for _ in range(ORDERS_PER_THREAD):
+            qty = rng.randint(1, 3)
+            response = client.post('/api/place-order', json={
+                'cart': [{'id': SKU, 'name': 'Fresh Milk', 'qty': qty, 'price': 30}]
+            })
+            mine.append((response.status_code, qty))
+        with lock:
+            results.extend(mine)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    accepted = [qty for status, qty in results if status == 200]
+    rejected = sum(1 for status, _ in results if status == 400)
+    errors = len(results) - len(accepted) - rejected
+    return len(accepted), sum(accepted), rejected, errors, elapsed
+
+
+def report(label, accepted, units, rejected, errors, elapsed):
+    attempts = accepted + rejected + errors
+    print(f"{label:<7} {attempts / elapsed:7.0f} orders/s   accepted {accepted:5} ({units:5} units)   "
+          f"rejected {rejected:5}   errors {errors:3}   oversold {max(units - STOCK, 0):5} units")
+
+
+if __name__ == '__main__':
+    seed()
+    print(f"{THREADS} threads x {ORDERS_PER_THREAD} orders of 1-3 units, stock {STOCK}")
+
+    # Before: orders were accepted without reserving stock
+    reserve_order_stock = order_service.reserve_order_stock
+    order_service.reserve_order_stock = lambda cur, order_id, items, now=None: 0
+    report('before', *hammer())
+    order_service.reserve_order_stock = reserve_order_stock
+
+    reset_stock()
+    accepted, units, rejected, errors, elapsed = hammer()
+    report('after', accepted, units, rejected, errors, elapsed)
+
+    conn = sqlite3.connect(agri.DB_PATH)
+    stock = conn.execute('SELECT stock FROM farmer_products WHERE product_id = ?', (SKU,)).fetchone()[0]
+    reserved = conn.execute(
+        "SELECT COALESCE(SUM(quantity), 0) FROM stock_reservations WHERE product_id = ? AND status = 'reserved'",
+        (SKU,)
+    ).fetchone()[0]
+    assert errors == 0, f'{errors} requests failed'
+    assert units <= STOCK and stock >= 0, 'oversold'
+    assert reserved == units == STOCK - stock, (reserved, units, stock)
+
+    # Cancelling every order returns all reserved stock
+    order_ids = [row[0] for row in conn.execute(
+        "SELECT DISTINCT order_id FROM stock_reservations WHERE status = 'reserved'"
+    )]
+    conn.close()
+    admin = agri.app.test_client()
+    with admin.session_transaction() as session:
+        session['username'] = 'admin'
+    for order_id in order_ids:
+        admin.post('/api/update-order-status', json={'order_id': order_id, 'status': 'cancelled'})
+    conn = sqlite3.connect(agri.DB_PATH)
+    assert conn.execute('SELECT stock FROM farmer_products WHERE product_id = ?', (SKU,)).fetchone()[0] == STOCK
+    print(f"no oversells: yes ({STOCK - stock} of {STOCK} units reserved, all returned on cancel)")
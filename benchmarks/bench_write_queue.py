@@ -0,0 +1,156 @@
+"""
+Benchmark: small writes from concurrent threads, each committed on its own
+pooled connection (before) vs batched by the group-commit WriteQueue
+(after).
+
+1. The write path alone: one feedback INSERT per call, committed directly
+   with synchronous=NORMAL (what the routes did) and FULL (the durability
+   the queue gives), vs WriteQueue.execute() and submit().
+2. The endpoints end to end: a burst of feedback, community replies, soil
+   test bookings and notification read flags through the Flask app.
+
+Run from the project root:  python benchmarks/bench_write_queue.py
+"""
+
+import os
+import statistics
+import sqlite3
+import threading
+import time
+
+from common import load_app_copy
+
+agri = load_app_copy()
+
+THREADS = int(os.environ.get('BENCH_THREADS', 16))
+REQUESTS = int(os.environ.get('BENCH_REQUESTS', 300))
+FARMER = 'bench_farmer'
+
+
+class DirectWrites:
+    """The routes' writes as they were: run and committed on the request's connection."""
+
+    def execute(self, sql, params=()):
+        conn = agri.get_db()
+        cur = conn.execute(sql, params)
+        conn.commit()
+        return cur
+
+    submit = execute
+
+    def flush(self):
+        pass
+
+
+def seed():
+    conn = sqlite3.connect(agri.DB_PATH)
+    conn.execute("INSERT INTO user_details (username, name, login_type) VALUES (?, 'Bench Farmer', 'farmer')", (FARMER,))
+    conn.executemany(
+        """INSERT INTO farmer_order_notifications (farmer_username, order_id, product_id, product_name, quantity,
+                                                   customer_username, customer_name, status, created_at, price)
+           VALUES (?, ?, 'P1', 'Product', 1, 'bench_customer', 'Customer', 'pending', '2026-01-01 00:00:00', 50)""",
+        [(FARMER, n) for n in range(THREADS * REQUESTS)]
+    )
+    first_notification = conn.execute('SELECT MIN(id) FROM farmer_order_notifications WHERE farmer_username = ?', (FARMER,)).fetchone()[0]
+    cur = conn.execute("INSERT INTO community_posts (username, title, content, created_at) VALUES (?, 'Bench', 'Post', '2026-01-01 00:00:00')", (FARMER,))
+    conn.commit()
+    conn.close()
+    return cur.lastrowid, first_notification
+
+
+def unread_notifications(reset=False):
+    """Unread bench notifications: a quarter of the requests flag one each."""
+    conn = sqlite3.connect(agri.DB_PATH)
+    unread = conn.execute('SELECT COUNT(*) FROM farmer_order_notifications WHERE farmer_username = ? AND read_status = 0', (FARMER,)).fetchone()[0]
+    if reset:
+        conn.execute('UPDATE farmer_order_notifications SET read_status = 0 WHERE farmer_username = ?', (FARMER,))
+        conn.commit()
+    conn.close()
+    return unread
+
+
+def worker(number, post_id, first_notification, latencies):
+    client = agri.app.test_client()
+    with client.session_transaction() as session:
+        session['username'] = FARMER
+    for n in range(REQUESTS):
+        kind = n % 4
+        start = time.perf_counter()
+        if kind == 0:
+            response = client.post('/api/feedback', json={'name': 'Bench', 'email': 'bench@example.com', 'rating': 5})
+        elif kind == 1:
+            response = client.post(f'/api/community/posts/{post_id}/replies', json={'content': f'Reply {number}.{n}'})
+        elif kind == 2:
+            response = client.post('/api/book-soil-test', json={'farm_location': 'Bench', 'farm_size': 2, 'contact_number': '9000000000',
+                                                               'preferred_date': '2026-02-01', 'test_type': 'basic'})
+        else:
+            response = client.put(f'/api/farmer/mark-notification-read/{first_notification + number * REQUESTS + n}')
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code == 200, response.get_data()
+
+
+FEEDBACK_SQL = """INSERT INTO customer_feedback (name, email, phone, rating, message, page_source, created_at)
+                  VALUES ('Bench', 'bench@example.com', '', 5, '', 'bench', '2026-01-01 00:00:00')"""
+
+
+def timed_threads(target):
+    threads = [threading.Thread(target=target, args=(number,)) for number in range(THREADS)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    agri.write_queue.flush()
+    return time.perf_counter() - start
+
+
+def bench_write_path(label, write):
+    elapsed = timed_threads(lambda number: [write() for _ in range(REQUESTS)])
+    print(f"{label:<26} {THREADS * REQUESTS / elapsed:8,.0f} writes/s")
+    return THREADS * REQUESTS / elapsed
+
+
+def direct_write(synchronous):
+    local = threading.local()
+
+    def write():
+        if not hasattr(local, 'conn'):
+            local.conn = agri.db_pool.take()
+            local.conn.execute(f'PRAGMA synchronous = {synchronous}')
+        local.conn.execute(FEEDBACK_SQL)
+        local.conn.commit()
+    return write
+
+
+def run(label, post_id, first_notification):
+    latencies = []
+    elapsed = timed_threads(lambda number: worker(number, post_id, first_notification, latencies))
+    latencies.sort()
+    writes = THREADS * REQUESTS
+    print(f"{label:<7} endpoints {writes / elapsed:8,.0f} writes/s   {elapsed:6.2f} s   "
+          f"p50 {statistics.median(latencies) * 1000:6.2f} ms   p99 {latencies[int(len(latencies) * 0.99)] * 1000:6.2f} ms")
+    return writes / elapsed
+
+
+if __name__ == '__main__':
+    post_id, first_notification = seed()
+    expected_unread = THREADS * REQUESTS - THREADS * (REQUESTS // 4)
+    print(f"{THREADS} threads x {REQUESTS} writes")
+    write_queue = agri.write_queue
+
+    normal = bench_write_path('direct, synchronous=NORMAL', direct_write('NORMAL'))
+    full = bench_write_path('direct, synchronous=FULL', direct_write('FULL'))
+    acknowledged = bench_write_path('WriteQueue.execute()', lambda: write_queue.execute(FEEDBACK_SQL))
+    bench_write_path('WriteQueue.submit()', lambda: write_queue.submit(FEEDBACK_SQL))
+    print(f"write path: execute() {acknowledged / normal:.2f}x direct NORMAL, {acknowledged / full:.2f}x direct FULL")
+    write_queue.batches = write_queue.writes = 0
+
+    agri.write_queue = DirectWrites()
+    before = run('before', post_id, first_notification)
+    assert unread_notifications(reset=True) == expected_unread
+    agri.write_queue = write_queue
+    after = run('after', post_id, first_notification)
+    assert unread_notifications() == expected_unread
+    print(f"after: {write_queue.writes:,} writes in {write_queue.batches:,} transactions "
+          f"({write_queue.writes / write_queue.batches:.1f} per commit)")
+    print(f"endpoints: {after / before:.2f}x writes/s")
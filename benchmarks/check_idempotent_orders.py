@@ -0,0 +1,140 @@
+"""
+Idempotency check: a retry storm on the order endpoints. For each
+endpoint, THREADS clients send the same checkout at the same moment with
+the same Idempotency-Key, repeated for CHECKOUTS keys. It checks:
+
+- each key produces exactly one order, one set of items, reservations and
+  farmer notifications
+- every response to a key has the original order number, and all but
+  one are marked Idempotent-Replayed
+- without the header, each retry is a new order (the old behaviour)
+
+It also times a fresh checkout against a replayed one.
+
+Run from the project root:  python benchmarks/check_idempotent_orders.py
+"""
+
+import os
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+
+from common import load_app_copy
+
+agri = load_app_copy()
+
+THREADS = int(os.environ.get('BENCH_THREADS', 8))
+CHECKOUTS = int(os.environ.get('BENCH_CHECKOUTS', 20))
+CUSTOMER = 'bench_customer'
+SKU = 'BENCH_TOMATO'
+ENDPOINTS = ('/create-order', '/verify-payment', '/api/place-order')
+
+
+def seed():
+    conn = sqlite3.connect(agri.DB_PATH)
+    conn.execute(
+        """INSERT INTO farmer_products (product_id, farmer_username, name, category, price, stock, unit, seller_type)
+           VALUES (?, 'bench_farmer', 'Tomato', 'Vegetables', 40, 1000000, 'kg', 'farmer')""",
+        (SKU,)
+    )
+    conn.execute(
+        "INSERT INTO user_details (username, name, address, phone, pincode) VALUES (?, 'Customer', 'Bench Street', '9000000000', '560001')",
+        (CUSTOMER,)
+    )
+    conn.commit()
+    conn.close()
+
+
+def client():
+    c = agri.app.test_client()
+    with c.session_transaction() as session:
+        session['username'] = CUSTOMER
+    return c
+
+
+def body(n):
+    return {'cart': [{'id': SKU, 'name': 'Tomato', 'qty': 2}], 'payment_method': 'COD', 'amount': 130,
+            'razorpay_payment_id': f'pay_bench{n}'}
+
+
+def storm(endpoint, key, n):
+    """THREADS simultaneous identical requests; returns [(status, json, replayed)]."""
+    results = []
+    gate = threading.Barrier(THREADS)
+
+    def send():
+        c = client()
+        gate.wait()
+        headers = {'Idempotency-Key': key} if key else {}
+        response = c.post(endpoint, json=body(n), headers=headers)
+        results.append((response.status_code, response.get_json(), response.headers.get('Idempotent-Replayed') == 'true'))
+
+    threads = [threading.Thread(target=send) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def counts(conn):
+    return {
+        'orders': conn.execute('SELECT COUNT(*) FROM orders WHERE username = ?', (CUSTOMER,)).fetchone()[0],
+        'items': conn.execute(
+            'SELECT COUNT(*) FROM order_items oi JOIN orders o ON o.id = oi.order_id WHERE o.username = ?', (CUSTOMER,)
+        ).fetchone()[0],
+        'reservations': conn.execute(
+            'SELECT COUNT(*) FROM stock_reservations WHERE product_id = ?', (SKU,)
+        ).fetchone()[0],
+        'notifications': conn.execute(
+            'SELECT COUNT(*) FROM farmer_order_notifications WHERE customer_username = ?', (CUSTOMER,)
+        ).fetchone()[0],
+    }
+
+
+def main():
+    seed()
+    conn = sqlite3.connect(agri.DB_PATH)
+    ok = True
+    n = 0
+    for endpoint in ENDPOINTS:
+        before = counts(conn)
+        for i in range(CHECKOUTS):
+            n += 1
+            results = storm(endpoint, f'bench-{endpoint}-{i}', n)
+            numbers = {result['order_number'] for status, result, _ in results if status == 200}
+            fresh = sum(1 for status, _, replayed in results if status == 200 and not replayed)
+            if any(status != 200 for status, _, _ in results) or len(numbers) != 1 or fresh != 1:
+                print(f"  {endpoint} key {i}: statuses {[s for s, _, _ in results]}, order numbers {numbers}, {fresh} fresh")
+                ok = False
+        after = counts(conn)
+        added = {table: after[table] - before[table] for table in after}
+        expected = {table: CHECKOUTS for table in added}
+        ok &= added == expected
+        print(f"{endpoint:<17} {CHECKOUTS} keys x {THREADS} concurrent retries -> {added}")
+
+    # Without the header every retry is an order of its own
+    n += 1
+    before = counts(conn)['orders']
+    storm('/create-order', None, n)
+    print(f"{'no header':<17} {THREADS} retries -> {counts(conn)['orders'] - before} orders")
+    conn.close()
+
+    c = client()
+    fresh, replayed = [], []
+    for i in range(200):
+        n += 1
+        key = f'bench-latency-{i}'
+        for timings in (fresh, replayed):
+            start = time.perf_counter()
+            assert c.post('/create-order', json=body(n), headers={'Idempotency-Key': key}).status_code == 200
+            timings.append(time.perf_counter() - start)
+    print(f"checkout p50 {statistics.median(fresh) * 1000:.2f} ms, replay p50 {statistics.median(replayed) * 1000:.2f} ms")
+    print(f"one order per key: {'yes' if ok else 'NO'}")
+    return ok
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
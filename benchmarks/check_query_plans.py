@@ -0,0 +1,134 @@
+"""
+Query plan regression check: runs every SQL string passed to execute() in
+app.py and the checkout modules, every repository Query and
+every module-level SQL constant through EXPLAIN QUERY PLAN against a
+freshly migrated database and fails if one scans a whole table. It also
+fails if an index in app.SCHEMA_INDEXES is missing from that database.
+
+Full scans that are the point of the query (admin listings, the community
+feed) are listed in ALLOWED_SCANS with the reason. Migration steps run once
+per database and are skipped.
+
+Run from the project root:  python benchmarks/check_query_plans.py [-v]
+"""
+
+import ast
+import os
+import re
+import sqlite3
+import sys
+
+from common import ROOT, load_app_copy
+
+agri = load_app_copy()
+
+MODULES = ('app.py', 'reservations.py', 'repository.py', 'order_service.py', 'idempotency.py')
+
+# (function, table) -> why scanning the whole table is expected
+ALLOWED_SCANS = {
+    ('initialize_Farmers_notifications', 'Farmers'): 'startup: every farmer',
+    ('ALL_SOIL_TEST_BOOKINGS', 'st'): 'admin lists every soil test booking',
+    ('get_community_posts', 'cp'): 'the feed shows every post',
+    ('PINCODE_ORDER_STATS', 'pincode_order_stats'): 'the dashboard lists every pincode',
+    ('CUSTOMER_ORDERS_PAGE', 'page'): 'one page of orders, materialized',
+    ('CUSTOMER_ORDERS_PAGE', 'p'): 'one page of orders, materialized',
+    ('CUSTOMER_ORDERS_PAGE', 'c'): "item counts for the page's orders, materialized",
+}
+
+# Sample values for f-string interpolations, keyed by the expression source
+FORMAT_SAMPLES = {
+    'set_clause': 'price = ?, stock = ?',
+}
+
+SKIP_PREFIXES = ('CREATE', 'DROP', 'ALTER', 'PRAGMA', 'BEGIN', 'COMMIT', 'ROLLBACK')
+
+SQL_CONSTANT_RE = re.compile(r'\s*(SELECT|INSERT|UPDATE|DELETE)\b')
+
+FULL_SCAN_RE = re.compile(r'^SCAN (\w+)(?: USING (?:COVERING )?INDEX \w+)?$')
+
+
+def render(node):
+    """SQL text of an execute() argument, or None if it isn't a string literal."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.Constant):
+                parts.append(value.value)
+            else:
+                expression = ast.unparse(value.value)
+                if expression not in FORMAT_SAMPLES:
+                    raise KeyError(f'no FORMAT_SAMPLES entry for {{{expression}}}')
+                parts.append(FORMAT_SAMPLES[expression])
+        return ''.join(parts)
+    return None
+
+
+def collect_queries(path):
+    """(function, line, sql) for every execute()/executemany() string (and
+    write queue submit()) outside migration steps, and every module-level
+    Query or SQL string constant (named after its variable)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    queries = []
+
+    def visit(node, function):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            function = node.name
+        if (isinstance(node, ast.Assign) and isinstance(node.value, ast.Call)
+                and isinstance(node.value.func, ast.Name) and node.value.func.id == 'Query'):
+            sql = render(node.value.args[1])
+            queries.append((node.targets[0].id, node.lineno, ' '.join(sql.split())))
+        if (function == '<module>' and isinstance(node, ast.Assign) and isinstance(node.targets[0], ast.Name)
+                and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)
+                and SQL_CONSTANT_RE.match(node.value.value)):
+            queries.append((node.targets[0].id, node.lineno, ' '.join(node.value.value.split())))
+        if (isinstance(node, ast.Call) and not function.startswith('migration_')
+                and isinstance(node.func, ast.Attribute)
+                and node.func.attr in ('execute', 'executemany', 'submit') and node.args):
+            sql = render(node.args[0])
+            if sql is not None:
+                queries.append((function, node.lineno, ' '.join(sql.split())))
+        for child in ast.iter_child_nodes(node):
+            visit(child, function)
+
+    visit(tree, '<module>')
+    return queries
+
+
+def full_scans(conn, sql):
+    params = (None,) * sql.count('?')
+    plan = conn.execute('EXPLAIN QUERY PLAN ' + sql, params).fetchall()
+    return [m.group(1) for m in (FULL_SCAN_RE.match(row[3]) for row in plan) if m], plan
+
+
+def main(verbose=False):
+    conn = sqlite3.connect(agri.DB_PATH)
+    failures = []
+    checked = 0
+    for module in MODULES:
+        for function, line, sql in collect_queries(os.path.join(ROOT, module)):
+            if sql.upper().startswith(SKIP_PREFIXES):
+                continue
+            scans, plan = full_scans(conn, sql)
+            checked += 1
+            unexpected = [table for table in scans if (function, table) not in ALLOWED_SCANS]
+            if verbose or unexpected:
+                print(f"{module}:{line} {function}: {sql[:90]}")
+                for row in plan:
+                    print(f"    {row[3]}")
+            if unexpected:
+                failures.append((module, line, function, unexpected))
+    present = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    missing = [name for name, _, _ in agri.SCHEMA_INDEXES if name not in present]
+    for name in missing:
+        print(f"declared index {name} was not created by the migrations")
+    print(f"{checked} queries checked, {len(failures)} with unexpected full table scans")
+    for module, line, function, tables in failures:
+        print(f"  {module}:{line} {function}: SCAN {', '.join(tables)}")
+    return not failures and not missing
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main(verbose='-v' in sys.argv) else 1)
@@ -0,0 +1,25 @@
+"""
+Shared helpers for the benchmark scripts.
+Each benchmark runs against a throwaway copy of the app so the committed
+user_database.db and JSON files are never modified.
+"""
+
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SKIP = shutil.ignore_patterns('node_modules', 'frontend', '.git', '__pycache__', 'benchmarks')
+
+
+def load_app_copy():
+    """Copy the project to a temp dir, import its app module and run init_db()."""
+    sandbox = tempfile.mkdtemp(prefix='agri-bench-')
+    shutil.copytree(ROOT, sandbox, dirs_exist_ok=True, ignore=SKIP)
+    sys.path.insert(0, sandbox)
+    agri = importlib.import_module('app')
+    agri.init_db()
+    return agri
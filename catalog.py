@@ -0,0 +1,763 @@
+"""
+Shared product catalog for AgriConnect.
+Products live in SQLite (`farmer_products` for the home page catalog and
+`farm_supplies` for the farmers page). The parsed rows are kept in memory
+together with a product-id index spanning both tables and a denormalized
+"product + seller" view for the home page.
+
+Triggers append every product write, and every change to a seller's
+name/address/pincode, to `catalog_changes`. Its highest version number is the
+catalog version: when it moves, only the changed products (and the products
+of changed sellers) are re-read and re-enriched.
+
+An update that changes only a farmer product's stock (every checkout, cancel
+and completion) is logged as a CHANGE_STOCK entry. Only the new stock is
+read, and it is patched into the cached products, the current ListingIndex
+and the category grouping, which are otherwise rebuilt. It still moves the
+catalog version: every catalog payload carries stock, so ETags change and
+products.json is re-exported (one flush per burst) after each order.
+
+ListingIndex adds per-snapshot filter and sort indexes for the paginated
+listing API, and products_by_category() a per-snapshot category grouping
+with farmer display names taken from the already loaded seller details.
+Pincode -> product id inverted indexes for both tables are maintained
+incrementally for the 30-minute delivery page.
+"""
+
+import base64
+import bisect
+import itertools
+import json
+import os
+import sqlite3
+import threading
+
+# Product sources recorded in the id index
+SOURCE_HOME = 'home'
+SOURCE_FARM = 'farm'
+
+# Change log entry kinds (catalog_changes.source)
+CHANGE_SELLER = 'seller'
+CHANGE_STOCK = 'stock'
+
+# The trailing row id orders products; it isn't part of the product dict
+HOME_PRODUCT_COLUMNS = '''product_id, name, category, price, new_price, unit, stock,
+                          description, image, farmer_username, seller_type, location, id'''
+HOME_ROW_ID = 12
+
+FARM_SUPPLY_COLUMNS = 'product_id, name, price, unit, farmer, location, image, phone, pincode, id'
+FARM_ROW_ID = 9
+
+SELLER_COLUMNS = 'username, name, address, pincode'
+
+
+def home_product_from_row(row):
+    """Build the products.json-shaped dict for a farmer_products row."""
+    product = {
+        'id': row[0],
+        'name': row[1],
+        'category': row[2],
+        'price': row[3],
+    }
+    if row[4] is not None:
+        product['new_price'] = row[4]
+    product.update({
+        'unit': row[5],
+        'stock': row[6],
+        'description': row[7],
+        'image': row[8],
+        'seller_username': row[9],
+        'seller_type': row[10],
+        'location': row[11],
+    })
+    return product
+
+
+def farm_supply_from_row(row):
+    """Build the farm_product.json-shaped dict for a farm_supplies row."""
+    return {
+        'id': row[0],
+        'name': row[1],
+        'price': row[2],
+        'unit': row[3],
+        'farmer': row[4],
+        'location': row[5],
+        'image': row[6],
+        'phone': row[7],
+        'pincode': row[8],
+    }
+
+
+def _index_add(index, key, product_id):
+    index.setdefault(key, set()).add(product_id)
+
+
+def _index_discard(index, key, product_id):
+    ids = index.get(key)
+    if ids is not None:
+        ids.discard(product_id)
+        if not ids:
+            del index[key]
+
+
+def seller_from_row(row):
+    return {'name': row[1], 'address': row[2], 'pincode': row[3]}
+
+
+def enrich_with_seller(product, seller_info):
+    """Copy of a home product with the seller's display name, pincode and address."""
+    enriched = dict(product)
+    if seller_info:
+        if not enriched.get('farmer'):
+            enriched['farmer'] = seller_info.get('name') or product.get('seller_username')
+        enriched['pincode'] = seller_info.get('pincode') or ''
+        if seller_info.get('address') and not enriched.get('location'):
+            enriched['location'] = seller_info['address']
+    return enriched
+
+
+def category_entry(product, seller_info):
+    """Products-by-category entry for an in-stock farmer product."""
+    seller = product.get('seller_username')
+    return {
+        'product_id': product['id'],
+        'name': product['name'],
+        'price': product['price'],
+        'stock': product['stock'],
+        'unit': product.get('unit', ''),
+        'image': product.get('image', ''),
+        'description': product.get('description', ''),
+        'farmer_username': seller,
+        'farmer_name': (seller_info or {}).get('name') or seller,
+    }
+
+
+def effective_price(product):
+    """Price a customer pays: the discounted new_price when present."""
+    if product.get('new_price') is not None:
+        return product['new_price']
+    return product.get('price') or 0
+
+
+# JSON types of each sort's key in a listing cursor
+CURSOR_KEY_TYPES = {
+    'default': (int,),
+    'newest': (int,),
+    'price_asc': (int, float),
+    'price_desc': (int, float),
+    'name': (str,),
+}
+
+
+def encode_cursor(sort, position):
+    """Opaque cursor for the listing position (sort key, product id)."""
+    raw = json.dumps([sort, position[0], position[1]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """Inverse of encode_cursor; raises ValueError for foreign or corrupt cursors."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, key, product_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if cursor_sort != sort:
+        raise ValueError('Cursor belongs to a different sort order')
+    # A key of the wrong type can't be compared with the listing's positions
+    if isinstance(key, bool) or not isinstance(key, CURSOR_KEY_TYPES.get(sort, ())) or not isinstance(product_id, str):
+        raise ValueError('Invalid cursor')
+    return (key, product_id)
+
+
+class ListingIndex:
+    """Filter and sort indexes over one home-view snapshot."""
+
+    SORT_KEYS = {
+        'default': lambda p, row_id: row_id,
+        'newest': lambda p, row_id: -row_id,
+        'price_asc': lambda p, row_id: effective_price(p),
+        'price_desc': lambda p, row_id: -effective_price(p),
+        'name': lambda p, row_id: (p.get('name') or '').lower(),
+    }
+
+    # Sort an equality-filtered candidate set only when it is this selective;
+    # otherwise walk the presorted order and filter as we go
+    CANDIDATE_FRACTION = 16
+
+    def __init__(self, products, row_ids):
+        self._products = {p['id']: p for p in products}
+        self._row_ids = {product_id: row_ids[product_id] for product_id in self._products}
+        self._by_category = {}
+        self._by_pincode = {}
+        self._by_seller = {}
+        for p in products:
+            self._by_category.setdefault((p.get('category') or '').lower(), set()).add(p['id'])
+            self._by_pincode.setdefault(str(p.get('pincode') or ''), set()).add(p['id'])
+            self._by_seller.setdefault(p.get('seller_username'), set()).add(p['id'])
+        self._orders = {}
+        self._lock = threading.Lock()
+
+    def update_stock(self, products):
+        """Swap in copies of products whose stock alone changed; no index or sort uses stock."""
+        for p in products:
+            if p['id'] in self._products:
+                self._products[p['id']] = p
+
+    def _sort_key(self, sort, product_id):
+        return (self.SORT_KEYS[sort](self._products[product_id], self._row_ids[product_id]), product_id)
+
+    def _order(self, sort):
+        order = self._orders.get(sort)
+        if order is None:
+            with self._lock:
+                order = self._orders.get(sort)
+                if order is None:
+                    order = sorted(self._sort_key(sort, product_id) for product_id in self._products)
+                    self._orders[sort] = order
+        return order
+
+    def query(self, category=None, pincode=None, seller=None, in_stock=False,
+              min_price=None, max_price=None, sort='default', after=None, limit=20):
+        """Return (products, next_position) for one page of the listing.
+
+        `after` is the (sort key, product id) position of the previous page's
+        last item; next_position is None on the last page.
+        """
+        def matches(p):
+            if in_stock and not (p.get('stock') or 0) > 0:
+                return False
+            price = effective_price(p)
+            if min_price is not None and price < min_price:
+                return False
+            if max_price is not None and price > max_price:
+                return False
+            return True
+
+        candidate_sets = []
+        if category is not None:
+            candidate_sets.append(self._by_category.get(category.lower(), set()))
+        if pincode is not None:
+            candidate_sets.append(self._by_pincode.get(str(pincode), set()))
+        if seller is not None:
+            candidate_sets.append(self._by_seller.get(seller, set()))
+
+        if candidate_sets:
+            candidate_sets.sort(key=len)
+            candidates = candidate_sets[0].intersection(*candidate_sets[1:])
+        else:
+            candidates = None
+
+        if candidates is not None and len(candidates) * self.CANDIDATE_FRACTION <= len(self._products):
+            positions = sorted(self._sort_key(sort, product_id) for product_id in candidates)
+        else:
+            positions = self._order(sort)
+        start = bisect.bisect_right(positions, tuple(after)) if after else 0
+
+        page = []
+        for position in itertools.islice(positions, start, None):
+            product_id = position[1]
+            if candidates is not None and product_id not in candidates:
+                continue
+            product = self._products[product_id]
+            if not matches(product):
+                continue
+            if len(page) == limit:
+                return [p for _, p in page], page[-1][0]
+            page.append((position, product))
+        return [p for _, p in page], None
+
+
+def _chunks(values, size=500):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+class ProductCatalog:
+    """In-memory view of the SQLite product tables with incremental refresh."""
+
+    # Above this many pending changes a full reload is cheaper
+    MAX_INCREMENTAL_CHANGES = 500
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._version = None
+        self._instance_id = None
+
+        # Working state, kept in id order and patched as changes arrive
+        self._home = {}
+        self._home_view = {}
+        self._farm = {}
+        self._sellers = {}
+        self._seller_products = {}
+        self._row_ids = {}
+        self._farm_row_ids = {}
+        self._index = {}
+        self._farmer_sellers = {}
+        self._home_by_pincode = {}
+        self._farm_by_pincode = {}
+
+        # Snapshots handed to callers, rebuilt whenever the version moves
+        self._products = []
+        self._home_view_list = []
+        self._farm_products = []
+        self._listing = None
+        self._by_category = None
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        return self._conn
+
+    def _current_version(self):
+        try:
+            row = self._connection().execute(
+                'SELECT COALESCE(MAX(version), 0) FROM catalog_changes'
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Error reading catalog version: {e}")
+            return None
+        return row[0]
+
+    # ---- seller details ----
+
+    def _fetch_sellers(self, usernames):
+        cur = self._connection().cursor()
+        for chunk in _chunks(usernames):
+            placeholders = ','.join('?' * len(chunk))
+            cur.execute(f'SELECT {SELLER_COLUMNS} FROM user_details WHERE username IN ({placeholders})', chunk)
+            found = {row[0]: seller_from_row(row) for row in cur.fetchall()}
+            for username in chunk:
+                self._sellers[username] = found.get(username)
+
+    def _reenrich_seller(self, username):
+        seller_info = self._sellers.get(username)
+        for product_id in self._seller_products.get(username, ()):
+            self._set_home_view(product_id, enrich_with_seller(self._home[product_id], seller_info))
+
+    def _set_home_view(self, product_id, view):
+        previous = self._home_view.get(product_id)
+        if previous is not None:
+            _index_discard(self._home_by_pincode, previous.get('pincode'), product_id)
+        self._home_view[product_id] = view
+        if view.get('pincode'):
+            _index_add(self._home_by_pincode, str(view['pincode']), product_id)
+
+    # ---- product bookkeeping ----
+
+    def _put_home(self, product, row_id):
+        product_id = product['id']
+        seller = product.get('seller_username')
+        previous = self._home.get(product_id)
+        if previous is not None and self._row_ids.get(product_id) != row_id:
+            # Deleted and re-added: move it to its new position at the end
+            self._drop_home(product_id)
+        elif previous is not None:
+            # Replace in place so the product keeps its position
+            self._seller_products.get(previous.get('seller_username'), set()).discard(product_id)
+            self._farmer_sellers.pop(product_id, None)
+        self._home[product_id] = product
+        self._row_ids[product_id] = row_id
+        self._set_home_view(product_id, enrich_with_seller(product, self._sellers.get(seller)))
+        self._seller_products.setdefault(seller, set()).add(product_id)
+        self._index[str(product_id)] = (SOURCE_HOME, product)
+        if product.get('seller_type') == 'farmer' and seller:
+            self._farmer_sellers[product_id] = seller
+
+    def _drop_home(self, product_id):
+        product = self._home.pop(product_id, None)
+        if product is None:
+            return
+        view = self._home_view.pop(product_id, None)
+        if view is not None:
+            _index_discard(self._home_by_pincode, view.get('pincode'), product_id)
+        self._row_ids.pop(product_id, None)
+        self._seller_products.get(product.get('seller_username'), set()).discard(product_id)
+        self._farmer_sellers.pop(product_id, None)
+        # Home products shadow farm supplies with the same id
+        farm_product = self._farm.get(product_id)
+        if farm_product is not None:
+            self._index[str(product_id)] = (SOURCE_FARM, farm_product)
+        else:
+            self._index.pop(str(product_id), None)
+
+    def _put_farm(self, product, row_id):
+        product_id = product['id']
+        previous = self._farm.get(product_id)
+        if previous is not None:
+            _index_discard(self._farm_by_pincode, previous.get('pincode'), product_id)
+        self._farm[product_id] = product
+        self._farm_row_ids[product_id] = row_id
+        if product.get('pincode'):
+            _index_add(self._farm_by_pincode, str(product['pincode']), product_id)
+        if product_id not in self._home:
+            self._index[str(product_id)] = (SOURCE_FARM, product)
+
+    def _drop_farm(self, product_id):
+        product = self._farm.pop(product_id, None)
+        if product is None:
+            return
+        self._farm_row_ids.pop(product_id, None)
+        _index_discard(self._farm_by_pincode, product.get('pincode'), product_id)
+        if product_id not in self._home:
+            self._index.pop(str(product_id), None)
+
+    # ---- loading ----
+
+    def _full_load(self):
+        cur = self._connection().cursor()
+        cur.execute('SELECT instance_id FROM catalog_meta WHERE id = 1')
+        row = cur.fetchone()
+        self._instance_id = row[0] if row else None
+        cur.execute(f'SELECT {HOME_PRODUCT_COLUMNS} FROM farmer_products ORDER BY id')
+        home_rows = cur.fetchall()
+        cur.execute(f'SELECT {FARM_SUPPLY_COLUMNS} FROM farm_supplies ORDER BY id')
+        farm_rows = cur.fetchall()
+
+        self._home, self._home_view, self._farm = {}, {}, {}
+        self._sellers, self._seller_products, self._row_ids = {}, {}, {}
+        self._index, self._farmer_sellers, self._farm_row_ids = {}, {}, {}
+        self._home_by_pincode, self._farm_by_pincode = {}, {}
+
+        # Every seller in one query, however many products and sellers there are
+        cur.execute(f'SELECT {SELLER_COLUMNS} FROM user_details '
+                    f'WHERE username IN (SELECT farmer_username FROM farmer_products)')
+        found = {row[0]: seller_from_row(row) for row in cur.fetchall()}
+        self._sellers = {row[9]: found.get(row[9]) for row in home_rows if row[9]}
+        for row in farm_rows:
+            self._put_farm(farm_supply_from_row(row), row[FARM_ROW_ID])
+        for row in home_rows:
+            self._put_home(home_product_from_row(row), row[HOME_ROW_ID])
+
+    def _apply_stock(self, product_ids):
+        """Patch new stock levels into cached home products.
+
+        Returns the ids patched; products not cached yet are left for a full re-read.
+        """
+        cur = self._connection().cursor()
+        patched = []
+        for chunk in _chunks(product_ids):
+            placeholders = ','.join('?' * len(chunk))
+            cur.execute(f'SELECT product_id, stock FROM farmer_products WHERE product_id IN ({placeholders})', chunk)
+            for product_id, stock in cur.fetchall():
+                product = self._home.get(product_id)
+                if product is None:
+                    continue
+                # Copies, so snapshots already handed out stay as they were
+                product = dict(product, stock=stock)
+                self._home[product_id] = product
+                self._home_view[product_id] = dict(self._home_view[product_id], stock=stock)
+                self._index[str(product_id)] = (SOURCE_HOME, product)
+                patched.append(product_id)
+        return patched
+
+    def _patch_by_category(self, product_ids):
+        """Category grouping with the given products' entries redone for their new stock."""
+        by_category = dict(self._by_category)
+        position = lambda entry: self._row_ids[entry['product_id']]
+        for product_id in product_ids:
+            product = self._home[product_id]
+            if product.get('seller_type') != 'farmer':
+                continue
+            entries = [e for e in by_category.get(product['category'], ()) if e['product_id'] != product_id]
+            if (product.get('stock') or 0) > 0:
+                seller_info = self._sellers.get(product.get('seller_username'))
+                bisect.insort(entries, category_entry(product, seller_info), key=position)
+            if entries:
+                by_category[product['category']] = entries
+            else:
+                by_category.pop(product['category'], None)
+        return by_category
+
+    def _apply_changes(self, changes):
+        """Apply change log entries; returns the ids patched when they were all stock-only, else None."""
+        home_ids, farm_ids, stock_ids, sellers, stale_sellers = set(), set(), set(), set(), set()
+        for source, key in changes:
+            if source == SOURCE_HOME:
+                home_ids.add(key)
+            elif source == SOURCE_FARM:
+                farm_ids.add(key)
+            elif source == CHANGE_STOCK:
+                stock_ids.add(key)
+            elif source == CHANGE_SELLER:
+                sellers.add(key)
+
+        stock_ids -= home_ids
+        patched = self._apply_stock(stock_ids) if stock_ids else []
+        home_ids |= stock_ids - set(patched)
+
+        cur = self._connection().cursor()
+        if home_ids:
+            rows = []
+            for chunk in _chunks(home_ids):
+                placeholders = ','.join('?' * len(chunk))
+                cur.execute(f'SELECT {HOME_PRODUCT_COLUMNS} FROM farmer_products '
+                            f'WHERE product_id IN ({placeholders}) ORDER BY id', chunk)
+                rows.extend(cur.fetchall())
+            # user_details edits are only logged while the seller has products, so
+            # a cached entry may predate their last product leaving: refetch them all
+            product_sellers = {row[9] for row in rows if row[9]} - sellers
+            cached = {username: self._sellers.get(username) for username in product_sellers}
+            self._fetch_sellers(product_sellers)
+            stale_sellers = {username for username in product_sellers if self._sellers[username] != cached[username]}
+            found = set()
+            for row in rows:
+                product = home_product_from_row(row)
+                found.add(product['id'])
+                self._put_home(product, row[HOME_ROW_ID])
+            for product_id in home_ids - found:
+                seller = self._home.get(product_id, {}).get('seller_username')
+                self._drop_home(product_id)
+                if not self._seller_products.get(seller):
+                    self._seller_products.pop(seller, None)
+                    self._sellers.pop(seller, None)
+
+        if farm_ids:
+            rows = []
+            for chunk in _chunks(farm_ids):
+                placeholders = ','.join('?' * len(chunk))
+                cur.execute(f'SELECT {FARM_SUPPLY_COLUMNS} FROM farm_supplies '
+                            f'WHERE product_id IN ({placeholders})', chunk)
+                rows.extend(cur.fetchall())
+            found = set()
+            for row in rows:
+                product = farm_supply_from_row(row)
+                found.add(product['id'])
+                self._put_farm(product, row[FARM_ROW_ID])
+            for product_id in farm_ids - found:
+                self._drop_farm(product_id)
+
+        if sellers:
+            self._fetch_sellers(sellers)
+        for username in sellers | stale_sellers:
+            self._reenrich_seller(username)
+        return None if home_ids or farm_ids or sellers else patched
+
+    def _refresh(self):
+        with self._lock:
+            version = self._current_version()
+            if version is None or version == self._version:
+                return
+            try:
+                changes = None
+                patched = None
+                if self._version is not None and version > self._version:
+                    cur = self._connection().cursor()
+                    cur.execute(
+                        'SELECT MIN(version), COUNT(*) FROM catalog_changes WHERE version > ?',
+                        (self._version,)
+                    )
+                    first, pending = cur.fetchone()
+                    # Incremental only if the log still covers everything since our version
+                    if first == self._version + 1 and pending <= self.MAX_INCREMENTAL_CHANGES:
+                        cur.execute(
+                            'SELECT source, key FROM catalog_changes WHERE version > ? ORDER BY version',
+                            (self._version,)
+                        )
+                        changes = cur.fetchall()
+                if changes is None:
+                    self._full_load()
+                else:
+                    patched = self._apply_changes(changes)
+            except sqlite3.Error as e:
+                print(f"Error loading product catalog: {e}")
+                self._version = None
+                return
+
+            self._products = list(self._home.values())
+            self._home_view_list = list(self._home_view.values())
+            self._farm_products = list(self._farm.values())
+            if patched is None:
+                self._listing = None
+                self._by_category = None
+            else:
+                # Stock-only changes: patch the listing and category grouping instead of rebuilding them
+                if self._listing is not None:
+                    self._listing.update_stock(self._home_view[product_id] for product_id in patched)
+                if self._by_category is not None:
+                    self._by_category = self._patch_by_category(patched)
+            self._version = version
+
+    @property
+    def version(self):
+        """Catalog version the current snapshot was loaded from."""
+        self._refresh()
+        return self._version
+
+    def products(self):
+        """Home page products (products.json shape). Callers must not mutate it."""
+        self._refresh()
+        return self._products
+
+    def home_view(self):
+        """Home page products enriched with seller name, pincode and address."""
+        self._refresh()
+        return self._home_view_list
+
+    def listing(self):
+        """ListingIndex for the current home view, built on first use per version."""
+        self._refresh()
+        with self._lock:
+            if self._listing is None:
+                self._listing = ListingIndex(self._home_view_list, self._row_ids)
+            return self._listing
+
+    def products_by_category(self):
+        """In-stock farmer products grouped by category, built on first use per version."""
+        self._refresh()
+        with self._lock:
+            if self._by_category is None:
+                by_category = {}
+                for product in self._home.values():
+                    if product.get('seller_type') == 'farmer' and (product.get('stock') or 0) > 0:
+                        seller_info = self._sellers.get(product.get('seller_username'))
+                        by_category.setdefault(product['category'], []).append(
+                            category_entry(product, seller_info)
+                        )
+                self._by_category = by_category
+            return self._by_category
+
+    def products_for_pincode(self, pincode, source=SOURCE_HOME):
+        """Products deliverable to `pincode`, in catalog order.
+
+        SOURCE_HOME returns home-view products (pincode of the seller),
+        SOURCE_FARM returns farm supplies (their own pincode).
+        """
+        self._refresh()
+        with self._lock:
+            if source == SOURCE_FARM:
+                ids = self._farm_by_pincode.get(str(pincode), ())
+                return [self._farm[product_id] for product_id in sorted(ids, key=self._farm_row_ids.get)]
+            ids = self._home_by_pincode.get(str(pincode), ())
+            return [self._home_view[product_id] for product_id in sorted(ids, key=self._row_ids.get)]
+
+    def resolve(self, keys):
+        """Current products for (source, product_id) pairs, in the given order.
+
+        Home products come from the seller-enriched view; pairs no longer in
+        the catalog are skipped.
+        """
+        self._refresh()
+        with self._lock:
+            products = []
+            for source, product_id in keys:
+                product = (self._farm if source == SOURCE_FARM else self._home_view).get(product_id)
+                if product is not None:
+                    products.append(product)
+            return products
+
+    def farm_products(self):
+        """Farmers page products (farm_product.json shape). Callers must not mutate it."""
+        self._refresh()
+        return self._farm_products
+
+    def farmer_sellers(self):
+        """Map of farmer product id -> seller username."""
+        self._refresh()
+        return self._farmer_sellers
+
+    def lookup(self, product_id):
+        """Return (source, product) for a product id in either table, or None."""
+        self._refresh()
+        return self._index.get(str(product_id))
+
+    def etag(self, name):
+        """Strong ETag for payload `name` built from the current catalog version.
+
+        Compute it before building the payload so a concurrent write can only
+        make the tag older than the content, never newer. Returns None if the
+        catalog couldn't be loaded.
+        """
+        self._refresh()
+        if self._version is None:
+            return None
+        return f"{name}-{self._instance_id}-{self._version}"
+
+    def invalidate(self):
+        """Force a full reload on next access."""
+        with self._lock:
+            self._version = None
+
+
+def _load_json_list(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get('products', []) if isinstance(data, dict) else data
+
+
+def import_json_catalog(conn, products_path, farm_products_path, image_store=None):
+    """One-time import of products.json and farm_product.json into SQLite.
+
+    products.json was the live catalog, so it wins over whatever the
+    farmer_products table holds: listed products are upserted and rows it no
+    longer lists (deleted through the old JSON-only delete route) are removed.
+    With an image_store, inline data URI images are stored there and imported
+    as URLs. Runs only once per database; returns True if an import happened.
+    """
+    cur = conn.cursor()
+    cur.execute('SELECT json_imported FROM catalog_meta WHERE id = 1')
+    row = cur.fetchone()
+    if row and row[0]:
+        return False
+
+    def image(p):
+        value = p.get('image', '')
+        if image_store is None:
+            return value
+        try:
+            return image_store.ingest(value)
+        except ValueError as e:
+            print(f"Keeping inline image for product {p.get('id')}: {e}")
+            return value
+
+    products = _load_json_list(products_path)
+    if products is not None:
+        for p in products:
+            cur.execute(
+                """INSERT INTO farmer_products
+                   (product_id, farmer_username, name, category, price, new_price, stock,
+                    unit, image, description, seller_type, location)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(product_id) DO UPDATE SET
+                       farmer_username = excluded.farmer_username,
+                       name = excluded.name,
+                       category = excluded.category,
+                       price = excluded.price,
+                       new_price = excluded.new_price,
+                       stock = excluded.stock,
+                       unit = excluded.unit,
+                       image = excluded.image,
+                       description = excluded.description,
+                       seller_type = excluded.seller_type,
+                       location = excluded.location""",
+                (p['id'], p.get('seller_username') or '', p.get('name', ''),
+                 p.get('category') or 'Others', float(p.get('price') or 0), p.get('new_price'),
+                 int(p.get('stock') or 0), p.get('unit', ''), image(p),
+                 p.get('description', ''), p.get('seller_type', 'farmer'), p.get('location', ''))
+            )
+        listed_ids = [p['id'] for p in products]
+        placeholders = ','.join('?' * len(listed_ids))
+        if listed_ids:
+            cur.execute(f'DELETE FROM farmer_products WHERE product_id NOT IN ({placeholders})', listed_ids)
+        else:
+            cur.execute('DELETE FROM farmer_products')
+
+    farm_products = _load_json_list(farm_products_path)
+    if farm_products is not None:
+        cur.executemany(
+            """INSERT OR REPLACE INTO farm_supplies
+               (product_id, name, price, unit, farmer, location, image, phone, pincode)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            [(str(p['id']), p.get('name', ''), p.get('price', 0), p.get('unit', ''),
+              p.get('farmer', ''), p.get('location', ''), image(p),
+              p.get('phone', ''), p.get('pincode', ''))
+             for p in farm_products]
+        )
+
+    cur.execute('UPDATE catalog_meta SET json_imported = 1 WHERE id = 1')
+    return True
@@ -0,0 +1,126 @@
+"""
+products.json export for AgriConnect.
+SQLite is the live catalog, but products.json is still what a fresh database
+is seeded from, so it is kept as an up-to-date export.
+
+AtomicJSONFile serializes writers with an exclusive lock on a sidecar
+`.lock` file (shared by every worker process) and replaces the file
+atomically, so readers and crashes only ever see a complete old or new file.
+CatalogExporter coalesces bursts of catalog edits into one flush.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class AtomicJSONFile:
+    """A JSON file updated under a cross-process lock with temp file + os.replace."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock_path = path + '.lock'
+
+    @contextmanager
+    def locked(self):
+        """Hold the exclusive write lock; yields the lock file, which callers may use for metadata."""
+        with open(self.lock_path, 'a+', encoding='utf-8') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield lock_file
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def read(self, default=None):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return default
+
+    def write(self, data):
+        """Replace the file with `data`. Call while holding locked()."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(self.path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def update(self, mutate, default=None):
+        """Locked read-modify-write: `mutate(data)` returns the new contents."""
+        with self.locked():
+            data = mutate(self.read(default))
+            self.write(data)
+            return data
+
+
+class CatalogExporter:
+    """Keeps products.json in step with the catalog, one flush per burst of edits."""
+
+    def __init__(self, catalog, path, delay=0.5):
+        self.catalog = catalog
+        self.file = AtomicJSONFile(path)
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._timer = None
+        self.flushes = 0
+
+    def schedule(self):
+        """Note a catalog edit; the export runs `delay` seconds after the first unflushed edit."""
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Write products.json now unless it already holds the current catalog version.
+
+        The exported version is kept in the lock file, so a flush another
+        worker already did for the same version is skipped.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        try:
+            version = self.catalog.etag('products-json')
+            if version is None:
+                return False
+            with self.file.locked() as lock_file:
+                lock_file.seek(0)
+                if lock_file.read().strip() == version:
+                    return False
+                self.file.write({'products': self.catalog.products()})
+                lock_file.seek(0)
+                lock_file.truncate()
+                lock_file.write(version)
+                lock_file.flush()
+            self.flushes += 1
+            return True
+        except OSError as e:
+            print(f"Error exporting products.json: {e}")
+            return False
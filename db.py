@@ -0,0 +1,116 @@
+"""
+SQLite connection management for AgriConnect.
+Opening a connection (and re-reading the schema on its first query) costs
+more than most of the queries a request runs, so connections are pooled and
+configured once: synchronous=NORMAL (safe with WAL), a busy timeout so
+concurrent writers wait instead of failing, and a larger page cache.
+
+Within a request every get_db() call returns the same connection, so all
+helpers share it; it goes back to the pool when the app context tears down.
+Idle connections are kept LIFO, so with a threaded server each busy worker
+thread effectively keeps its own warm connection.
+"""
+
+import sqlite3
+import threading
+
+from flask import g, has_app_context
+
+BUSY_TIMEOUT_MS = 5000
+
+# Negative cache_size is in KiB: 16 MiB of page cache per connection
+CACHE_SIZE_KIB = 16 * 1024
+
+PRAGMAS = (
+    'PRAGMA synchronous = NORMAL',
+    f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}',
+    f'PRAGMA cache_size = -{CACHE_SIZE_KIB}',
+)
+
+
+def enable_wal(conn):
+    """Switch the database to WAL so readers don't block the writer; persists in the file."""
+    return conn.execute('PRAGMA journal_mode = WAL').fetchone()[0]
+
+
+class PooledConnection(sqlite3.Connection):
+    """Connection handed out by ConnectionPool.
+
+    close() ends the caller's use the way closing a private connection did
+    (uncommitted changes are rolled back) but keeps the connection open.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.pool = None
+        self.request_bound = False
+
+    def reset(self):
+        if self.in_transaction:
+            self.rollback()
+        self.row_factory = None
+
+    def close(self):
+        self.reset()
+        if not self.request_bound:
+            self.pool.put(self)
+
+    def close_for_good(self):
+        super().close()
+
+
+class ConnectionPool:
+    """Configured SQLite connections, reused across requests."""
+
+    def __init__(self, db_path, max_idle=8):
+        self.db_path = db_path
+        self.max_idle = max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.teardown_appcontext(self.teardown)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000,
+                               check_same_thread=False, factory=PooledConnection)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        conn.pool = self
+        return conn
+
+    def take(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def put(self, conn):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close_for_good()
+
+    def connection(self):
+        """The current request's connection; outside a request, one the caller must close()."""
+        if not has_app_context():
+            return self.take()
+        conn = g.get('_db_connection')
+        if conn is None:
+            conn = self.take()
+            conn.request_bound = True
+            g._db_connection = conn
+        return conn
+
+    def teardown(self, exc=None):
+        conn = g.pop('_db_connection', None)
+        if conn is not None:
+            conn.request_bound = False
+            conn.close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close_for_good()
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useRef, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import axios from 'axios';
 import { useCart } from '../context/CartContext';
@@ -20,6 +20,10 @@ function Checkout() {
   const [isEditing, setIsEditing] = useState(!user?.name || !user?.address);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
+  // Idempotency-Key for this checkout: retries reuse it, so the order is placed only once
+  const checkoutKey = useRef(
+    window.crypto?.randomUUID ? window.crypto.randomUUID() : `${Date.now().toString(36)}${Math.random().toString(36).slice(2)}`
+  );
 
   const handleChange = (e) => {
     setFormData({
@@ -75,7 +79,9 @@ function Checkout() {
         }))
       };
 
-      const response = await axios.post('/api/place-order', orderData);
+      const response = await axios.post('/api/place-order', orderData, {
+        headers: { 'Idempotency-Key': checkoutKey.current }
+      });
 
       if (response.data.success) {
         clearCart();
@@ -11,18 +11,22 @@ function FastDelivery() {
   const { user } = useAuth();
 
   useEffect(() => {
-    loadProducts();
-  }, []);
+    if (user && user.pincode) {
+      loadProducts();
+    } else {
+      setLoading(false);
+    }
+  }, [user]);
 
   const loadProducts = async () => {
     try {
-      // Load both home and farm products
+      // Server filters both catalogs by the user's pincode
       const [homeResponse, farmResponse] = await Promise.all([
-        axios.get('/api/home-products'),
-        axios.get('/api/products')
+        axios.get('/api/fast-delivery?source=home'),
+        axios.get('/api/fast-delivery?source=farmers')
       ]);
       
-      const allProducts = [...homeResponse.data, ...farmResponse.data];
+      const allProducts = [...homeResponse.data.products, ...farmResponse.data.products];
       setProducts(allProducts);
     } catch (error) {
       console.error('Failed to load products:', error);
@@ -32,7 +36,6 @@ function FastDelivery() {
   };
 
   const fastDeliveryProducts = products.filter(product => 
-    user && product.pincode === user.pincode &&
     (product.name.toLowerCase().includes(searchTerm.toLowerCase()) ||
      (product.description && product.description.toLowerCase().includes(searchTerm.toLowerCase())))
   );
@@ -3,6 +3,8 @@ import axios from 'axios';
 import { useAuth } from '../context/AuthContext';
 import './Profile.css';
 
+const ORDERS_PER_PAGE = 20;
+
 function Profile() {
   const { user, updateUser } = useAuth();
   const [orders, setOrders] = useState([]);
@@ -13,6 +15,8 @@ function Profile() {
     totalSpent: 0
   });
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [isEditing, setIsEditing] = useState(false);
   const [formData, setFormData] = useState({
     name: user?.name || '',
@@ -27,8 +31,10 @@ function Profile() {
 
   const loadProfileData = async () => {
     try {
-      const response = await axios.get('/api/profile');
+      // First page of orders; the header stats cover every order
+      const response = await axios.get('/api/profile', { params: { limit: ORDERS_PER_PAGE } });
       setOrders(response.data.orders || []);
+      setNextCursor(response.data.next_cursor || null);
       setStats({
         totalOrders: response.data.total_orders || 0,
         pendingOrders: response.data.pending_orders || 0,
@@ -42,6 +48,22 @@ function Profile() {
     }
   };
 
+  const loadMoreOrders = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const response = await axios.get('/api/profile', {
+        params: { limit: ORDERS_PER_PAGE, cursor: nextCursor }
+      });
+      setOrders(current => [...current, ...(response.data.orders || [])]);
+      setNextCursor(response.data.next_cursor || null);
+    } catch (error) {
+      console.error('Failed to load more orders:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleChange = (e) => {
     setFormData({
       ...formData,
@@ -240,6 +262,11 @@ function Profile() {
                     </div>
                   </div>
                 ))}
+                {nextCursor && (
+                  <button onClick={loadMoreOrders} className="btn btn-outline" disabled={loadingMore}>
+                    {loadingMore ? 'Loading...' : 'Load more orders'}
+                  </button>
+                )}
               </div>
             )}
           </div>
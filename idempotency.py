@@ -0,0 +1,99 @@
+"""
+Idempotency keys for AgriConnect's order endpoints.
+The payment page retries /create-order and /verify-payment when the
+network drops. Without a key, every retry is a new order: a new order
+number, more reserved stock and more farmer notifications.
+
+A client sends an `Idempotency-Key` header that stays the same across
+retries of one checkout. The first request that places an order records
+the key, scoped to the customer, in the order's own transaction, along
+with a fingerprint of the request and the placed order. A retry with the
+same key gets the original order back without writing anything. A
+different request under a reused key is rejected. Failed attempts aren't
+recorded, so they can be retried.
+
+Keys expire after IDEMPOTENCY_TTL_SECONDS. Expired keys are purged by the
+order pipeline, using the expiry index.
+
+All functions take a cursor and leave committing to the caller.
+"""
+
+import hashlib
+import json
+import time
+
+IDEMPOTENCY_TTL_SECONDS = 24 * 60 * 60
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a different request."""
+
+
+def create_idempotency_table(conn):
+    cur = conn.cursor()
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            username TEXT NOT NULL,
+            idempotency_key TEXT NOT NULL,
+            fingerprint TEXT NOT NULL,
+            order_id INTEGER NOT NULL,
+            order_number TEXT NOT NULL,
+            otp TEXT,
+            total REAL,
+            created_at INTEGER NOT NULL,
+            expires_at INTEGER NOT NULL,
+            PRIMARY KEY (username, idempotency_key)
+        )
+    ''')
+    cur.execute('CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expiry ON idempotency_keys(expires_at)')
+
+
+def valid_key(key):
+    """Whether a client-supplied key is usable (non-empty, printable, at most MAX_KEY_LENGTH)."""
+    return bool(key) and len(key) <= MAX_KEY_LENGTH and key.isprintable()
+
+
+def request_fingerprint(endpoint, body):
+    """Stable hash of an endpoint and its JSON body."""
+    canonical = json.dumps([endpoint, body], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def find_order(cur, username, key, fingerprint, now=None):
+    """(order_id, order_number, otp, total) recorded under an unexpired key, or None.
+
+    Raises IdempotencyConflict if the key was used for a different request.
+    """
+    now = int(now if now is not None else time.time())
+    cur.execute(
+        '''SELECT fingerprint, order_id, order_number, otp, total FROM idempotency_keys
+           WHERE username = ? AND idempotency_key = ? AND expires_at > ?''',
+        (username, key, now)
+    )
+    row = cur.fetchone()
+    if row is None:
+        return None
+    if row[0] != fingerprint:
+        raise IdempotencyConflict('Idempotency-Key was already used for a different request')
+    return row[1:]
+
+
+def remember_order(cur, username, key, fingerprint, order, now=None):
+    """Record the order placed under a key; `order` starts with (order_id, order_number, otp, total)."""
+    now = int(now if now is not None else time.time())
+    # REPLACE: an expired record of the same key may not have been purged yet
+    cur.execute(
+        '''INSERT OR REPLACE INTO idempotency_keys
+               (username, idempotency_key, fingerprint, order_id, order_number, otp, total, created_at, expires_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+        (username, key, fingerprint, *order[:4], now, now + IDEMPOTENCY_TTL_SECONDS)
+    )
+
+
+def purge_expired_keys(cur, now=None):
+    """Delete expired keys. Returns how many were deleted."""
+    now = int(now if now is not None else time.time())
+    cur.execute('DELETE FROM idempotency_keys WHERE expires_at <= ?', (now,))
+    return cur.rowcount
@@ -0,0 +1,95 @@
+"""
+Order, booking and product IDs for AgriConnect.
+IDs keep the familiar prefix-and-digits form (ORD..., ST..., FP...), but
+the digits are no longer random. They are a fixed-width number that starts
+with the time the ID was issued:
+
+    ORD21447316800017
+       ^^^^^^^^^        seconds since 2020-01-01 UTC
+                ^^^^^   counter within the second
+
+so new rows append at the end of the UNIQUE index. Uniqueness doesn't
+depend on luck. Each process takes numbers from the `id_blocks` table a
+block at a time, in a short write transaction, so two processes (or two
+threads) can never hand out the same number. Handing out an ID from a
+block is just a counter increment under a lock.
+
+A block starts at the current time unless the last block reserved for the
+prefix already runs past it. IDs from one process only ever increase, even
+if the clock steps back. IDs from different processes stay within a
+second or so of each other, because a block that wasn't used up within
+MAX_BLOCK_AGE_SECONDS is dropped for a fresh one. Numbers skipped that way
+are never reused.
+
+Call next_id() before opening a write transaction on another connection:
+reserving a block needs SQLite's write lock too.
+"""
+
+import sqlite3
+import threading
+import time
+
+from db import BUSY_TIMEOUT_MS
+
+EPOCH = 1577836800  # 2020-01-01 00:00:00 UTC
+
+# Counter values per second; 14 digits last until about 2051
+PER_SECOND = 10 ** 5
+DIGITS = 14
+
+BLOCK_SIZE = 100
+MAX_BLOCK_AGE_SECONDS = 1.0
+
+
+def create_id_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS id_blocks (
+            prefix TEXT PRIMARY KEY,
+            next_value INTEGER NOT NULL
+        )
+    ''')
+
+
+class IdGenerator:
+    """Time-ordered unique IDs, one counter per prefix, shared by every thread of a process."""
+
+    def __init__(self, db_path, block_size=BLOCK_SIZE, max_block_age=MAX_BLOCK_AGE_SECONDS):
+        self.db_path = db_path
+        self.block_size = block_size
+        self.max_block_age = max_block_age
+        self._blocks = {}  # prefix -> [next value, end of block, reserved at]
+        self._lock = threading.Lock()
+        self._conn = None
+        self.reservations = 0
+
+    def next_id(self, prefix):
+        """A new ID such as 'ORD21447316800017'."""
+        with self._lock:
+            block = self._blocks.get(prefix)
+            if block is None or block[0] >= block[1] or time.monotonic() - block[2] > self.max_block_age:
+                block = self._blocks[prefix] = self._reserve(prefix)
+            value = block[0]
+            block[0] += 1
+        return f'{prefix}{value:0{DIGITS}d}'
+
+    def _reserve(self, prefix):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None,
+                                         check_same_thread=False)
+        now_value = (int(time.time()) - EPOCH) * PER_SECOND
+        conn = self._conn
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT next_value FROM id_blocks WHERE prefix = ?', (prefix,)).fetchone()
+            start = max(row[0] if row else 0, now_value)
+            conn.execute(
+                '''INSERT INTO id_blocks (prefix, next_value) VALUES (?, ?)
+                   ON CONFLICT(prefix) DO UPDATE SET next_value = excluded.next_value''',
+                (prefix, start + self.block_size)
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        self.reservations += 1
+        return [start, start + self.block_size, time.monotonic()]
@@ -0,0 +1,106 @@
+"""
+Content-addressed product image store for AgriConnect.
+Inline `data:image/...;base64,` product images are decoded once, written to
+disk under their SHA-256 hash and replaced by a short URL, so product JSON
+stays small and browsers can cache each image separately.
+"""
+
+import base64
+import binascii
+import hashlib
+import os
+import re
+import tempfile
+
+# Supported image types (matches the community upload ALLOWED_EXTENSIONS)
+MIME_EXTENSIONS = {
+    'image/png': 'png',
+    'image/jpeg': 'jpg',
+    'image/jpg': 'jpg',
+    'image/gif': 'gif',
+    'image/webp': 'webp',
+}
+
+DATA_URI_RE = re.compile(r'^data:(?P<mime>[\w.+-]+/[\w.+-]+)?(?P<params>(;[^;,]*)*?);base64,', re.IGNORECASE)
+
+IMAGE_NAME_RE = re.compile(r'^[0-9a-f]{64}\.(png|jpg|gif|webp)$')
+
+
+def is_data_uri(value):
+    return isinstance(value, str) and value[:5].lower() == 'data:'
+
+
+def parse_data_uri(value):
+    """Return (extension, bytes) for a base64 image data URI, or raise ValueError."""
+    match = DATA_URI_RE.match(value)
+    if not match:
+        raise ValueError('Image must be a base64 data URI or a URL')
+    mime = (match.group('mime') or '').lower()
+    ext = MIME_EXTENSIONS.get(mime)
+    if not ext:
+        raise ValueError(f'Unsupported image type: {mime or "unknown"}')
+    try:
+        data = base64.b64decode(value[match.end():], validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError('Image data is not valid base64')
+    if not data:
+        raise ValueError('Image data is empty')
+    return ext, data
+
+
+class ImageStore:
+    """Stores image bytes once per content hash and hands out short URLs."""
+
+    def __init__(self, directory, url_prefix):
+        self.directory = directory
+        self.url_prefix = url_prefix.rstrip('/')
+        os.makedirs(self.directory, exist_ok=True)
+
+    def store(self, data, ext):
+        """Write `data` if it isn't stored yet and return its URL."""
+        name = f"{hashlib.sha256(data).hexdigest()}.{ext}"
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        return f"{self.url_prefix}/{name}"
+
+    def ingest(self, value):
+        """Store an inline data URI and return its URL; other values pass through."""
+        if not is_data_uri(value):
+            return value
+        ext, data = parse_data_uri(value)
+        return self.store(data, ext)
+
+
+# Tables whose `image` column may hold inline data URIs
+PRODUCT_IMAGE_TABLES = ('farmer_products', 'farm_supplies')
+
+
+def migrate_inline_images(conn, store):
+    """Rewrite inline data URI images in the product tables to image store URLs.
+
+    Returns the number of rows rewritten. Rows whose data URI can't be decoded
+    are left untouched.
+    """
+    cur = conn.cursor()
+    migrated = 0
+    for table in PRODUCT_IMAGE_TABLES:
+        cur.execute(f"SELECT id, image FROM {table} WHERE image LIKE 'data:%'")
+        updates = []
+        for row_id, image in cur.fetchall():
+            try:
+                updates.append((store.ingest(image), row_id))
+            except ValueError as e:
+                print(f"Skipping inline image for {table} row {row_id}: {e}")
+        if updates:
+            cur.executemany(f'UPDATE {table} SET image = ? WHERE id = ?', updates)
+        migrated += len(updates)
+    return migrated
@@ -0,0 +1,76 @@
+"""
+Versioned schema migrations for AgriConnect.
+The database records the last migration applied in PRAGMA user_version, so a
+boot with nothing pending costs a single PRAGMA read. Pending steps run in
+order inside one BEGIN IMMEDIATE transaction: either all of them apply and the
+version moves, or none do. When several workers start at once, the first
+takes the write lock and the rest find the version already current.
+
+Migrations are (version, description, step) tuples; step(cur) gets a cursor
+inside the transaction. Append new steps at the end and never edit or
+reorder one that has shipped.
+"""
+
+import sqlite3
+
+from db import BUSY_TIMEOUT_MS, enable_wal
+
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def column_exists(cur, table, column):
+    cur.execute(f'PRAGMA table_info({table})')
+    return any(row[1] == column for row in cur.fetchall())
+
+
+def add_column(cur, table, column_sql):
+    """ALTER TABLE ... ADD COLUMN unless the column is already there (databases
+    created before user_version was tracked may have any subset of columns)."""
+    if not column_exists(cur, table, column_sql.split()[0]):
+        cur.execute(f'ALTER TABLE {table} ADD COLUMN {column_sql}')
+
+
+def create_indexes(cur, indexes):
+    """CREATE INDEX IF NOT EXISTS for each (name, table, columns)."""
+    for name, table, columns in indexes:
+        cur.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table}({columns})')
+
+
+def migrate(db_path, migrations):
+    """Bring the database at db_path up to the last migration.
+
+    Returns the list of (version, description) applied by this call.
+    """
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    try:
+        latest = migrations[-1][0] if migrations else 0
+        current = schema_version(conn)
+        if current >= latest:
+            if current > latest:
+                print(f"Database schema version {current} is newer than this code ({latest})")
+            return []
+
+        # Journal mode can't change inside a transaction; WAL persists in the file
+        enable_wal(conn)
+        cur = conn.cursor()
+        cur.execute('BEGIN IMMEDIATE')
+        try:
+            # Another worker may have migrated while we waited for the lock
+            current = schema_version(conn)
+            applied = []
+            for version, description, step in migrations:
+                if version <= current:
+                    continue
+                step(cur)
+                applied.append((version, description))
+            if applied:
+                cur.execute(f'PRAGMA user_version = {applied[-1][0]}')
+            cur.execute('COMMIT')
+        except BaseException:
+            cur.execute('ROLLBACK')
+            raise
+        return applied
+    finally:
+        conn.close()
@@ -0,0 +1,237 @@
+"""
+Checkout for AgriConnect.
+/create-order (cash on delivery), /verify-payment (online payment) and
+/api/place-order (React checkout) all place orders through OrderService,
+one pipeline that runs in a single BEGIN IMMEDIATE transaction:
+
+1. validate: the cart is non-empty, every product is still in the catalog,
+   quantities are whole numbers of at least 1 and the customer has full
+   delivery details.
+2. price: line prices come from the catalog (the discounted new_price when
+   there is one), not from the cart the browser sent. So does the payment
+   page's total, delivery fee and coupon included, which the page shows
+   from quote(); the amount the customer was charged must match it.
+3. insert: the order, its stock reservations (see reservations.py) and its
+   items.
+4. notify: one farmer_order_notifications row per farmer-listed item.
+
+With an idempotency key (see idempotency.py), a retry returns the order
+first placed under that key before any of these steps run. The key is
+checked again under the write lock, and recorded in the order's
+transaction.
+
+Taking the write lock up front means the pipeline never fails halfway on
+a lock upgrade. A failure at any step rolls back everything. The SQL is
+fixed, so every checkout reuses the same prepared statements from the
+connection's statement cache.
+"""
+
+import random
+import string
+from typing import NamedTuple, Optional
+
+from catalog import effective_price
+from idempotency import find_order, purge_expired_keys, remember_order
+from reservations import InsufficientStock, release_expired_reservations, reserve_order_stock
+from timestamps import utc_timestamp
+
+INSERT_ORDER = """
+    INSERT INTO orders (order_number, username, name, address, pincode, phone, total_amount,
+                        status, payment_method, payment_id, otp, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+INSERT_ORDER_ITEMS = """
+    INSERT INTO order_items (order_id, product_id, product_name, quantity, price)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+INSERT_FARMER_NOTIFICATIONS = """
+    INSERT INTO farmer_order_notifications
+        (farmer_username, order_id, product_id, product_name, quantity,
+         customer_username, customer_name, status, created_at, price)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+DELIVERY_FIELDS = ('name', 'address', 'phone', 'pincode')
+
+
+# Payment page pricing (templates/payment.html): delivery is free above
+# FREE_DELIVERY_ABOVE, and a coupon takes its discount off the subtotal
+DELIVERY_FEE = 50.0
+FREE_DELIVERY_ABOVE = 99
+
+COUPONS = {
+    'SAVE10': lambda subtotal: subtotal * 0.10,
+    'SAVE20': lambda subtotal: min(subtotal * 0.20, 200),
+    'FLAT50': lambda subtotal: 50,
+}
+
+
+class OrderError(Exception):
+    """The order can't be placed as requested; the message is for the customer."""
+
+
+class OrderLine(NamedTuple):
+    product_id: str
+    name: str
+    quantity: int
+    price: float
+    farmer_username: Optional[str]
+
+
+class PlacedOrder(NamedTuple):
+    order_id: int
+    order_number: str
+    otp: str
+    total: float
+    # True when returned for a retried idempotency key
+    replayed: bool = False
+
+
+def new_otp():
+    return ''.join(random.choices(string.digits, k=6))
+
+
+class CheckoutQuote(NamedTuple):
+    subtotal: float
+    delivery: float
+    discount: float
+    total: float
+
+
+def checkout_quote(subtotal, coupon=None):
+    """The payment page's charges for a catalog subtotal: delivery fee added, coupon taken off."""
+    rule = COUPONS.get((coupon or '').strip().upper())
+    if coupon and rule is None:
+        raise OrderError('Invalid coupon code')
+    subtotal = round(subtotal, 2)
+    delivery = 0.0 if subtotal > FREE_DELIVERY_ABOVE else DELIVERY_FEE
+    discount = round(float(min(rule(subtotal), subtotal + delivery)), 2) if rule else 0.0
+    return CheckoutQuote(subtotal, delivery, discount, round(subtotal + delivery - discount, 2))
+
+
+class OrderService:
+    """Places orders against the shared product catalog."""
+
+    def __init__(self, catalog, exporter, ids):
+        self.catalog = catalog
+        self.exporter = exporter
+        self.ids = ids
+
+    def validate(self, user, cart):
+        """[(product_id, quantity)] for a cart, or OrderError.
+
+        Accepts the payment page's `qty` and the React checkout's `quantity`.
+        """
+        if not user or not all(user.get(field) for field in DELIVERY_FIELDS):
+            raise OrderError('Please complete your delivery details')
+        if not cart:
+            raise OrderError('Cart is empty')
+        unavailable = [item.get('name') or str(item.get('id')) for item in cart
+                       if self.catalog.lookup(item.get('id')) is None]
+        if unavailable:
+            raise OrderError(f"No longer available: {', '.join(unavailable)}")
+        items = []
+        for item in cart:
+            try:
+                quantity = int(item.get('qty', item.get('quantity', 1)))
+            except (TypeError, ValueError):
+                quantity = 0
+            if quantity < 1:
+                raise OrderError(f"Invalid quantity for {item.get('name') or item.get('id')}")
+            items.append((str(item.get('id')), quantity))
+        return items
+
+    def price(self, items):
+        """Priced order lines for validated (product_id, quantity) pairs."""
+        sellers = self.catalog.farmer_sellers()
+        lines = []
+        for product_id, quantity in items:
+            product = self.catalog.lookup(product_id)[1]
+            lines.append(OrderLine(product_id, product.get('name') or product_id, quantity,
+                                   float(effective_price(product)), sellers.get(product_id)))
+        return lines
+
+    def quote(self, user, cart, coupon=None):
+        """CheckoutQuote for a cart at catalog prices, as the payment page shows and charges it."""
+        lines = self.price(self.validate(user, cart))
+        return checkout_quote(sum(line.price * line.quantity for line in lines), coupon)
+
+    def place(self, conn, user, cart, status='pending', payment_method=None, payment_id=None, amount=None,
+              coupon=None, idempotency_key=None, fingerprint=None):
+        """Validate, price, insert and notify in one transaction; returns a PlacedOrder.
+
+        `amount` is the total the payment page showed and the customer paid,
+        from quote(). It must match checkout_quote() of the priced lines with
+        `coupon`, so the stored total is what was charged. Without `amount`
+        (the React checkout) the total is the sum of the priced lines.
+        With `idempotency_key`, `fingerprint` identifies the request (see
+        idempotency.request_fingerprint()).
+
+        Raises OrderError, with nothing written, if the order can't be
+        placed, and IdempotencyConflict if the key belongs to another request.
+        """
+        if idempotency_key:
+            replay = self._replay(conn.cursor(), user, idempotency_key, fingerprint)
+            if replay:
+                return replay
+        lines = self.price(self.validate(user, cart))
+        subtotal = sum(line.price * line.quantity for line in lines)
+        total = subtotal
+        if amount is not None:
+            total = checkout_quote(subtotal, coupon).total
+            try:
+                paid = float(amount)
+            except (TypeError, ValueError):
+                raise OrderError('Invalid order amount') from None
+            # Prices changed since the page was quoted, or the amount was tampered with
+            if not abs(paid - total) < 0.005:
+                raise OrderError('Order amount does not match the current prices, please review your cart')
+
+        # Before BEGIN IMMEDIATE: a new block of order numbers takes the write lock too
+        order_number, otp, created_at = self.ids.next_id('ORD'), new_otp(), utc_timestamp()
+        username, customer_name = user['username'], user['name']
+        cur = conn.cursor()
+        cur.execute('BEGIN IMMEDIATE')
+        try:
+            if idempotency_key:
+                # A concurrent retry may have committed while this one waited for the lock
+                replay = self._replay(cur, user, idempotency_key, fingerprint)
+                if replay:
+                    conn.rollback()
+                    return replay
+                purge_expired_keys(cur)
+            release_expired_reservations(cur)
+            cur.execute(INSERT_ORDER, (
+                order_number, username, customer_name, user['address'], user['pincode'], user['phone'],
+                total, status, payment_method, payment_id, otp, created_at
+            ))
+            order_id = cur.lastrowid
+            reserved = reserve_order_stock(cur, order_id, [(line.product_id, line.name, line.quantity) for line in lines])
+            cur.executemany(INSERT_ORDER_ITEMS, [
+                (order_id, line.product_id, line.name, line.quantity, line.price) for line in lines
+            ])
+            cur.executemany(INSERT_FARMER_NOTIFICATIONS, [
+                (line.farmer_username, order_id, line.product_id, line.name, line.quantity,
+                 username, customer_name, status, created_at, line.price)
+                for line in lines if line.farmer_username
+            ])
+            order = PlacedOrder(order_id, order_number, otp, total)
+            if idempotency_key:
+                remember_order(cur, username, idempotency_key, fingerprint, order)
+            conn.commit()
+        except InsufficientStock as e:
+            conn.rollback()
+            raise OrderError(str(e)) from None
+        except BaseException:
+            conn.rollback()
+            raise
+        if reserved:
+            # products.json carries stock levels
+            self.exporter.schedule()
+        return order
+
+    def _replay(self, cur, user, idempotency_key, fingerprint):
+        recorded = find_order(cur, (user or {}).get('username'), idempotency_key, fingerprint)
+        return PlacedOrder(*recorded, replayed=True) if recorded else None
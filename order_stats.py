@@ -0,0 +1,172 @@
+"""
+Order totals kept up to date as orders change, for AgriConnect.
+
+- `customer_order_stats`: one row per customer with the profile header's
+  figures (orders placed, counts by status, total spent, customer since).
+  They used to be recomputed from every order on every profile view.
+- `pincode_order_stats`: one row per delivery pincode with its order
+  counts by status, for the admin dashboard. They used to be counted from
+  every order in the table on every admin page load. Orders without a
+  pincode are counted under ''.
+
+Triggers on `orders` maintain both, so every path that places,
+re-prices, re-assigns, changes the status of or deletes an order updates
+them in the same transaction. That covers checkout, the admin status
+update and manual SQL alike. total_spent counts
+every order, whatever its status, as the profile always has.
+"""
+
+from timestamps import UNKNOWN_TIMESTAMP
+
+# Status columns: orders in any other status count only towards order_count
+STATUS_COLUMNS = {
+    'pending': 'pending_orders',
+    'paid': 'paid_orders',
+    'completed': 'completed_orders',
+    'cancelled': 'cancelled_orders',
+}
+
+# Key of an order's pincode_order_stats row; idx_orders_pincode indexes the same expression
+PINCODE_KEY = "COALESCE({row}.pincode, '')"
+
+
+def _status_terms(row, sign):
+    """`column = column +/- (row.status = 'status')` for each tracked status."""
+    return ', '.join(f"{column} = {column} {sign} ({row}.status = '{status}')"
+                     for status, column in STATUS_COLUMNS.items())
+
+
+def _add_order(row):
+    """Upsert that counts the order `row` (NEW) into its customer's totals."""
+    columns = ', '.join(STATUS_COLUMNS.values())
+    flags = ', '.join(f"{row}.status = '{status}'" for status in STATUS_COLUMNS)
+    return f'''
+        INSERT INTO customer_order_stats (username, order_count, total_spent, {columns}, first_order_at)
+        VALUES ({row}.username, 1, COALESCE({row}.total_amount, 0), {flags},
+                NULLIF({row}.created_at, '{UNKNOWN_TIMESTAMP}'))
+        ON CONFLICT(username) DO UPDATE SET
+            order_count = order_count + 1,
+            total_spent = total_spent + excluded.total_spent,
+            {_status_terms(row, '+')},
+            first_order_at = COALESCE(min(first_order_at, excluded.first_order_at), first_order_at, excluded.first_order_at);
+    '''
+
+
+def _remove_order(row):
+    """Update that takes the order `row` (OLD) out of its customer's totals."""
+    return f'''
+        UPDATE customer_order_stats SET
+            order_count = order_count - 1,
+            total_spent = total_spent - COALESCE({row}.total_amount, 0),
+            {_status_terms(row, '-')}
+        WHERE username = {row}.username;
+    '''
+
+
+# An order moving away can take the earliest date with it; finding the next one
+# is a single idx_orders_username seek. Orders with no recorded time don't count
+RECOMPUTE_FIRST_ORDER = f'''
+        UPDATE customer_order_stats
+        SET first_order_at = (SELECT MIN(created_at) FROM orders
+                              WHERE username = OLD.username AND created_at > '{UNKNOWN_TIMESTAMP}')
+        WHERE username = OLD.username;
+'''
+
+
+def _add_pincode_order(row):
+    """Upsert that counts the order `row` (NEW) into its pincode's counts."""
+    columns = ', '.join(STATUS_COLUMNS.values())
+    flags = ', '.join(f"{row}.status = '{status}'" for status in STATUS_COLUMNS)
+    return f'''
+        INSERT INTO pincode_order_stats (pincode, order_count, {columns})
+        VALUES ({PINCODE_KEY.format(row=row)}, 1, {flags})
+        ON CONFLICT(pincode) DO UPDATE SET
+            order_count = order_count + 1,
+            {_status_terms(row, '+')};
+    '''
+
+
+def _remove_pincode_order(row):
+    """Update that takes the order `row` (OLD) out of its pincode's counts."""
+    return f'''
+        UPDATE pincode_order_stats SET
+            order_count = order_count - 1,
+            {_status_terms(row, '-')}
+        WHERE pincode = {PINCODE_KEY.format(row=row)};
+    '''
+
+
+def create_order_stats_table(conn):
+    """Create the table and its triggers, and fill it from the existing orders."""
+    cur = conn.cursor()
+    status_columns = ''.join(f'\n            {column} INTEGER NOT NULL DEFAULT 0,' for column in STATUS_COLUMNS.values())
+    cur.execute(f'''
+        CREATE TABLE IF NOT EXISTS customer_order_stats (
+            username TEXT PRIMARY KEY,
+            order_count INTEGER NOT NULL DEFAULT 0,
+            total_spent REAL NOT NULL DEFAULT 0,{status_columns}
+            first_order_at TEXT
+        )
+    ''')
+    cur.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_orders_insert_stats AFTER INSERT ON orders
+        BEGIN {_add_order('NEW')}
+        END
+    ''')
+    cur.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_orders_update_stats
+        AFTER UPDATE OF username, status, total_amount, created_at ON orders
+        BEGIN {_remove_order('OLD')} {_add_order('NEW')} {RECOMPUTE_FIRST_ORDER}
+        END
+    ''')
+    cur.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_orders_delete_stats AFTER DELETE ON orders
+        BEGIN {_remove_order('OLD')} {RECOMPUTE_FIRST_ORDER}
+        END
+    ''')
+
+    flags = ', '.join(f"SUM(status = '{status}')" for status in STATUS_COLUMNS)
+    cur.execute(f'''
+        INSERT OR REPLACE INTO customer_order_stats
+            (username, order_count, total_spent, {', '.join(STATUS_COLUMNS.values())}, first_order_at)
+        SELECT username, COUNT(*), COALESCE(SUM(total_amount), 0), {flags},
+               MIN(NULLIF(created_at, '{UNKNOWN_TIMESTAMP}'))
+        FROM orders
+        WHERE username IS NOT NULL
+        GROUP BY username
+    ''')
+
+
+def create_pincode_order_stats_table(conn):
+    """Create the per-pincode table and its triggers, and fill it from the existing orders."""
+    cur = conn.cursor()
+    status_columns = ''.join(f',\n            {column} INTEGER NOT NULL DEFAULT 0' for column in STATUS_COLUMNS.values())
+    cur.execute(f'''
+        CREATE TABLE IF NOT EXISTS pincode_order_stats (
+            pincode TEXT PRIMARY KEY,
+            order_count INTEGER NOT NULL DEFAULT 0{status_columns}
+        )
+    ''')
+    cur.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_orders_insert_pincode_stats AFTER INSERT ON orders
+        BEGIN {_add_pincode_order('NEW')}
+        END
+    ''')
+    cur.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_orders_update_pincode_stats AFTER UPDATE OF pincode, status ON orders
+        BEGIN {_remove_pincode_order('OLD')} {_add_pincode_order('NEW')}
+        END
+    ''')
+    cur.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_orders_delete_pincode_stats AFTER DELETE ON orders
+        BEGIN {_remove_pincode_order('OLD')}
+        END
+    ''')
+
+    flags = ', '.join(f"SUM(status = '{status}')" for status in STATUS_COLUMNS)
+    cur.execute(f'''
+        INSERT OR REPLACE INTO pincode_order_stats (pincode, order_count, {', '.join(STATUS_COLUMNS.values())})
+        SELECT {PINCODE_KEY.format(row='orders')}, COUNT(*), {flags}
+        FROM orders
+        GROUP BY 1
+    ''')
@@ -0,0 +1,304 @@
+"""
+Read-side data access for AgriConnect's order, soil test and notification
+listings.
+Each listing is a Query: fixed SQL (so sqlite3 reuses the prepared statement
+from its per-connection cache) whose selected columns are, in order, the
+fields of a NamedTuple record. Rows come back as plain tuples and are turned
+into records without per-field Python code; templates read record fields as
+attributes, and JSON endpoints take dicts built straight from the rows, or
+for the large listings JSON text encoded one row at a time. Exports stream
+NDJSON or CSV text a fetchmany() batch at a time. Records keep timestamps as
+stored (UTC); JSON rows get them rendered for display.
+
+Listings filtered by date take [start, end) bounds from timestamps.date_range().
+"""
+
+import csv
+import io
+import json
+from typing import NamedTuple, Optional
+
+from timestamps import present_timestamps
+
+# Compact separators, as jsonify uses outside debug mode
+_encode_json = json.JSONEncoder(separators=(',', ':')).encode
+
+# Rows per fetchmany() in exports: each batch becomes one chunk of the response
+EXPORT_BATCH_SIZE = 1000
+
+
+class Order(NamedTuple):
+    id: int
+    order_number: str
+    username: str
+    name: Optional[str]
+    address: Optional[str]
+    pincode: Optional[str]
+    phone: Optional[str]
+    total_amount: Optional[float]
+    status: str
+    created_at: Optional[str]
+    payment_method: Optional[str]
+    otp: Optional[str]
+
+
+class CustomerOrder(NamedTuple):
+    """An order on its customer's profile, with its number of line items."""
+    id: int
+    order_number: str
+    username: str
+    name: Optional[str]
+    address: Optional[str]
+    pincode: Optional[str]
+    phone: Optional[str]
+    total_amount: Optional[float]
+    status: str
+    created_at: Optional[str]
+    payment_method: Optional[str]
+    otp: Optional[str]
+    item_count: int
+
+
+class CustomerOrderStats(NamedTuple):
+    """A customer's order totals, kept up to date by triggers (see order_stats.py)."""
+    order_count: int
+    total_spent: float
+    pending_orders: int
+    paid_orders: int
+    completed_orders: int
+    cancelled_orders: int
+    first_order_at: Optional[str]
+
+
+# A customer without orders has no stats row
+NO_ORDER_STATS = CustomerOrderStats(0, 0.0, 0, 0, 0, 0, None)
+
+
+class PincodeOrderStats(NamedTuple):
+    """Order counts for one delivery pincode ('' for orders without one), kept by triggers."""
+    pincode: str
+    order_count: int
+    pending_orders: int
+    paid_orders: int
+    completed_orders: int
+    cancelled_orders: int
+
+
+class SoilTestBooking(NamedTuple):
+    id: int
+    booking_id: str
+    username: str
+    farm_location: str
+    farm_size: float
+    contact_number: str
+    preferred_date: str
+    test_type: str
+    status: str
+    created_at: Optional[str]
+    farmer_name: str
+
+
+class FarmerNotification(NamedTuple):
+    id: int
+    order_id: int
+    product_id: str
+    product_name: str
+    quantity: int
+    customer_username: str
+    customer_name: Optional[str]
+    status: str
+    read_status: int
+    created_at: Optional[str]
+    price: float
+
+
+class Query:
+    """A SELECT whose result columns map, in order, onto `record`'s fields.
+
+    `timestamps` names the fields rendered by present_timestamps() in JSON rows.
+    """
+
+    def __init__(self, record, sql, timestamps=('created_at',)):
+        self.record = record
+        self.sql = sql
+        self.timestamps = timestamps
+
+    def rows(self, conn, params=()):
+        cur = conn.cursor()
+        cur.row_factory = None
+        return cur.execute(self.sql, params)
+
+    def records(self, conn, params=()):
+        return list(map(self.record._make, self.rows(conn, params)))
+
+    def one(self, conn, params=(), default=None):
+        """The first row's record, or `default` if there are no rows."""
+        row = self.rows(conn, params).fetchone()
+        return self.record._make(row) if row is not None else default
+
+    def dicts(self, conn, params=()):
+        """JSON-ready rows, built without creating the records first."""
+        fields, timestamps = self.record._fields, self.timestamps
+        return [present_timestamps(dict(zip(fields, row)), timestamps) for row in self.rows(conn, params)]
+
+    def json(self, conn, params=()):
+        """The rows as a JSON array of objects. Each row is encoded as soon as
+        it's read, so the listing never exists as a list of dicts."""
+        fields, timestamps = self.record._fields, self.timestamps
+        return '[' + ','.join([_encode_json(present_timestamps(dict(zip(fields, row)), timestamps))
+                               for row in self.rows(conn, params)]) + ']'
+
+    def batches(self, conn, params=(), size=EXPORT_BATCH_SIZE):
+        """JSON-ready rows in lists of up to `size`, read with fetchmany() so
+        only one batch is held at a time however many rows there are."""
+        fields, timestamps = self.record._fields, self.timestamps
+        cur = self.rows(conn, params)
+        while True:
+            rows = cur.fetchmany(size)
+            if not rows:
+                return
+            yield [present_timestamps(dict(zip(fields, row)), timestamps) for row in rows]
+
+    def ndjson(self, conn, params=(), size=EXPORT_BATCH_SIZE):
+        """The rows as newline-delimited JSON objects, one chunk of text per batch."""
+        for batch in self.batches(conn, params, size):
+            yield ''.join([_encode_json(row) + '\n' for row in batch])
+
+    def csv(self, conn, params=(), size=EXPORT_BATCH_SIZE):
+        """The rows as CSV under a header line, one chunk of text per batch.
+        Columns are the JSON rows' keys: the fields, then `field_utc` for each timestamp."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(self.record._fields + tuple(field + '_utc' for field in self.timestamps))
+        for batch in self.batches(conn, params, size):
+            writer.writerows([row.values() for row in batch])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            # No rows: just the header
+            yield buffer.getvalue()
+
+
+# The admin order listing, newest first by (created_at, id): orders with no recorded
+# time hold UNKNOWN_TIMESTAMP since schema migration 11, so they come last and only
+# when the range has no start; same-second orders keep their id order
+ALL_ORDERS_BY_DATE = Query(Order, '''
+    SELECT id, order_number, username, name, address, pincode, phone,
+           total_amount, status, created_at, payment_method, otp
+    FROM orders
+    WHERE created_at >= ? AND created_at < ?
+    ORDER BY created_at DESC, id DESC
+''')
+
+ALL_ORDERS_BY_DATE_AND_STATUS = Query(Order, '''
+    SELECT id, order_number, username, name, address, pincode, phone,
+           total_amount, status, created_at, payment_method, otp
+    FROM orders
+    WHERE created_at >= ? AND created_at < ? AND status = ?
+    ORDER BY created_at DESC, id DESC
+''')
+
+CUSTOMER_ORDERS = Query(CustomerOrder, '''
+    SELECT o.id, o.order_number, o.username, o.name, o.address, o.pincode, o.phone,
+           o.total_amount, o.status, o.created_at, o.payment_method, o.otp,
+           (SELECT COUNT(*) FROM order_items oi WHERE oi.order_id = o.id)
+    FROM orders o
+    WHERE o.username = ?
+    ORDER BY o.id DESC
+''')
+
+# Pages of the admin dashboard's order list, newest first: orders with an id
+# below the cursor, in every pincode or in one
+ORDERS_PAGE = Query(Order, '''
+    SELECT id, order_number, username, name, address, pincode, phone,
+           total_amount, status, created_at, payment_method, otp
+    FROM orders
+    WHERE id < ?
+    ORDER BY id DESC
+    LIMIT ?
+''')
+
+PINCODE_ORDERS_PAGE = Query(Order, '''
+    SELECT id, order_number, username, name, address, pincode, phone,
+           total_amount, status, created_at, payment_method, otp
+    FROM orders
+    WHERE COALESCE(pincode, '') = ? AND id < ?
+    ORDER BY id DESC
+    LIMIT ?
+''')
+
+PINCODE_ORDER_STATS = Query(PincodeOrderStats, '''
+    SELECT pincode, order_count, pending_orders, paid_orders, completed_orders, cancelled_orders
+    FROM pincode_order_stats
+    WHERE order_count > 0
+    ORDER BY pincode
+''', timestamps=())
+
+# One page of a customer's orders, newest first: orders after the (created_at, id)
+# keyset position, in the date range. Item counts are grouped for that page only.
+CUSTOMER_ORDERS_PAGE = Query(CustomerOrder, '''
+    WITH page AS (
+        SELECT id, order_number, username, name, address, pincode, phone,
+               total_amount, status, created_at, payment_method, otp
+        FROM orders
+        WHERE username = ? AND created_at >= ? AND created_at < ? AND (created_at, id) < (?, ?)
+        ORDER BY created_at DESC, id DESC
+        LIMIT ?
+    )
+    SELECT p.id, p.order_number, p.username, p.name, p.address, p.pincode, p.phone,
+           p.total_amount, p.status, p.created_at, p.payment_method, p.otp, COALESCE(c.item_count, 0)
+    FROM page p
+    LEFT JOIN (
+        SELECT order_id, COUNT(*) AS item_count
+        FROM order_items
+        WHERE order_id IN (SELECT id FROM page)
+        GROUP BY order_id
+    ) c ON c.order_id = p.id
+    ORDER BY p.created_at DESC, p.id DESC
+''')
+
+CUSTOMER_ORDER_STATS = Query(CustomerOrderStats, '''
+    SELECT order_count, total_spent, pending_orders, paid_orders, completed_orders,
+           cancelled_orders, first_order_at
+    FROM customer_order_stats
+    WHERE username = ?
+''')
+
+# customer_order_stats only has all-time totals; a date range is summed from its orders
+CUSTOMER_ORDER_STATS_BY_DATE = Query(CustomerOrderStats, '''
+    SELECT COUNT(*), COALESCE(SUM(total_amount), 0),
+           COUNT(*) FILTER (WHERE status = 'pending'), COUNT(*) FILTER (WHERE status = 'paid'),
+           COUNT(*) FILTER (WHERE status = 'completed'), COUNT(*) FILTER (WHERE status = 'cancelled'),
+           MIN(created_at)
+    FROM orders
+    WHERE username = ? AND created_at >= ? AND created_at < ?
+''')
+
+ALL_SOIL_TEST_BOOKINGS = Query(SoilTestBooking, '''
+    SELECT st.id, st.booking_id, st.username, st.farm_location, st.farm_size,
+           st.contact_number, st.preferred_date, st.test_type, st.status, st.created_at,
+           COALESCE(NULLIF(ud.name, ''), st.username)
+    FROM soil_test_bookings st
+    LEFT JOIN user_details ud ON st.username = ud.username
+    ORDER BY st.id DESC
+''')
+
+USER_SOIL_TEST_BOOKINGS = Query(SoilTestBooking, '''
+    SELECT st.id, st.booking_id, st.username, st.farm_location, st.farm_size,
+           st.contact_number, st.preferred_date, st.test_type, st.status, st.created_at,
+           COALESCE(NULLIF(ud.name, ''), st.username)
+    FROM soil_test_bookings st
+    LEFT JOIN user_details ud ON st.username = ud.username
+    WHERE st.username = ?
+    ORDER BY st.id DESC
+''')
+
+FARMER_NOTIFICATIONS = Query(FarmerNotification, '''
+    SELECT id, order_id, product_id, product_name, quantity, customer_username,
+           customer_name, status, read_status, created_at, COALESCE(price, 0)
+    FROM farmer_order_notifications
+    WHERE farmer_username = ? AND created_at >= ? AND created_at < ?
+    ORDER BY created_at DESC
+''')
+
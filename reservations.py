@@ -0,0 +1,194 @@
+"""
+Stock reservations for AgriConnect checkout.
+Placing an order reserves stock with a conditional decrement of
+`farmer_products.stock` in the same transaction as the order insert, so two
+customers can never buy the same last unit. Cancelling the order releases
+the reservation (stock goes back), completing it commits the reservation.
+A pending order keeps its reservation however long it waits: that is the
+normal state of a cash-on-delivery order, so its reservation has no expiry.
+Triggers give a reservation one (RESERVATION_TTL_SECONDS after it was made)
+when its order is deleted or cancelled outside the admin status update; the
+checkout sweep then releases these orphans, and only ever scans them.
+
+Only farmer-listed products (seller_type 'farmer') track stock; other items
+are ordered without a reservation.
+
+All functions take a cursor and leave committing to the caller.
+"""
+
+import time
+
+RESERVATION_TTL_SECONDS = 48 * 60 * 60
+
+RESERVED, COMMITTED, RELEASED = 'reserved', 'committed', 'released'
+
+
+class InsufficientStock(Exception):
+    """Raised when a cart item can't be reserved; `items` is [(name, available)]."""
+
+    def __init__(self, items):
+        self.items = items
+        super().__init__('Not enough stock for: ' + ', '.join(
+            f"{name} ({available} left)" for name, available in items
+        ))
+
+
+def create_reservation_table(conn):
+    cur = conn.cursor()
+    cur.execute('''
+        CREATE TABLE IF NOT EXISTS stock_reservations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            order_id INTEGER NOT NULL,
+            product_id TEXT NOT NULL,
+            quantity INTEGER NOT NULL CHECK (quantity > 0),
+            status TEXT NOT NULL DEFAULT 'reserved',
+            created_at INTEGER NOT NULL,
+            expires_at INTEGER,
+            FOREIGN KEY (order_id) REFERENCES orders(id)
+        )
+    ''')
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_stock_reservations_order ON stock_reservations(order_id)")
+    cur.execute('''
+        CREATE INDEX IF NOT EXISTS idx_stock_reservations_expiry
+        ON stock_reservations(expires_at) WHERE status = 'reserved' AND expires_at IS NOT NULL
+    ''')
+
+
+def _take_stock(cur, product_id, quantity):
+    """Conditional decrement: succeeds (True) only while enough stock is left."""
+    cur.execute(
+        """UPDATE farmer_products SET stock = stock - ?
+           WHERE product_id = ? AND seller_type = 'farmer' AND stock >= ?""",
+        (quantity, product_id, quantity)
+    )
+    return cur.rowcount > 0
+
+
+def _stock_left(cur, product_id):
+    """Units left of a stock-tracked product, or None if it doesn't track stock."""
+    cur.execute(
+        "SELECT stock FROM farmer_products WHERE product_id = ? AND seller_type = 'farmer'",
+        (product_id,)
+    )
+    row = cur.fetchone()
+    return None if row is None else max(row[0] or 0, 0)
+
+
+def reserve_order_stock(cur, order_id, items, now=None):
+    """Reserve stock for an order's items, [(product_id, name, quantity)].
+
+    Raises ValueError for a non-positive quantity and InsufficientStock if any
+    stock-tracked item is short; the caller must then roll back, which also
+    undoes the reservations already made. Returns the number of products reserved.
+    """
+    now = int(now if now is not None else time.time())
+    wanted = {}
+    names = {}
+    for product_id, name, quantity in items:
+        if quantity < 1:
+            raise ValueError(f'Invalid quantity for {name or product_id}')
+        wanted[product_id] = wanted.get(product_id, 0) + quantity
+        names.setdefault(product_id, name or product_id)
+
+    reserved = []
+    short = []
+    for product_id, quantity in wanted.items():
+        if _take_stock(cur, product_id, quantity):
+            reserved.append((order_id, product_id, quantity, now))
+            continue
+        available = _stock_left(cur, product_id)
+        if available is not None:
+            short.append((names[product_id], available))
+
+    if short:
+        raise InsufficientStock(short)
+    cur.executemany(
+        """INSERT INTO stock_reservations (order_id, product_id, quantity, created_at)
+           VALUES (?, ?, ?, ?)""",
+        reserved
+    )
+    return len(reserved)
+
+
+def release_order_stock(cur, order_id):
+    """Return an order's reserved stock to the catalog. Returns the number of products released."""
+    cur.execute(
+        "SELECT id, product_id, quantity FROM stock_reservations WHERE order_id = ? AND status = ?",
+        (order_id, RESERVED)
+    )
+    reservations = cur.fetchall()
+    cur.executemany(
+        'UPDATE farmer_products SET stock = stock + ? WHERE product_id = ?',
+        [(quantity, product_id) for _, product_id, quantity in reservations]
+    )
+    cur.executemany(
+        'UPDATE stock_reservations SET status = ? WHERE id = ?',
+        [(RELEASED, reservation_id) for reservation_id, _, _ in reservations]
+    )
+    return len(reservations)
+
+
+def commit_order_stock(cur, order_id):
+    """Make an order's stock sale final.
+
+    Reserved stock is committed. Stock that isn't held any more is taken
+    now: stock given back by a release (an order cancelled, then completed)
+    and the stock of orders placed before reservations existed. Raises
+    InsufficientStock if some of it is no longer there; the caller must
+    then roll back.
+    """
+    cur.execute(
+        'UPDATE stock_reservations SET status = ? WHERE order_id = ? AND status = ?',
+        (COMMITTED, order_id, RESERVED)
+    )
+    cur.execute(
+        """SELECT r.id, r.product_id, fp.name, r.quantity FROM stock_reservations r
+           LEFT JOIN farmer_products fp ON fp.product_id = r.product_id
+           WHERE r.order_id = ? AND r.status = ?""",
+        (order_id, RELEASED)
+    )
+    released = cur.fetchall()
+    if released:
+        wanted = [(product_id, name, quantity) for _, product_id, name, quantity in released]
+    else:
+        cur.execute('SELECT 1 FROM stock_reservations WHERE order_id = ? LIMIT 1', (order_id,))
+        if cur.fetchone() is not None:
+            return
+        cur.execute('SELECT product_id, product_name, quantity FROM order_items WHERE order_id = ?', (order_id,))
+        wanted = cur.fetchall()
+
+    short = []
+    for product_id, name, quantity in wanted:
+        if not _take_stock(cur, product_id, quantity):
+            available = _stock_left(cur, product_id)
+            if available is not None:
+                short.append((name or product_id, available))
+    if short:
+        raise InsufficientStock(short)
+    cur.executemany(
+        'UPDATE stock_reservations SET status = ? WHERE id = ?',
+        [(COMMITTED, reservation_id) for reservation_id, _, _, _ in released]
+    )
+
+
+def release_expired_reservations(cur, now=None):
+    """Release orphaned reservations past their expiry: those whose order was
+    deleted or cancelled without releasing them (only these have an expiry).
+    Orders are left as they are.
+
+    Returns the ids of the orders whose reservations were released.
+    """
+    now = int(now if now is not None else time.time())
+    # No DISTINCT: it makes the planner walk the order_id index over every
+    # reservation instead of the partial expiry index
+    cur.execute(
+        """SELECT r.order_id FROM stock_reservations r
+           LEFT JOIN orders o ON o.id = r.order_id
+           WHERE r.status = 'reserved' AND r.expires_at <= ?
+             AND (o.id IS NULL OR o.status = 'cancelled')""",
+        (now,)
+    )
+    order_ids = list(dict.fromkeys(row[0] for row in cur.fetchall()))
+    for order_id in order_ids:
+        release_order_stock(cur, order_id)
+    return order_ids
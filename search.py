@@ -0,0 +1,207 @@
+"""
+Full-text product search for AgriConnect.
+`product_search` is an FTS5 index over product name, category, description
+and seller/farmer name for both catalog tables. Triggers keep it in sync with
+every write to `farmer_products`, `farm_supplies` and seller names in
+`user_details`, so the farmer add/update/delete routes need no extra code.
+
+Index rowids are 2 * id for `farmer_products` rows and 2 * id + 1 for
+`farm_supplies` rows, so rowid order follows listing age in both tables and
+the source filter is a rowid parity check.
+"""
+
+import re
+import sqlite3
+
+# bm25() column weights: name, category, description, farmer_name
+RANK_WEIGHTS = (10.0, 4.0, 1.0, 2.0)
+
+MAX_QUERY_TERMS = 8
+
+# Default for search_products(candidates=): how many of a query's newest
+# matches are ranked. Scoring every match of a term that covers most of the
+# catalog takes close to a second at 500k products, so broad queries rank
+# only their newest matches and an older, better match can miss the page.
+# None ranks every match.
+SEARCH_CANDIDATES = 300
+
+SOURCE_PARITY = {'home': 0, 'farm': 1}
+
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+HOME_SEARCH_ROW = '''2 * NEW.id, NEW.name, COALESCE(NEW.category, ''), COALESCE(NEW.description, ''),
+                     COALESCE((SELECT name FROM user_details WHERE username = NEW.farmer_username), ''),
+                     'home', NEW.product_id'''
+FARM_SEARCH_ROW = '''2 * NEW.id + 1, NEW.name, '', '', COALESCE(NEW.farmer, ''), 'farm', NEW.product_id'''
+
+SEARCH_COLUMNS = 'rowid, name, category, description, farmer_name, source, product_id'
+
+
+def _search_triggers():
+    return (
+        # Home catalog products
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_farmer_products_insert_search AFTER INSERT ON farmer_products
+        BEGIN
+            INSERT INTO product_search ({SEARCH_COLUMNS}) VALUES ({HOME_SEARCH_ROW});
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_farmer_products_update_search
+        AFTER UPDATE OF product_id, name, category, description, farmer_username ON farmer_products
+        BEGIN
+            DELETE FROM product_search WHERE rowid = 2 * OLD.id;
+            INSERT INTO product_search ({SEARCH_COLUMNS}) VALUES ({HOME_SEARCH_ROW});
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_farmer_products_delete_search AFTER DELETE ON farmer_products
+        BEGIN
+            DELETE FROM product_search WHERE rowid = 2 * OLD.id;
+        END
+        ''',
+        # Farmers page supplies
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_farm_supplies_insert_search AFTER INSERT ON farm_supplies
+        BEGIN
+            INSERT INTO product_search ({SEARCH_COLUMNS}) VALUES ({FARM_SEARCH_ROW});
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_farm_supplies_update_search
+        AFTER UPDATE OF product_id, name, farmer ON farm_supplies
+        BEGIN
+            DELETE FROM product_search WHERE rowid = 2 * OLD.id + 1;
+            INSERT INTO product_search ({SEARCH_COLUMNS}) VALUES ({FARM_SEARCH_ROW});
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_farm_supplies_delete_search AFTER DELETE ON farm_supplies
+        BEGIN
+            DELETE FROM product_search WHERE rowid = 2 * OLD.id + 1;
+        END
+        ''',
+        # Seller names shown on home products
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_user_details_insert_search AFTER INSERT ON user_details
+        BEGIN
+            UPDATE product_search SET farmer_name = COALESCE(NEW.name, '')
+            WHERE rowid IN (SELECT 2 * id FROM farmer_products WHERE farmer_username = NEW.username);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_user_details_update_search AFTER UPDATE OF name ON user_details
+        WHEN OLD.name IS NOT NEW.name
+        BEGIN
+            UPDATE product_search SET farmer_name = COALESCE(NEW.name, '')
+            WHERE rowid IN (SELECT 2 * id FROM farmer_products WHERE farmer_username = NEW.username);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS trg_user_details_delete_search AFTER DELETE ON user_details
+        BEGIN
+            UPDATE product_search SET farmer_name = ''
+            WHERE rowid IN (SELECT 2 * id FROM farmer_products WHERE farmer_username = OLD.username);
+        END
+        ''',
+    )
+
+
+def rebuild_search_index(conn):
+    """Re-index every product from the catalog tables."""
+    cur = conn.cursor()
+    cur.execute('DELETE FROM product_search')
+    cur.execute(f'''
+        INSERT INTO product_search ({SEARCH_COLUMNS})
+        SELECT 2 * fp.id, fp.name, COALESCE(fp.category, ''), COALESCE(fp.description, ''),
+               COALESCE(ud.name, ''), 'home', fp.product_id
+        FROM farmer_products fp
+        LEFT JOIN user_details ud ON ud.username = fp.farmer_username
+    ''')
+    cur.execute(f'''
+        INSERT INTO product_search ({SEARCH_COLUMNS})
+        SELECT 2 * id + 1, name, '', '', COALESCE(farmer, ''), 'farm', product_id FROM farm_supplies
+    ''')
+    cur.execute("INSERT INTO product_search (product_search) VALUES ('optimize')")
+
+
+def create_search_index(conn):
+    """Create the FTS5 index and its sync triggers; index existing products on first run.
+
+    Returns True if the index was built from scratch.
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'product_search'")
+    exists = cur.fetchone() is not None
+    cur.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS product_search USING fts5(
+            name, category, description, farmer_name,
+            source UNINDEXED, product_id UNINDEXED,
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+    ''')
+    for trigger in _search_triggers():
+        cur.execute(trigger)
+    if not exists:
+        rebuild_search_index(conn)
+    return not exists
+
+
+def build_match_query(text, prefix=True):
+    """Turn free text into an FTS5 MATCH expression, or None if it has no terms.
+
+    Terms are quoted so FTS5 operators in user input are plain words. With
+    `prefix` the last term is prefix-matched for search-as-you-type, e.g.
+    "organic tom" -> "organic" "tom"*.
+    """
+    terms = TERM_RE.findall((text or '').lower())[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"' for term in terms) + ('*' if prefix else '')
+
+
+def _ranked_matches(conn, match, source, limit, candidates):
+    where = 'product_search MATCH ?'
+    params = [match]
+    if source:
+        where += ' AND rowid % 2 = ?'
+        params.append(SOURCE_PARITY[source])
+    # Walking the doclist in rowid order is cheap; scoring every match isn't
+    row = None
+    if candidates:
+        row = conn.execute(
+            f'SELECT rowid FROM product_search WHERE {where} ORDER BY rowid DESC LIMIT 1 OFFSET ?',
+            params + [candidates - 1]
+        ).fetchone()
+    if row:
+        where += ' AND rowid >= ?'
+        params.append(row[0])
+    weights = ', '.join(str(w) for w in RANK_WEIGHTS)
+    return conn.execute(
+        f"""SELECT source, product_id FROM product_search WHERE {where}
+            ORDER BY bm25(product_search, {weights}) LIMIT ?""",
+        params + [limit]
+    ).fetchall()
+
+
+def search_products(conn, text, limit=20, source=None, candidates=SEARCH_CANDIDATES):
+    """Return [(source, product_id)] best match first, ranked by BM25.
+
+    A finished last word usually has enough exact matches, which are cheaper
+    to find than prefix matches; otherwise the last term is prefix-matched.
+    `source` is 'home' or 'farm' to search only one catalog table.
+    Only the newest `candidates` matches are ranked (see SEARCH_CANDIDATES);
+    None ranks them all.
+    """
+    exact = build_match_query(text, prefix=False)
+    if exact is None:
+        return []
+    try:
+        hits = _ranked_matches(conn, exact, source, limit, candidates)
+        if len(hits) < limit:
+            hits = _ranked_matches(conn, build_match_query(text), source, limit, candidates)
+        return hits
+    except sqlite3.OperationalError as e:
+        print(f"Error searching products for {text!r}: {e}")
+        return []
@@ -0,0 +1,95 @@
+"""
+Timestamps for AgriConnect.
+Stored timestamps are UTC in SQLite's CURRENT_TIMESTAMP format,
+'YYYY-MM-DD HH:MM:SS', so they sort and compare correctly as text and an
+index can serve ORDER BY and date-range queries on them. They're converted
+to IST, in the 'dd-mm-YYYY HH:MM:SS' form the site has always shown, only
+when a page or JSON response is rendered.
+"""
+
+import datetime
+from datetime import timezone, timedelta
+
+IST_OFFSET = timedelta(hours=5, minutes=30)
+IST = timezone(IST_OFFSET, 'IST')
+
+DB_FORMAT = '%Y-%m-%d %H:%M:%S'
+DISPLAY_FORMAT = '%d-%m-%Y %H:%M:%S'
+
+# Bounds for a date range left open on one side
+MIN_TIMESTAMP = '0000-01-01 00:00:00'
+MAX_TIMESTAMP = '9999-12-31 23:59:59'
+
+# Stored for a row whose time was never recorded. It sorts before every real
+# time, so it is in a date range only when the range has no start
+UNKNOWN_TIMESTAMP = MIN_TIMESTAMP
+
+
+def utc_timestamp(moment=None):
+    """`moment` (default: now) in the stored format."""
+    moment = moment or datetime.datetime.now(timezone.utc)
+    return moment.astimezone(timezone.utc).strftime(DB_FORMAT)
+
+
+def _parse(value):
+    """A stored timestamp as a naive UTC datetime, or None."""
+    # fromisoformat reads the stored format and is much faster than strptime
+    try:
+        moment = datetime.datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def format_ist(value):
+    """A stored timestamp as IST 'dd-mm-YYYY HH:MM:SS', None for UNKNOWN_TIMESTAMP;
+    other values are returned unchanged."""
+    if value == UNKNOWN_TIMESTAMP:
+        return None
+    moment = _parse(value)
+    # Plain offset arithmetic: IST has no DST, and astimezone() is slow on large listings
+    return (moment + IST_OFFSET).strftime(DISPLAY_FORMAT) if moment else value
+
+
+def iso_utc(value):
+    """A stored timestamp as ISO-8601 UTC ('2026-01-20T17:21:56Z'), or None."""
+    moment = _parse(value)
+    return moment.strftime('%Y-%m-%dT%H:%M:%SZ') if moment else None
+
+
+def present_timestamps(row, fields):
+    """Render a dict row's timestamp fields for JSON: `field` becomes the IST
+    display string and `field_utc` carries the ISO-8601 UTC value."""
+    for field in fields:
+        value = row[field]
+        row[field + '_utc'] = iso_utc(value)
+        row[field] = format_ist(value)
+    return row
+
+
+def _parse_bound(text, end):
+    moment = datetime.datetime.fromisoformat(text.strip().replace('Z', '+00:00'))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=IST)
+    try:
+        if end and len(text.strip()) == 10:
+            # A bare date as the upper bound includes that whole day
+            moment += timedelta(days=1)
+        return utc_timestamp(moment)
+    except OverflowError:
+        # The day after 9999-12-31, or a UTC time before year 1
+        raise ValueError(f'Date out of range: {text}')
+
+
+def date_range(start_text=None, end_text=None):
+    """Stored-format bounds [start, end) for a from/to date filter.
+
+    Either side may be omitted. Values are ISO-8601 dates or datetimes; ones
+    without an offset are IST, and a bare `to` date includes that day.
+    Raises ValueError for anything else.
+    """
+    start = _parse_bound(start_text, end=False) if start_text else MIN_TIMESTAMP
+    end = _parse_bound(end_text, end=True) if end_text else MAX_TIMESTAMP
+    return start, end
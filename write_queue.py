@@ -0,0 +1,171 @@
+"""
+Group-commit write queue for AgriConnect.
+Small, frequent writes (feedback, community replies, notification read
+flags, soil test bookings) used to commit one at a time, each taking
+SQLite's write lock and syncing on its own. Under a burst the requests
+ended up queueing on that lock.
+
+WriteQueue hands these statements to one writer thread, which commits
+everything queued as a single transaction: one lock acquisition and one
+sync per batch instead of per write. Writes that arrive while a batch is
+committing (a few milliseconds at most) make up the next one, so batches
+grow with the load without delaying a lone write; `batch_window` adds a
+fixed wait for stragglers on top of that. Each statement runs inside its
+own SAVEPOINT, so a failing write is rolled back and reported on its own
+without affecting the rest of its batch.
+
+Two kinds of acknowledgement:
+- submit() returns as soon as the write is queued (write-behind). It's for
+  writes whose response doesn't depend on them, like marking a
+  notification read. Until the batch commits, a read may not see it yet,
+  and a crash in between loses it.
+- execute() waits until the batch holding the write has committed and
+  returns the write with its lastrowid and rowcount. The writer connection
+  uses synchronous=FULL, so a committed batch survives power loss as well.
+
+The queue is bounded. When the writer falls behind, submit() and execute()
+block for up to `submit_timeout` seconds and then raise WriteQueueFull,
+which routes report as 503 rather than piling up more work.
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+
+from db import BUSY_TIMEOUT_MS, PRAGMAS
+
+
+class WriteQueueFull(Exception):
+    """The write queue stayed full for the whole submit timeout."""
+
+
+class Write:
+    """A queued statement and, once its batch is committed, its outcome."""
+
+    __slots__ = ('sql', 'params', 'acknowledged', 'lastrowid', 'rowcount', 'error', '_done')
+
+    def __init__(self, sql, params, acknowledged):
+        self.sql = sql
+        self.params = params
+        self.acknowledged = acknowledged
+        self.lastrowid = None
+        self.rowcount = None
+        self.error = None
+        self._done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Block until the batch holding this write has committed; re-raises its error."""
+        if not self._done.wait(timeout):
+            raise TimeoutError('queued write was not committed in time')
+        if self.error is not None:
+            raise self.error
+        return self
+
+
+class WriteQueue:
+    """Funnels small writes through one thread that commits them in batches."""
+
+    def __init__(self, db_path, batch_window=0.0, max_batch=256, max_pending=2000, submit_timeout=2.0):
+        self.db_path = db_path
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.submit_timeout = submit_timeout
+        self._queue = queue.Queue(max_pending)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.batches = 0
+        self.writes = 0
+
+    def submit(self, sql, params=()):
+        """Queue a write and return at once (write-behind)."""
+        return self._put(Write(sql, params, acknowledged=False))
+
+    def execute(self, sql, params=(), timeout=None):
+        """Queue a write and return it once its batch has committed (durable acknowledgement)."""
+        return self._put(Write(sql, params, acknowledged=True)).wait(timeout)
+
+    def flush(self, timeout=None):
+        """Wait until every write queued so far has been committed."""
+        self._put(Write(None, (), acknowledged=True)).wait(timeout)
+
+    def close(self):
+        """Commit what is queued and stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def _put(self, write):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='write-queue', daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put(write, timeout=self.submit_timeout)
+        except queue.Full:
+            raise WriteQueueFull(f'{self._queue.maxsize} writes already waiting') from None
+        return write
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        # One sync per batch is what makes a full sync affordable
+        conn.execute('PRAGMA synchronous = FULL')
+        return conn
+
+    def _next_batch(self):
+        """The next batch of writes (blocking for the first), and whether close() was called."""
+        batch = [self._queue.get()]
+        if batch[0] is None:
+            return [], True
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch:
+            try:
+                write = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if write is None:
+                return batch, True
+            batch.append(write)
+        return batch, False
+
+    def _run(self):
+        conn = self._connect()
+        try:
+            stopping = False
+            while not stopping:
+                batch, stopping = self._next_batch()
+                if batch:
+                    self._commit(conn, batch)
+        finally:
+            conn.close()
+
+    def _commit(self, conn, batch):
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for write in batch:
+                if write.sql is None:
+                    continue
+                conn.execute('SAVEPOINT queued_write')
+                try:
+                    cur = conn.execute(write.sql, write.params)
+                    write.lastrowid, write.rowcount = cur.lastrowid, cur.rowcount
+                except sqlite3.Error as e:
+                    conn.execute('ROLLBACK TO queued_write')
+                    write.error = e
+                conn.execute('RELEASE queued_write')
+            conn.execute('COMMIT')
+            self.batches += 1
+            self.writes += sum(1 for write in batch if write.sql is not None)
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            for write in batch:
+                write.error = write.error or e
+        for write in batch:
+            if write.error is not None and not write.acknowledged:
+                print(f"Queued write failed: {write.error}")
+            write._done.set()